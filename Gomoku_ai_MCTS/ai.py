@@ -9,6 +9,7 @@ from collections import defaultdict
 from utils.constants import *
 from utils.chessboard import ChessBoard
 from utils.gomoku_ai import GomokuAI
+from utils.instrumentation import metrics
 
 class AdvancedPatternEvaluator:
     """高级五子棋模式评估器"""
@@ -395,19 +396,22 @@ class HighQualityMCTSEngine:
                         if len(node.children) < max_children and node.untried_moves:
                             move = node.untried_moves.pop(0)
                             node = node.add_child(move)
+                            metrics.count("expansions")
                 
                 # 3. 高质量模拟
                 result = self._enhanced_simulate(node, mcts_player)
+                metrics.count("rollouts")
                 
                 # 4. 反向传播
                 self._backpropagate(node, result)
                 
                 iteration += 1
                 
-                # 定期输出进度
-                if iteration % 500 == 0 and root.children:
+                # 定期记录进度
+                if iteration % 500 == 0 and root.children and metrics.enabled:
                     best_child = max(root.children, key=lambda c: c.visits)
-                    print(f"迭代 {iteration}: 最佳移动 {best_child.move}, 胜率 {best_child.get_win_rate():.3f}")
+                    metrics.event("mcts_progress", iteration=iteration, move=best_child.move,
+                                  win_rate=round(best_child.get_win_rate(), 3))
                     
             except Exception as e:
                 print(f"MCTS迭代出错: {e}")
@@ -420,8 +424,8 @@ class HighQualityMCTSEngine:
         best_child = self._select_best_move(root)
         self.currentI, self.currentJ = best_child.move
         
-        print(f"高质量MCTS完成 {iteration} 次迭代")
-        print(f"最终选择: {best_child.move}, 访问次数: {best_child.visits}, 胜率: {best_child.get_win_rate():.3f}")
+        metrics.event("mcts_done", iterations=iteration, move=best_child.move,
+                      visits=best_child.visits, win_rate=round(best_child.get_win_rate(), 3))
         
         return best_child.move
     
@@ -436,7 +440,7 @@ class HighQualityMCTSEngine:
                     board[i][j] = player
                     if self._check_winner_at_position(board, i, j, player):
                         board[i][j] = 0
-                        print(f"发现必胜移动: ({i}, {j})")
+                        metrics.event("urgent_move", kind="win", move=(i, j))
                         return (i, j)
                     board[i][j] = 0
         
@@ -447,7 +451,7 @@ class HighQualityMCTSEngine:
                     board[i][j] = opponent
                     if self._check_winner_at_position(board, i, j, opponent):
                         board[i][j] = 0
-                        print(f"发现必防移动: ({i}, {j})")
+                        metrics.event("urgent_move", kind="block", move=(i, j))
                         return (i, j)
                     board[i][j] = 0
         
@@ -706,7 +710,7 @@ class MCTSAIPlayer(GomokuAI):
     """基于高质量MCTS算法的AI玩家"""
     
     def __init__(self, iterations=3000, max_time=8.0, c_param=1.414):
-        self.thinking = False
+        super().__init__()
         self.iterations = iterations
         self.max_time = max_time
         self.engine = HighQualityMCTSEngine(iterations, max_time, c_param)
@@ -743,12 +747,16 @@ class MCTSAIPlayer(GomokuAI):
         
         return chessboard
     
+    def _search(self, position, player_side, ctx):
+        """整次MCTS搜索计一个节点，引擎自己按iterations和max_time控制预算"""
+        ctx.tick()
+        move = self.get_move(position.piece_rows(), position.size, player_side)
+        return move, 0, [move], 1
+    
     def get_move(self, board, board_size, player_side):
         """获取AI的下一步移动"""
         self.thinking = True
         try:
-            print("高质量MCTS AI开始思考...")
-            
             # 转换棋盘表示
             converted_board = self.convert_board(board, player_side)
             
@@ -765,8 +773,6 @@ class MCTSAIPlayer(GomokuAI):
             
             # 执行高质量MCTS搜索
             row, col = self.engine.get_next_move(converted_board, player)
-            
-            print(f"高质量MCTS AI计算结果: ({row}, {col})")
             return row, col
             
         except Exception as e:
@@ -5,12 +5,17 @@ import math
 import copy
 import time
 import random
+import itertools
 import multiprocessing as mp
 from multiprocessing import Pool, Manager
 from collections import defaultdict
+from queue import Empty
 from utils.constants import *
 from utils.chessboard import ChessBoard
-from utils.gomoku_ai import GomokuAI
+from utils.gomoku_ai import GomokuAI, SearchLimits, AnalysisLine
+from utils.instrumentation import metrics
+from utils.position import zobrist_table
+from utils.symmetry import symmetry_table, toggle, board_hashes, canonical_of, transform, inverse
 
 class AdvancedPatternEvaluator:
     """高级五子棋模式评估器"""
@@ -201,6 +206,10 @@ class AdvancedPatternEvaluator:
                     density += (3 - distance) * 10
         return density
 
+# 候选落子缓存：规范哈希 -> 规范方向下按评分排序的候选格子编号
+# 每个进程一份，对称局面共用，并行搜索的各轮和各次搜索之间都能复用
+_candidate_cache = {}
+
 class EnhancedMCTSNode:
     """增强的MCTS节点 - 支持多进程序列化"""
     
@@ -216,15 +225,38 @@ class EnhancedMCTSNode:
         self.untried_moves = None
         self._is_terminal = None
         self.urgency_score = 0
+        self.sym_hashes = None
         # 添加用于并行化的字段
         self.node_id = None
         self.parent_id = None
     
+    def get_sym_hashes(self):
+        """8个对称方向的哈希（包含轮到哪一方），父节点已有时增量计算"""
+        if self.sym_hashes is None:
+            size = len(self.board)
+            parent = self.parent
+            if parent is not None and parent.sym_hashes is not None:
+                hashes = list(parent.sym_hashes)
+                keys, side_key = zobrist_table(size)
+                toggle(hashes, symmetry_table(size), keys, self.move[0] * size + self.move[1], parent.player)
+                self.sym_hashes = [h ^ side_key for h in hashes]
+            else:
+                self.sym_hashes = board_hashes(self.board, self.player)
+        return self.sym_hashes
+    
     def get_legal_moves(self):
-        """获取合法移动（更智能的候选生成）"""
+        """获取合法移动（更智能的候选生成），结果按规范哈希缓存"""
         if self.untried_moves is not None:
             return self.untried_moves
         
+        size = len(self.board)
+        key, sym = canonical_of(self.get_sym_hashes())
+        cached = _candidate_cache.get(key)
+        if cached is not None:
+            back = inverse(sym)
+            self.untried_moves = [transform(cell // size, cell % size, size, back) for cell in cached]
+            return self.untried_moves
+        
         evaluator = AdvancedPatternEvaluator()
         candidates = []
         
@@ -251,6 +283,12 @@ class EnhancedMCTSNode:
         
         # 取前50个候选（如果有的话）
         self.untried_moves = [move for _, move in candidates[:50]]
+        
+        if len(_candidate_cache) >= MCTS_CANDIDATE_CACHE_SIZE:
+            _candidate_cache.clear()
+        _candidate_cache[key] = [
+            r * size + c for r, c in (transform(row, col, size, sym) for row, col in self.untried_moves)
+        ]
         return self.untried_moves
     
     def _is_near_stones(self, row, col, radius=3):
@@ -349,7 +387,8 @@ class EnhancedMCTSNode:
             'squared_wins': self.squared_wins,
             'node_id': self.node_id,
             'parent_id': self.parent_id,
-            'urgency_score': self.urgency_score
+            'urgency_score': self.urgency_score,
+            'sym_hashes': self.sym_hashes
         }
     
     @classmethod
@@ -362,6 +401,7 @@ class EnhancedMCTSNode:
         node.node_id = data.get('node_id')
         node.parent_id = data.get('parent_id')
         node.urgency_score = data.get('urgency_score', 0)
+        node.sym_hashes = data.get('sym_hashes')
         return node
 
 # 全局进程池管理器
@@ -382,6 +422,8 @@ class ProcessPoolManager:
             self.initialized = True
             self._pool = None
             self._pool_size = None
+            self.stop_flag = None       # 主进程设置后，各子进程做完当前一次模拟即结束搜索
+            self.progress_queue = None  # 子进程定时汇报搜索进度
     
     def get_pool(self, pool_size=None):
         """获取进程池，如果不存在则创建"""
@@ -394,31 +436,62 @@ class ProcessPoolManager:
                 self._pool.close()
                 self._pool.join()
             
-            self._pool = Pool(processes=pool_size, initializer=init_worker)
+            # 停止标志和进度队列随进程池创建，在子进程初始化时传入
+            self.stop_flag = mp.Event()
+            self.progress_queue = mp.Queue()
+            self._pool = Pool(processes=pool_size, initializer=init_worker,
+                              initargs=(self.stop_flag, self.progress_queue))
             self._pool_size = pool_size
-            print(f"创建进程池，大小: {pool_size}")
+            metrics.event("pool_created", size=pool_size)
         
         return self._pool
     
+    def terminate(self):
+        """立即结束子进程（子进程不响应停止标志时），下次get_pool重新创建"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            metrics.event("pool_closed")
+    
     def cleanup(self):
         """清理进程池"""
         if self._pool is not None:
             self._pool.close()
             self._pool.join()
             self._pool = None
-            print("进程池已清理")
+            metrics.event("pool_closed")
+
+# 子进程中的停止标志和进度队列，由init_worker设置
+_stop_flag = None
+_progress_queue = None
+
+# 每次并行搜索的编号，子进程汇报进度时带上，主进程据此丢弃上一次搜索遗留的汇报
+_search_ids = itertools.count()
 
-def init_worker():
+def init_worker(stop_flag=None, progress_queue=None):
     """工作进程初始化函数"""
+    global _stop_flag, _progress_queue
     # 设置随机种子以确保每个进程有不同的随机序列
     import os
     pid = os.getpid()
     random.seed(pid + int(time.time() * 1000) % 10000)
+    
+    _stop_flag = stop_flag
+    _progress_queue = progress_queue
+    if progress_queue is not None:
+        # 进度汇报没人读取时不阻塞子进程退出
+        progress_queue.cancel_join_thread()
 
 def parallel_mcts_simulation(args):
-    """并行MCTS模拟函数 - 在子进程中执行"""
+    """并行MCTS模拟函数 - 在子进程中执行
+    
+    在同一棵搜索树上模拟iterations次（None时不限次数），收到停止标志时提前结束；
+    每隔 MCTS_REPORT_INTERVAL 秒把目前的统计发到进度队列。
+    """
     try:
-        node_data, ai_player, iterations, c_param, simulation_params = args
+        start = time.perf_counter()
+        node_data, ai_player, iterations, c_param, simulation_params, search_id, task_index = args
         
         # 重建节点
         node = EnhancedMCTSNode.from_dict(node_data)
@@ -426,15 +499,21 @@ def parallel_mcts_simulation(args):
         # 创建局部评估器
         evaluator = AdvancedPatternEvaluator()
         
-        # 执行指定次数的MCTS迭代
+        # 执行指定次数的MCTS迭代（expansions和time供主进程埋点统计）
         results = {
             'simulations': 0,
+            'expansions': 0,
+            'time': 0.0,
             'total_reward': 0.0,
             'node_visits': {},
             'best_moves': []
         }
         
-        for _ in range(iterations):
+        next_report = start + MCTS_REPORT_INTERVAL
+        while iterations is None or results['simulations'] < iterations:
+            if _stop_flag is not None and _stop_flag.is_set():
+                break
+            
             # 执行单次MCTS迭代
             selected_node = _select_node(node, c_param)
             
@@ -443,6 +522,7 @@ def parallel_mcts_simulation(args):
                 move = selected_node.untried_moves.pop(0) if selected_node.untried_moves else None
                 if move:
                     selected_node = _expand_node(selected_node, move)
+                    results['expansions'] += 1
             
             # 模拟
             reward = _simulate_game(selected_node, ai_player, evaluator, simulation_params)
@@ -463,7 +543,18 @@ def parallel_mcts_simulation(args):
                 if current.parent and current.parent.player != current.player:
                     reward = 1.0 - reward
                 current = current.parent
-        
+            
+            if _progress_queue is not None and time.perf_counter() >= next_report:
+                # 队列在后台线程中序列化，发送统计的副本
+                snapshot = {
+                    'simulations': results['simulations'],
+                    'total_reward': results['total_reward'],
+                    'node_visits': {key: dict(stats) for key, stats in results['node_visits'].items()}
+                }
+                _progress_queue.put((search_id, task_index, snapshot))
+                next_report = time.perf_counter() + MCTS_REPORT_INTERVAL
+        
+        results['time'] = time.perf_counter() - start
         return results
         
     except Exception as e:
@@ -638,7 +729,7 @@ class ParallelHighQualityMCTSEngine:
         self.min_visits_for_expansion = 3
         self.progressive_widening_factor = 0.4
         
-        print(f"并行MCTS引擎初始化，进程数: {self.num_processes}")
+        metrics.event("mcts_init", processes=self.num_processes)
     
     def _check_urgent_moves(self, board, player):
         """检查紧急移动（必胜或必防）"""
@@ -651,7 +742,7 @@ class ParallelHighQualityMCTSEngine:
                     board[i][j] = player
                     if self._check_winner_at_position(board, i, j, player):
                         board[i][j] = 0
-                        print(f"发现必胜移动: ({i}, {j})")
+                        metrics.event("urgent_move", kind="win", move=(i, j))
                         return (i, j)
                     board[i][j] = 0
         
@@ -662,7 +753,7 @@ class ParallelHighQualityMCTSEngine:
                     board[i][j] = opponent
                     if self._check_winner_at_position(board, i, j, opponent):
                         board[i][j] = 0
-                        print(f"发现必防移动: ({i}, {j})")
+                        metrics.event("urgent_move", kind="block", move=(i, j))
                         return (i, j)
                     board[i][j] = 0
         
@@ -867,64 +958,110 @@ class ParallelHighQualityMCTSEngine:
                 result = 1.0 - result
             node = node.parent
     
-    def get_next_move(self, board, player):
-        """获取下一步移动 - 并行版本"""
-        start_time = time.time()
+    def _parallel_mcts_search(self, root, ai_player, ctx):
+        """并行MCTS搜索
         
-        # 转换棋盘格式
-        converted_board = self.convert_board_format(board)
-        
-        # 创建根节点
-        mcts_player = 1 if player == 1 else 2
-        root = EnhancedMCTSNode(converted_board, mcts_player)
-        
-        # 特殊情况处理
-        legal_moves = root.get_legal_moves()
-        if not legal_moves:
-            return (7, 7)
-        
-        # 紧急移动检查
-        urgent_move = self._check_urgent_moves(converted_board, mcts_player)
-        if urgent_move:
-            self.currentI, self.currentJ = urgent_move
-            return urgent_move
-        
-        # 开局策略
-        if self._is_early_game(converted_board):
-            move = self._get_opening_move(converted_board, mcts_player)
-            if move:
-                self.currentI, self.currentJ = move
-                return move
-        
-        # 并行MCTS搜索
-        best_move = self._parallel_mcts_search(root, mcts_player, start_time)
-        
-        self.currentI, self.currentJ = best_move
-        return best_move
-    
-    def _parallel_mcts_search(self, root, ai_player, start_time):
-        """并行MCTS搜索"""
-        print(f"开始并行MCTS搜索，使用 {self.num_processes} 个进程")
+        整次搜索的模拟次数一次分给各进程（只限时间时不限次数），每个进程在自己的搜索树上模拟到用完配额或收到停止标志，
+        全部结束后合并一次统计。等待期间按各进程汇报的进度计入节点数（一次模拟计一个节点）并报告候选，
+        到时间或收到stop()时设置停止标志，各进程做完当前一次模拟即返回已有的统计。
+        """
+        metrics.event("mcts_start", processes=self.num_processes)
         
         # 获取进程池
         pool = self.pool_manager.get_pool(self.num_processes)
+        stop_flag = self.pool_manager.stop_flag
+        legal_moves = {str(move): move for move in root.get_legal_moves()}
         
-        # 分配迭代次数给每个进程
-        iterations_per_process = self.total_iterations // self.num_processes
-        remaining_iterations = self.total_iterations % self.num_processes
+        if ctx.limits.nodes is not None:
+            iterations = max(0, ctx.limits.nodes - ctx.nodes)
+        elif ctx.deadline is not None:
+            iterations = None
+        else:
+            iterations = self.total_iterations
+        search_id = next(_search_ids)
+        tasks = self._create_tasks(root, ai_player, iterations, search_id)
+        base_nodes = ctx.nodes
+        
+        try:
+            dispatched = time.perf_counter()
+            pending = pool.map_async(parallel_mcts_simulation, tasks)
+            progress = {}
+            try:
+                while not pending.ready():
+                    pending.wait(MCTS_POLL_INTERVAL)
+                    if self._collect_progress(search_id, progress):
+                        partial = self._merge_parallel_results(progress.values())
+                        ctx.tick(max(0, base_nodes + partial['total_simulations'] - ctx.nodes))
+                        ctx.report(self._candidate_lines(partial, legal_moves, ctx.multipv))
+                    if ctx.should_stop():
+                        stop_flag.set()
+                # 子进程出错时返回None
+                results = [r for r in pending.get() if r]
+            finally:
+                # 等待中出错（包括KeyboardInterrupt）时也要让子进程停下，否则不限次数的搜索会一直占着进程池
+                stop_flag.set()
+                pending.wait(MCTS_STOP_GRACE)
+                if not pending.ready():
+                    self.pool_manager.terminate()
+                stop_flag.clear()
+            search_time = time.perf_counter() - dispatched
+            
+            merged_results = self._merge_parallel_results(results)
+            if merged_results['total_simulations'] == 0:
+                return self._fallback_serial_search(root, ai_player, ctx)
+            
+            metrics.count("rollouts", merged_results['total_simulations'])
+            metrics.count("expansions", sum(r.get('expansions', 0) for r in results))
+            # 总用时减去最慢进程的计算时间：分发任务、传输数据和轮询等待的开销
+            metrics.add_time("pool_dispatch", max(0.0, search_time - max(r.get('time', 0.0) for r in results)))
+            ctx.tick(max(0, base_nodes + merged_results['total_simulations'] - ctx.nodes))
+            
+            # 选择最佳移动
+            best_move, score = self._select_best_move_from_results(merged_results, root, ctx)
+            
+            elapsed_time = ctx.elapsed()
+            total_simulations = merged_results['total_simulations']
+            
+            metrics.event("mcts_done", simulations=total_simulations, elapsed=elapsed_time,
+                          rate=total_simulations / elapsed_time if elapsed_time > 0 else 0, move=best_move)
+            
+            return best_move, score
+            
+        except Exception as e:
+            print(f"并行MCTS搜索出错: {e}")
+            import traceback
+            traceback.print_exc()
+            # 回退到串行搜索
+            return self._fallback_serial_search(root, ai_player, ctx)
+    
+    def _collect_progress(self, search_id, progress):
+        """取出进度队列中本次搜索的汇报，progress 保留每个进程最新的一份，返回是否有新汇报"""
+        queue = self.pool_manager.progress_queue
+        updated = False
+        while True:
+            try:
+                task_search, task_index, snapshot = queue.get_nowait()
+            except Empty:
+                return updated
+            if task_search == search_id:
+                progress[task_index] = snapshot
+                updated = True
+    
+    def _create_tasks(self, root, ai_player, iterations, search_id):
+        """把整次搜索的模拟次数分给各进程（None表示不限次数），每个进程使用独立的根节点副本和略有不同的参数"""
+        if iterations is None:
+            shares = [None] * self.num_processes
+        else:
+            shares = [iterations // self.num_processes + (1 if i < iterations % self.num_processes else 0)
+                      for i in range(self.num_processes)]
         
-        # 准备并行任务
         tasks = []
         simulation_params = {
             'max_depth': self.max_simulation_depth
         }
         
-        for i in range(self.num_processes):
-            process_iterations = iterations_per_process
-            if i < remaining_iterations:
-                process_iterations += 1
-            
-            if process_iterations > 0:
+        for i, process_iterations in enumerate(shares):
+            if process_iterations is None or process_iterations > 0:
                 # 为每个进程创建独立的根节点副本
                 root_copy = copy.deepcopy(root)
                 root_copy.node_id = f"root_{i}"
@@ -937,44 +1074,21 @@ class ParallelHighQualityMCTSEngine:
                     ai_player,
                     process_iterations,
                     param_c,
-                    simulation_params_local
+                    simulation_params_local,
+                    search_id,
+                    i
                 )
                 tasks.append(task_args)
-        
-        try:
-            # 执行并行计算
-            print(f"启动 {len(tasks)} 个并行任务")
-            results = pool.map(parallel_mcts_simulation, tasks)
-            
-            # 合并结果
-            merged_results = self._merge_parallel_results(results, root)
-            
-            # 选择最佳移动
-            best_move = self._select_best_move_from_results(merged_results, root)
-            
-            elapsed_time = time.time() - start_time
-            total_simulations = sum(r['simulations'] for r in results)
-            
-            print(f"并行MCTS完成: {total_simulations} 次模拟，用时 {elapsed_time:.2f}s")
-            print(f"模拟速度: {total_simulations/elapsed_time:.0f} 模拟/秒")
-            print(f"最终选择: {best_move}")
-            
-            return best_move
-            
-        except Exception as e:
-            print(f"并行MCTS搜索出错: {e}")
-            import traceback
-            traceback.print_exc()
-            # 回退到串行搜索
-            return self._fallback_serial_search(root, ai_player)
+        return tasks
     
-    def _merge_parallel_results(self, results, root):
-        """合并并行结果"""
-        merged = {
-            'total_simulations': 0,
-            'total_reward': 0.0,
-            'move_stats': defaultdict(lambda: {'visits': 0, 'wins': 0.0})
-        }
+    def _merge_parallel_results(self, results, merged=None):
+        """合并并行结果（merged不为None时累加到已有的统计中）"""
+        if merged is None:
+            merged = {
+                'total_simulations': 0,
+                'total_reward': 0.0,
+                'move_stats': defaultdict(lambda: {'visits': 0, 'wins': 0.0})
+            }
         
         for result in results:
             merged['total_simulations'] += result['simulations']
@@ -987,12 +1101,25 @@ class ParallelHighQualityMCTSEngine:
         
         return merged
     
-    def _select_best_move_from_results(self, merged_results, root):
-        """从合并结果中选择最佳移动"""
+    def _candidate_lines(self, merged_results, legal_moves, count):
+        """已模拟过的根节点落子，按访问次数从多到少
+        
+        统计按落子坐标合并，不区分所在的层，没有按路径的更深统计，主要变例只有这一手。
+        """
+        stats = merged_results['move_stats']
+        visited = [(stats[key]['visits'], stats[key]['wins'], move)
+                   for key, move in legal_moves.items() if key in stats and stats[key]['visits'] > 0]
+        visited.sort(key=lambda x: x[0], reverse=True)
+        return [AnalysisLine(move=move, score=wins / visits, visits=visits, pv=[move])
+                for visits, wins, move in visited[:count]]
+    
+    def _select_best_move_from_results(self, merged_results, root, ctx):
+        """从合并结果中选择最佳移动，返回 (移动, 综合评分)，并按综合评分报告候选（评分为胜率）"""
         # 获取合法移动
         legal_moves = root.get_legal_moves()
         if not legal_moves:
-            return (7, 7)
+            return (7, 7), 0
+        metrics.count("evals", len(legal_moves))
         
         # 为每个合法移动计算统计信息
         move_scores = []
@@ -1014,7 +1141,7 @@ class ParallelHighQualityMCTSEngine:
                 
                 # 综合评分
                 final_score = win_rate * 0.7 + static_score * 0.2 + confidence * 0.1
-                move_scores.append((final_score, stats['visits'], move))
+                move_scores.append((final_score, stats['visits'], move, win_rate))
             else:
                 # 未访问的移动使用静态评分
                 try:
@@ -1022,27 +1149,25 @@ class ParallelHighQualityMCTSEngine:
                     static_score = max(0, min(1000000, static_score)) / 1000000.0
                 except:
                     static_score = 0.5
-                move_scores.append((static_score * 0.5, 0, move))
+                move_scores.append((static_score * 0.5, 0, move, 0.0))
         
         if move_scores:
             # 按综合评分排序
             move_scores.sort(reverse=True, key=lambda x: (x[0], x[1]))
             
-            # 输出前几个候选
-            print("并行MCTS候选移动:")
-            for i, (score, visits, move) in enumerate(move_scores[:5]):
-                print(f"  {i+1}. {move}: 评分={score:.3f}, 访问={visits}")
+            ctx.report([AnalysisLine(move=move, score=win_rate, visits=visits, pv=[move])
+                        for _, visits, move, win_rate in move_scores[:ctx.multipv]])
             
-            return move_scores[0][2]
+            return move_scores[0][2], move_scores[0][0]
         
         # 备用策略
-        return legal_moves[0]
+        return legal_moves[0], 0
     
-    def _fallback_serial_search(self, root, ai_player):
-        """备用串行搜索"""
-        print("使用备用串行搜索")
+    def _fallback_serial_search(self, root, ai_player, ctx):
+        """备用串行搜索，返回 (移动, 胜率)"""
+        metrics.event("mcts_fallback")
         
-        # 简单的迭代搜索
+        # 简单的迭代搜索，至少完成一次迭代
         for _ in range(min(1000, self.total_iterations)):
             try:
                 node = self._enhanced_select(root)
@@ -1051,69 +1176,56 @@ class ParallelHighQualityMCTSEngine:
                     if (hasattr(node, 'untried_moves') and node.untried_moves):
                         move = node.untried_moves.pop(0)
                         node = node.add_child(move)
+                        metrics.count("expansions")
                 
                 result = self._enhanced_simulate(node, ai_player)
                 self._backpropagate(node, result)
+                metrics.count("rollouts")
                 
             except Exception as e:
                 print(f"备用搜索迭代出错: {e}")
                 break
+            
+            if ctx.tick():
+                break
         
         if root.children:
             best_child = max(root.children, key=lambda c: c.visits)
-            return best_child.move
+            return best_child.move, best_child.get_win_rate()
         
-        return (7, 7)
+        return (7, 7), 0
     
-    def get_next_move(self, board, player):
-        """获取下一步移动 - 并行版本"""
-        start_time = time.time()
-        
-        # 转换棋盘格式
-        converted_board = self.convert_board_format(board)
+    def get_next_move(self, converted_board, mcts_player, ctx):
+        """获取下一步移动 - 并行版本，返回 (移动, 评分)
         
+        converted_board: 0空、1己方、2对方的二维列表
+        """
         # 创建根节点
-        mcts_player = 1 if player == 1 else 2
         root = EnhancedMCTSNode(converted_board, mcts_player)
         
         # 特殊情况处理
         legal_moves = root.get_legal_moves()
         if not legal_moves:
-            return (7, 7)
+            return (7, 7), 0
         
-        # 紧急移动检查
+        # 紧急移动检查（必胜或必防，不需要搜索）
         urgent_move = self._check_urgent_moves(converted_board, mcts_player)
         if urgent_move:
             self.currentI, self.currentJ = urgent_move
-            return urgent_move
+            return urgent_move, 1.0
         
         # 开局策略
         if self._is_early_game(converted_board):
             move = self._get_opening_move(converted_board, mcts_player)
             if move:
                 self.currentI, self.currentJ = move
-                return move
+                return move, 0
         
         # 并行MCTS搜索
-        best_move = self._parallel_mcts_search(root, mcts_player, start_time)
+        best_move, score = self._parallel_mcts_search(root, mcts_player, ctx)
         
         self.currentI, self.currentJ = best_move
-        return best_move
-    
-    def convert_board_format(self, board):
-        """转换棋盘格式"""
-        converted = []
-        for row in board:
-            converted_row = []
-            for cell in row:
-                if cell == 0:
-                    converted_row.append(0)
-                elif cell == 1:
-                    converted_row.append(1)
-                elif cell == -1:
-                    converted_row.append(2)
-            converted.append(converted_row)
-        return converted
+        return best_move, score
     
     def _is_early_game(self, board):
         """判断是否为开局"""
@@ -1154,27 +1266,13 @@ class MCTSAIPlayer(GomokuAI):
     """基于并行高质量MCTS算法的AI玩家"""
     
     def __init__(self, iterations=3000, max_time=8.0, c_param=1.414, num_processes=None):
-        self.thinking = False
+        super().__init__()
         self.iterations = iterations
         self.max_time = max_time
         self.num_processes = num_processes
+        # 引擎（评估器和进程池）在多次搜索之间保留；搜索树在进程池的子进程中，每次搜索重新建立
         self.engine = ParallelHighQualityMCTSEngine(iterations, max_time, c_param, num_processes)
     
-    def convert_board(self, board, player_side):
-        """转换棋盘格式"""
-        converted = []
-        for row in board:
-            converted_row = []
-            for cell in row:
-                if cell == PIECE_EMPTY:
-                    converted_row.append(0)
-                elif cell == PIECE_BLACK:
-                    converted_row.append(1 if player_side == PLAYER_BLACK else -1)
-                elif cell == PIECE_WHITE:
-                    converted_row.append(-1 if player_side == PLAYER_BLACK else 1)
-            converted.append(converted_row)
-        return converted
-    
     def get_next_chessboard(self, chessboard: ChessBoard, player_side: int) -> ChessBoard:
         """获取AI的下一步棋盘状态"""
         if chessboard.winner != 0:
@@ -1192,54 +1290,32 @@ class MCTSAIPlayer(GomokuAI):
         
         return chessboard
     
-    def get_move(self, board, board_size, player_side):
-        """获取AI的下一步移动 - 并行版本"""
-        self.thinking = True
+    def default_limits(self):
+        """默认预算：引擎的总模拟次数和max_time，先到者生效"""
+        return SearchLimits(time=self.max_time, nodes=self.engine.total_iterations)
+    
+    def _search(self, position, player_side, ctx):
+        """并行MCTS搜索，每次模拟计一个节点；limits.depth 对MCTS无效"""
+        board_size = position.size
         try:
-            print("并行高质量MCTS AI开始思考...")
-
-            # 如果AI执黑棋，反转棋盘和身份，让AI以白棋身份思考
-            if player_side == PLAYER_BLACK:
-                # 反转棋盘：黑变白，白变黑
-                fake_board = []
-                for row in board:
-                    fake_row = []
-                    for cell in row:
-                        if cell == PIECE_BLACK:
-                            fake_row.append(PIECE_WHITE)
-                        elif cell == PIECE_WHITE:
-                            fake_row.append(PIECE_BLACK)
-                        else:
-                            fake_row.append(PIECE_EMPTY)
-                    fake_board.append(fake_row)
-                fake_player_side = PLAYER_WHITE
-                converted_board = self.convert_board(fake_board, fake_player_side)
-                player = -1  # 让AI以“白棋”身份思考
-            else:
-                converted_board = self.convert_board(board, player_side)
-                player = 1 if player_side == PLAYER_BLACK else -1
-
-            # 重新创建引擎实例以确保参数正确
-            self.engine = ParallelHighQualityMCTSEngine(
-                self.iterations, self.max_time, 1.414, self.num_processes
-            )
+            # 己方为1、对方为2，与之前按执子方换色后的编码相同；根节点玩家编号也沿用之前的取值
+            converted_board = position.rows(0, 1, 2, player_side)
+            mcts_player = 2
 
             # 空棋盘处理
-            if all(cell == 0 for row in converted_board for cell in row):
+            if position.stones == 0:
                 center = board_size // 2
-                return center, center
+                return (center, center), 0, [(center, center)], 0
 
-            row, col = self.engine.get_next_move(converted_board, player)
-            print(f"并行MCTS AI计算结果: ({row}, {col})")
-            return row, col
+            (row, col), score = self.engine.get_next_move(converted_board, mcts_player, ctx)
+            return (row, col), score, [(row, col)], 0
 
         except Exception as e:
             print(f"并行MCTS AI计算出错: {e}")
             import traceback
             traceback.print_exc()
-            return self._get_fallback_move(board, board_size)
-        finally:
-            self.thinking = False
+            move = self._get_fallback_move(position.piece_rows(), board_size)
+            return move, 0, [move], 0
     
     def _get_fallback_move(self, board, board_size):
         """备用策略"""
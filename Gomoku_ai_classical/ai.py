@@ -1,11 +1,11 @@
 """
 AI相关功能
 """
-import time
 from utils.constants import *
 from utils.config_4 import *
 from utils.chessboard import ChessBoard
-from utils.gomoku_ai import GomokuAI
+from utils.gomoku_ai import GomokuAI, AnalysisLine
+from utils.instrumentation import metrics
 
 def set_chess(board_inner, x, y, chr):
     """设置棋子"""
@@ -114,9 +114,12 @@ def value_all(board_inner, temp_list, value_model, chr, board_size):
     add = additional(temp_list)
     return a + b + c + d + add
 
-def value_chess(board_inner, board_size):
-    """AI决策主函数"""
-    t1 = time.time()
+def value_chess(board_inner, board_size, tick=None, candidates=None):
+    """AI决策主函数
+    
+    tick: 每评估一个候选点调用一次，返回True时停止扫描并按已评估的候选点决策
+    candidates: 不为None时追加 ((row, col), 估值)，按本次决策所用的估值从高到低，第一个为返回的落子
+    """
     if board_inner == [[PIECE_EMPTY] * board_size for _ in range(board_size)]:
         return board_size // 2, board_size // 2, 0
     temp_list_x = []
@@ -131,7 +134,8 @@ def value_chess(board_inner, board_size):
     pos_d = (0, 0)
     score_x_2 = 0
     score_o_2 = 0
-    score_diff = 0
+    # 攻防差值从负无穷开始比较：没有差值为正的空位时（如预算只够评估几个点）也落在评估过的最好的空位，而不是(0, 0)
+    score_diff = float('-inf')
     chess_range_x = [x for x in range(board_size) if ''.join(board_inner[x]).replace(' ', '') != '']
     chess_range_y = [y for y in range(board_size) if ''.join([list(i) for i in zip(*board_inner)][y]).replace(' ', '') != '']
     if chess_range_x and chess_range_y:
@@ -141,7 +145,11 @@ def value_chess(board_inner, board_size):
         range_x = (0, board_size)
         range_y = (0, board_size)
     num = 0
+    stopped = False
+    evaluated = {}
     for x in range(*range_x):
+        if stopped:
+            break
         for y in range(*range_y):
             tp_list_x = []
             tp_list_o = []
@@ -169,6 +177,11 @@ def value_chess(board_inner, board_size):
                     pos_d = x, y
                     tp_list_d = tp_list_x
                     score_diff = diff
+                if candidates is not None:
+                    evaluated[(x, y)] = (score_a, score_b, diff)
+                if tick is not None and tick():
+                    stopped = True
+                    break
     if score_x_2 >= 1000:
         score = score_x_2
         pos = pos_x
@@ -187,47 +200,50 @@ def value_chess(board_inner, board_size):
         temp_list_o.clear()
         score = value_all(board_inner, temp_list_x, value_model_X, PIECE_BLACK, board_size)
         board_inner[x][y] = PIECE_EMPTY
+    if candidates is not None:
+        # 与上面的决策一致：能成五看己方估值，需要防守看对方估值，否则看攻防差值
+        index = 0 if score_x_2 >= 1000 else 1 if score_o_2 >= 1000 else 2
+        ranked = sorted(evaluated.items(), key=lambda item: item[1][index], reverse=True)
+        candidates.append((pos, evaluated[pos][index] if pos in evaluated else 0))
+        candidates.extend((move, values[index]) for move, values in ranked if move != pos)
     return pos[0], pos[1], score
 
 class AIPlayer(GomokuAI):
     """AI玩家类"""
     
     def __init__(self):
-        self.thinking = False
+        super().__init__()
     
     def get_next_chessboard(self, chessboard: ChessBoard, player_side: int) -> ChessBoard:
         """获取AI的下一步棋盘状态"""
         if chessboard.winner != 0:
             return chessboard
         
-        board_size = chessboard.size
-        board_inner = chessboard.board
-        
-        # AI计算下一步
-        row, col = self.get_move(board_inner, board_size)
-        
-        # 根据player_side确定棋子类型
-        piece_type = PIECE_BLACK if player_side == PLAYER_BLACK else PIECE_WHITE
+        # AI计算下一步，没有可下的位置时不落子
+        move = self.search(chessboard, player_side=player_side).move
         
         # 更新棋盘状态
-        if set_chess(board_inner, row, col, piece_type):
-            chessboard.place_stone(row, col, player_side)
+        if move is not None:
+            chessboard.place_stone(move[0], move[1], player_side)
         
         return chessboard
     
     
-    def get_move(self, board, board_size):
-        """获取AI的下一步移动"""
-        self.thinking = True
+    def _search(self, position, player_side, ctx):
+        """单层估值扫描（估值同时考虑双方，不区分执子方），每个候选点计一个节点，按决策所用的估值报告候选"""
+        board_size = position.size
+        board = position.piece_rows()
         try:
-            row, col, score = value_chess(board, board_size)
-            print(f"AI计算结果: ({row}, {col}), 评分: {score}")
-            return row, col
+            candidates = []
+            row, col, score = value_chess(board, board_size, ctx.tick, candidates)
+            # 每个候选点估值一次
+            metrics.count("evals", ctx.nodes)
+            ctx.report([AnalysisLine(move=move, score=value, pv=[move])
+                        for move, value in candidates[:ctx.multipv]], 1)
         except Exception as e:
             print(f"AI计算出错: {e}")
-            return self._get_fallback_move(board, board_size)
-        finally:
-            self.thinking = False
+            (row, col), score = self._get_fallback_move(board, board_size), 0
+        return (row, col), score, [(row, col)], 1
     
     def _get_fallback_move(self, board, board_size):
         """获取备用移动位置"""
@@ -4,95 +4,94 @@ AI相关功能 - Minimax版本
 import math
 from utils.constants import *
 from utils.chessboard import ChessBoard
-from utils.gomoku_ai import GomokuAI
+from utils.gomoku_ai import GomokuAI, SearchStopped, AnalysisLine
 from utils.minimax_ai_engine import MinimaxAIEngine
+from utils.instrumentation import metrics
 
 class MinimaxAIPlayer(GomokuAI):
     """基于Minimax算法的AI玩家"""
     
     def __init__(self, depth=3):
-        self.thinking = False
+        super().__init__()
         self.depth = depth
+        # 同一个引擎用于所有搜索，置换表在多次搜索（同一局的各步、后台思考）之间保留
         self.engine = MinimaxAIEngine(depth)
-    
-    def convert_board(self, board, player_side):
-        """将框架棋盘转换为Minimax引擎的内部表示"""
-        converted = []
-        for row in board:
-            converted_row = []
-            for cell in row:
-                if cell == PIECE_EMPTY:
-                    converted_row.append(0)
-                elif cell == PIECE_BLACK:
-                    # 根据AI角色决定表示
-                    converted_row.append(1 if player_side == PLAYER_BLACK else -1)
-                elif cell == PIECE_WHITE:
-                    converted_row.append(-1 if player_side == PLAYER_BLACK else 1)
-            converted.append(converted_row)
-        return converted
+        self._tt_owner = None  # 置换表条目所属的 (执子方, 棋盘大小)
     
     def get_next_chessboard(self, chessboard: ChessBoard, player_side: int) -> ChessBoard:
         """获取AI的下一步棋盘状态"""
         if chessboard.winner != 0:
             return chessboard
         
-        board_size = chessboard.size
-        board_inner = chessboard.board
-        
         # AI计算下一步
-        row, col = self.get_move(board_inner, board_size, player_side)
-        
-        # 根据player_side确定棋子类型
-        piece_type = PIECE_BLACK if player_side == PLAYER_BLACK else PIECE_WHITE
+        row, col = self.search(chessboard, player_side=player_side).move
         
         # 更新棋盘状态
-        if 0 <= row < board_size and 0 <= col < board_size and board_inner[row][col] == PIECE_EMPTY:
-            chessboard.place_stone(row, col, player_side)
+        chessboard.place_stone(row, col, player_side)
         
         return chessboard
     
-    def get_move(self, board, board_size, player_side):
-        """获取AI的下一步移动"""
-        self.thinking = True
+    def _search(self, position, player_side, ctx):
+        """Alpha-Beta搜索，每个节点计一次
+        
+        只限制深度时直接搜索到目标深度；有时间或节点预算时从第1层逐层加深，
+        预算用完时返回最后一个完成的深度的结果。置换表记录上下界和深度，各层和各次搜索共用。
+        每完成一层报告根节点各落子的值（除最佳落子外是上界，只用于排序参考）。
+        """
+        board_size = position.size
+        # 引擎内部表示：己方1，对方-1
+        converted_board = position.rows(0, 1, -1, player_side)
+        
+        # 如果是空棋盘，直接返回中心点
+        if position.stones == 0:
+            center = board_size // 2
+            return (center, center), 0, [(center, center)], 0
+        
+        # 置换表按己方/对方记录棋子，执子方改变后同一条目轮到的一方不同；超过 MINIMAX_TT_SIZE 时也清空
+        if self._tt_owner != (player_side, board_size) or len(self.engine.TTable) > MINIMAX_TT_SIZE:
+            self.engine.TTable.clear()
+            self._tt_owner = (player_side, board_size)
+        
+        max_depth = ctx.limits.depth or self.depth
+        if ctx.limits.time is not None or ctx.limits.nodes is not None:
+            depths = range(1, max_depth + 1)
+        else:
+            depths = [max_depth]
+        
+        best = None
         try:
-            # 转换棋盘表示
-            converted_board = self.convert_board(board, player_side)
-            
-            # 初始化引擎
-            self.engine = MinimaxAIEngine(self.depth)
-            self.engine.board_size = board_size
-            self.engine.boardMap = converted_board
-            
-            # 如果是空棋盘，直接返回中心点
-            if all(cell == 0 for row in converted_board for cell in row):
-                center = board_size // 2
-                return center, center
-            
-            # 初始化边界
-            self.engine.nextBound = {}
-            for i in range(board_size):
-                for j in range(board_size):
-                    if converted_board[i][j] != 0:
-                        self.engine.updateBound(i, j, self.engine.nextBound)
-            
-            # 执行搜索
-            self.engine.alphaBetaPruning(
-                self.engine.depth,
-                self.engine.boardValue,
-                self.engine.nextBound,
-                -math.inf,
-                math.inf,
-                True
-            )
-            
-            row, col = self.engine.currentI, self.engine.currentJ
-            print(f"Minimax AI计算结果: ({row}, {col}), 评分: {self.engine.boardValue}")
-            return row, col
+            for depth in depths:
+                self.engine.startSearch([list(row) for row in converted_board], depth)
+                self.engine.tick = ctx.tick
+                self.engine.alphaBetaPruning(
+                    depth,
+                    self.engine.boardValue,
+                    self.engine.nextBound,
+                    -math.inf,
+                    math.inf,
+                    True
+                )
+                if self.engine.currentI != -1:
+                    best = ((self.engine.currentI, self.engine.currentJ), self.engine.boardValue, depth)
+                    metrics.event("depth_done", depth=depth, move=best[0], score=best[1], nodes=ctx.nodes)
+                    self._report_root(ctx, depth)
+        except SearchStopped:
+            # 一层都没有完成时，使用根节点已搜完的分支中最好的
+            if best is None and self.engine.currentI != -1:
+                best = ((self.engine.currentI, self.engine.currentJ), self.engine.boardValue, 0)
         except Exception as e:
             print(f"Minimax AI计算出错: {e}")
-            return self._get_fallback_move(board, board_size)
-        finally:
-            self.thinking = False
+        
+        if best is None:
+            move = self._get_fallback_move(position.piece_rows(), board_size)
+            return move, 0, [move], 0
+        move, score, depth = best
+        return move, score, [move], depth
+    
+    def _report_root(self, ctx, depth):
+        """按值从高到低报告根节点的落子（排序稳定，同值时最佳落子在前）"""
+        scores = sorted(self.engine.rootScores.items(), key=lambda item: item[1], reverse=True)
+        ctx.report([AnalysisLine(move=move, score=score, pv=[move]) for move, score in scores[:ctx.multipv]], depth)
     
     def _get_fallback_move(self, board, board_size):
         """备用策略：在棋盘上寻找空位置"""
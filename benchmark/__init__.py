@@ -0,0 +1 @@
+"""引擎基准测试包，运行方式: python -m benchmark"""
@@ -0,0 +1,255 @@
+"""引擎基准测试
+
+对 positions.txt 中的每个局面，按固定预算让各引擎搜索一次，记录用时、节点数（MCTS为模拟次数）、
+每秒节点数、选择的落子和是否解出战术题。每个引擎在独立的子进程中运行，峰值内存按进程统计。
+结果可以写入JSON，并与之前某次提交的结果比较，每秒节点数下降超过阈值时视为性能回退。
+"""
+import io
+import os
+import sys
+import json
+import random
+import argparse
+import subprocess
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from utils.arena import parse_engine_spec, create_engine
+from utils.position import Position
+from utils.gomoku_ai import SearchLimits
+from utils.instrumentation import metrics, JsonLinesSink, StatsSink
+from utils.constants import BOARD_SIZE
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+POSITIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "positions.txt")
+
+# 未在命令行指定预算时各引擎使用的预算
+DEFAULT_BUDGETS = {
+    "classical": SearchLimits(),
+    "minimax": SearchLimits(depth=2),
+    "mcts": SearchLimits(nodes=200),
+}
+
+def _parse_move(text):
+    row, _, col = text.partition(',')
+    return int(row), int(col)
+
+def load_positions(path=POSITIONS_FILE):
+    """读取局面文件，每行为 "类别 名称 落子... [-> 最佳落子...]"，#之后为注释"""
+    positions = []
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            head, _, best = line.partition('->')
+            fields = head.split()
+            if len(fields) < 2:
+                raise ValueError(f"{path}:{line_no}: 缺少类别或名称")
+            try:
+                moves = [_parse_move(m) for m in fields[2:]]
+                best = [_parse_move(m) for m in best.split()]
+            except ValueError:
+                raise ValueError(f"{path}:{line_no}: 落子格式应为 行,列") from None
+            positions.append({"category": fields[0], "name": fields[1], "moves": moves, "best": best})
+    return positions
+
+def build_position(moves, board_size=BOARD_SIZE):
+    """按落子序列（黑方先行）摆出局面"""
+    position = Position(board_size)
+    for row, col in moves:
+        if not (0 <= row < board_size and 0 <= col < board_size) or not position.is_empty(row, col):
+            raise ValueError(f"非法落子: {row},{col}")
+        position.place(row, col, position.side_to_move)
+    return position
+
+def peak_rss_mb():
+    """当前进程及其已结束子进程中的最大常驻内存（MB），不支持的平台返回None"""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux以KB为单位，macOS以字节为单位
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_engine(task):
+    """在子进程中让一个引擎搜索所有局面"""
+    spec, limits, positions, board_size, seed, verbose, metrics_path, profile = task
+    random.seed(seed)
+    stats = None
+    if metrics_path or profile:
+        stats = StatsSink()
+        sinks = [stats, JsonLinesSink(metrics_path)] if metrics_path else [stats]
+        metrics.enable(sinks, profile=profile)
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    results = []
+    with output:
+        engine = create_engine(spec)
+        # 只测搜索本身，开局局面不使用开局库
+        engine.use_book = False
+        limits = limits or engine.default_limits()
+        for item in positions:
+            position = build_position(item["moves"], board_size)
+            result = engine.search(position, limits)
+            move = list(result.move) if result.move is not None else None
+            results.append({
+                "category": item["category"],
+                "name": item["name"],
+                "move": move,
+                "solved": move in [list(m) for m in item["best"]] if item["best"] else None,
+                "time": result.time,
+                "nodes": result.nodes,
+                "nps": result.nps,
+                "depth": result.depth,
+            })
+    metrics.disable()
+
+    total_time = sum(r["time"] for r in results)
+    total_nodes = sum(r["nodes"] for r in results)
+    tactical = [r["solved"] for r in results if r["solved"] is not None]
+    return {
+        "engine": spec,
+        "limits": limits.model_dump(exclude_none=True),
+        "time": total_time,
+        "nodes": total_nodes,
+        "nps": total_nodes / total_time if total_time > 0 else 0,
+        "peak_rss_mb": peak_rss_mb(),
+        "solved": sum(tactical),
+        "tactical": len(tactical),
+        "stats": stats.stats if stats else None,
+        "positions": results,
+    }
+
+def engine_limits(spec, time=None, nodes=None, depth=None):
+    """选择预算：命令行给出任一预算时所有引擎使用该预算；
+    否则不带参数的引擎使用 DEFAULT_BUDGETS，带参数的引擎（如 minimax:depth=3）按参数使用引擎自己的默认预算（返回None）
+    """
+    if time is not None or nodes is not None or depth is not None:
+        return SearchLimits(time=time, nodes=nodes, depth=depth)
+    name, kwargs = parse_engine_spec(spec)
+    if kwargs:
+        return None
+    return DEFAULT_BUDGETS.get(name)
+
+def run_benchmark(engines, positions, time=None, nodes=None, depth=None, board_size=BOARD_SIZE, seed=0, verbose=False,
+                  metrics_path=None, profile=None):
+    """依次在独立子进程中运行每个引擎，返回每个引擎的结果列表
+
+    metrics_path 或 profile 不为空时开启埋点（会略微降低速度，不宜与未开启埋点的结果比较）。
+    """
+    reports = []
+    for spec in engines:
+        task = (spec, engine_limits(spec, time, nodes, depth), positions, board_size, seed, verbose,
+                metrics_path, profile)
+        # 每个引擎一个新进程，峰值内存互不影响；工作进程不是守护进程，MCTS可以在其中创建进程池
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            report = executor.submit(run_engine, task).result()
+        reports.append(report)
+        print(f"{spec}: {report['time']:.2f}秒，{report['nodes']}节点，"
+              f"战术题 {report['solved']}/{report['tactical']}")
+    return reports
+
+def compare(reports, baseline, threshold):
+    """与基准结果比较，返回 (回退列表, 落子变化列表)
+
+    每秒节点数比基准下降超过threshold（比例）的引擎计为回退；落子变化只做提示。
+    """
+    previous = {r["engine"]: r for r in baseline["engines"]}
+    regressions = []
+    changes = []
+    for report in reports:
+        old = previous.get(report["engine"])
+        if old is None:
+            continue
+        if old["nps"] > 0 and report["nps"] < old["nps"] * (1 - threshold):
+            regressions.append((report["engine"], old["nps"], report["nps"]))
+        old_moves = {p["name"]: p["move"] for p in old["positions"]}
+        for p in report["positions"]:
+            if p["name"] in old_moves and old_moves[p["name"]] != p["move"]:
+                changes.append((report["engine"], p["name"], old_moves[p["name"]], p["move"]))
+    return regressions, changes
+
+def _format_move(move):
+    return f"{move[0]},{move[1]}" if move else "-"
+
+def print_report(reports):
+    for report in reports:
+        rss = report["peak_rss_mb"]
+        print(f"\n{report['engine']}  预算: {report['limits'] or '无限制'}  "
+              f"峰值内存: {f'{rss:.1f}MB' if rss is not None else '未知'}")
+        print(f"{'类别':<8}{'局面':<18}{'落子':>7}{'用时(秒)':>10}{'节点':>10}{'节点/秒':>12}{'深度':>6}  结果")
+        for p in report["positions"]:
+            verdict = {True: "解出", False: "未解出", None: ""}[p["solved"]]
+            print(f"{p['category']:<10}{p['name']:<20}{_format_move(p['move']):>7}{p['time']:>12.3f}"
+                  f"{p['nodes']:>10}{p['nps']:>13.0f}{p['depth']:>7}  {verdict}")
+        print(f"合计: {report['time']:.3f}秒，{report['nodes']}节点，{report['nps']:.0f}节点/秒，"
+              f"战术题 {report['solved']}/{report['tactical']}")
+        if report["stats"]:
+            counters = '，'.join(f"{k}={v}" for k, v in report["stats"]["counters"].items())
+            timers = '，'.join(f"{k}={v:.3f}秒" for k, v in report["stats"]["timers"].items())
+            print(f"埋点: {counters}" + (f"；{timers}" if timers else ""))
+
+def _git_commit():
+    """当前提交的哈希，不在git仓库中时返回None"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="引擎基准测试：固定预算下的速度、内存和落子")
+    parser.add_argument('engines', nargs='*', default=list(DEFAULT_BUDGETS),
+                        help="引擎配置，如 classical、minimax:depth=3，默认测试全部引擎")
+    parser.add_argument('--positions', default=POSITIONS_FILE, help="局面文件")
+    parser.add_argument('--category', action='append', help="只测试指定类别的局面（可重复）")
+    parser.add_argument('--time', type=float, help="每个局面的思考时间（秒）")
+    parser.add_argument('--nodes', type=int, help="每个局面的节点数")
+    parser.add_argument('--depth', type=int, help="每个局面的搜索深度")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--output', help="把结果写入JSON文件")
+    parser.add_argument('--compare', help="与之前的JSON结果比较")
+    parser.add_argument('--threshold', type=float, default=0.1, help="每秒节点数下降超过该比例时视为回退")
+    parser.add_argument('--metrics', help="开启埋点，把每次搜索的计数、计时和事件追加到JSON lines文件")
+    parser.add_argument('--profile', choices=['cprofile', 'pyinstrument'], help="为每次搜索开启性能分析，结果在 profiles/ 中")
+    parser.add_argument('--verbose', action='store_true', help="显示引擎自身的输出")
+    args = parser.parse_args(argv)
+
+    engines = list(dict.fromkeys(args.engines))
+    for spec in engines:
+        try:
+            parse_engine_spec(spec)
+        except ValueError as e:
+            parser.error(str(e))
+    positions = load_positions(args.positions)
+    if args.category:
+        positions = [p for p in positions if p["category"] in args.category]
+    if not positions:
+        parser.error("没有可测试的局面")
+
+    reports = run_benchmark(engines, positions, time=args.time, nodes=args.nodes, depth=args.depth,
+                            seed=args.seed, verbose=args.verbose, metrics_path=args.metrics, profile=args.profile)
+    print_report(reports)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"commit": _git_commit(), "config": vars(args), "engines": reports}, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions, changes = compare(reports, baseline, args.threshold)
+        print(f"\n与 {args.compare}（提交 {baseline.get('commit') or '未知'}）比较:")
+        for engine, name, old, new in changes:
+            print(f"  落子变化 {engine} {name}: {_format_move(old)} -> {_format_move(new)}")
+        for engine, old, new in regressions:
+            print(f"  性能回退 {engine}: {old:.0f} -> {new:.0f} 节点/秒 ({new / old - 1:+.1%})")
+        if not changes and not regressions:
+            print("  无变化")
+        if regressions:
+            return 1
+    return 0
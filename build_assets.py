@@ -0,0 +1,10 @@
+#!/usr/bin/env python
+"""
+Build prebuilt BAM/TXO assets for the 3D game.
+"""
+
+import sys
+from utils.asset_pipeline import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+#!/usr/bin/env python
+"""
+Build the opening book from engine self-play.
+"""
+
+import sys
+from utils.opening_book import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,10 +3,15 @@
 """
 import pygame
 import sys
+import time
+import sqlite3
 from utils.chessboard import ChessBoard
 from utils.constants import *
+from utils.game_record import save_game, load_last_game, replay
+from utils.game_archive import GameArchive, archive_game
 from .ui import GameUI
 from Gomoku_ai_classical.ai import AIPlayer
+from utils.remote_ai import RemoteAI, server_address
 from utils import get_board_position_from_mouse
 
 class GobangGame:
@@ -19,7 +24,9 @@ class GobangGame:
         
         # 初始化组件
         self.ui = GameUI()
-        self.ai_player = AIPlayer()
+        # 配置了引擎服务时由服务端计算
+        address = server_address()
+        self.ai_player = RemoteAI(address, "classical") if address else AIPlayer()
         
         # 游戏状态
         self.game_state = GAME_STATE_MENU
@@ -28,6 +35,17 @@ class GobangGame:
         self.current_player = PLAYER_BLACK
         self.player_side = PLAYER_BLACK
         
+        # 渲染状态：只在状态变化或输入后重绘
+        self.needs_redraw = True
+        self.full_redraw = True
+        self.last_drawn_state = None
+        self.last_key_time = {}
+        
+        # 开局浏览：打开时持有对局库连接，按局面缓存查询结果
+        self.explorer = None
+        self.explorer_moves = []
+        self.explorer_key = None
+        
         # 初始化棋盘
         self.reset_game()
     
@@ -38,6 +56,19 @@ class GobangGame:
         self.board = self.chess_board.board
         self.current_player = PLAYER_BLACK
         self.ai_player.thinking = False
+        self.ai_player.stop_pondering()
+        # 棋谱：每手用时（毫秒）、是否已保存、是否在回放
+        self.move_times = []
+        self.turn_start = time.perf_counter()
+        self.record_saved = False
+        self.replaying = False
+        self.request_redraw(full=True)
+    
+    def request_redraw(self, full=False):
+        """标记需要重绘，full为True时整屏重绘"""
+        self.needs_redraw = True
+        if full:
+            self.full_redraw = True
     
     def switch_player(self):
         """切换玩家"""
@@ -48,9 +79,80 @@ class GobangGame:
         if self.chess_board.check_board_winner():
             if self.chess_board.winner != 0:
                 print(f"玩家{self.chess_board.winner}获胜！")
+                self.ai_player.stop_pondering()
+                self.save_record()
                 return True
             return False
     
+    def record_move_time(self):
+        """记录刚落下一手的用时，悔棋后重新落子时覆盖被撤回的用时"""
+        now = time.perf_counter()
+        del self.move_times[len(self.chess_board.move_history) - 1:]
+        self.move_times.append(round((now - self.turn_start) * 1000))
+        self.turn_start = now
+    
+    def save_record(self):
+        """对局结束时把棋谱追加到 GAME_RECORD_PATH（每局只保存一次，回放的对局不保存）"""
+        if not GAME_RECORD_AUTOSAVE or self.record_saved or self.replaying:
+            return
+        self.record_saved = True
+        ai_name = "classical"
+        meta = {"black": "human" if self.player_side == PLAYER_BLACK else ai_name,
+                "white": "human" if self.player_side == PLAYER_WHITE else ai_name}
+        save_game(self.chess_board, self.move_times, meta)
+        archive_game(self.chess_board, self.move_times, meta)
+        self.explorer_key = None
+    
+    def toggle_explorer(self):
+        """打开或关闭开局浏览面板"""
+        if self.explorer is None:
+            try:
+                self.explorer = GameArchive(GAME_ARCHIVE_PATH)
+            except (sqlite3.Error, OSError) as e:
+                print(f"打开对局库失败: {e}")
+                return
+            print(f"开局浏览：对局库共{len(self.explorer)}局")
+        else:
+            self.explorer.close()
+            self.explorer = None
+        self.explorer_key = None
+        self.request_redraw(full=True)
+    
+    def update_explorer(self):
+        """局面变化时重新查询对局库，返回是否需要整屏重绘"""
+        position = self.chess_board.position
+        key = (position.size, position.hash)
+        if key == self.explorer_key:
+            return False
+        self.explorer_key = key
+        self.explorer_moves = self.explorer.explore(position, GAME_ARCHIVE_EXPLORER_MOVES)
+        return True
+    
+    def start_replay(self):
+        """载入最近保存的一局进行回放：D键前进一手，U键后退一手"""
+        record = load_last_game()
+        if record is None:
+            print(f"没有可回放的棋谱: {GAME_RECORD_PATH}")
+            return
+        self.ai_player.stop_pondering()
+        self.board_size = record.size
+        self.chess_board = replay(record)
+        self.board = self.chess_board.board
+        self.current_player = PLAYER_BLACK
+        self.replaying = True
+        self.request_redraw(full=True)
+        print(f"回放棋谱：共{len(record)}手，D键前进，U键后退，R键结束回放")
+    
+    def step_replay(self, forward):
+        """回放中前进或后退一手"""
+        result = self.chess_board.redo_move() if forward else self.chess_board.undo_move()
+        if result:
+            row, col, player = result
+            if forward:
+                self.current_player = PLAYER_WHITE if player == PLAYER_BLACK else PLAYER_BLACK
+            else:
+                self.current_player = player
+    
     def place_piece(self, row, col):
         """放置棋子"""
         return self.chess_board.place_stone(row, col, self.current_player)
@@ -96,16 +198,17 @@ class GobangGame:
         print("AI开始思考...")
         
         # 更新显示，显示"AI思考中..."
-        self.ui.draw_background(self.screen)
-        self.ui.draw_board(self.screen, self.board_size)
-        self.ui.draw_pieces(self.screen, self.board, self.chess_board.winning_line, self.board_size)
-        self.ui.draw_game_info(self.screen, self.current_player, self.chess_board.winner, 
-                              self.chess_board.move_history, self.chess_board.undo_stack, True, self.player_side)
-        pygame.display.flip()
+        self.draw_playing(ai_thinking=True)
         
-        self.chess_board = self.ai_player.get_next_chessboard(self.chess_board, PLAYER_BLACK if self.current_player == PLAYER_BLACK else PLAYER_WHITE)
+        ai_side = PLAYER_BLACK if self.current_player == PLAYER_BLACK else PLAYER_WHITE
+        self.chess_board = self.ai_player.get_next_chessboard(self.chess_board, ai_side)
+        self.record_move_time()
         if not self.check_winner():
             self.switch_player()
+            # 玩家思考时后台搜索玩家可能的应手
+            if PONDER_ENABLED:
+                self.ai_player.ponder(self.chess_board.position, ai_side)
+        self.request_redraw()
         
     
     def handle_menu_events(self, event):
@@ -149,13 +252,14 @@ class GobangGame:
     def handle_game_events(self, event):
         """处理游戏事件"""
         if event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1 and not self.ai_player.thinking and self.chess_board.winner == 0:
+            if event.button == 1 and not self.ai_player.thinking and self.chess_board.winner == 0 and not self.replaying:
                 # 只有在玩家回合才能下棋
                 if self.current_player == self.player_side:
                     row, col = get_board_position_from_mouse(event.pos, self.ui.board_x, self.ui.board_y, self.board_size)
                     if row is not None and col is not None:
                         if self.place_piece(row, col):
                             print(f"玩家在({row},{col})下棋成功")
+                            self.record_move_time()
                             if self.check_winner():
                                 print(f"玩家{self.chess_board.winner}获胜！")
                             else:
@@ -171,19 +275,30 @@ class GobangGame:
             
             self.last_key_time[event.key] = current_time
             
-            if event.key == pygame.K_r:  # R键重新开始
+            if self.replaying and event.key in (pygame.K_u, pygame.K_d):  # 回放中U/D键逐手翻看
+                self.step_replay(forward=event.key == pygame.K_d)
+                
+            elif event.key == pygame.K_r:  # R键重新开始
                 print("R键 - 重新开始游戏")
                 self.reset_game()
                 if self.player_side == PLAYER_WHITE:
                     pygame.time.wait(500)
                     self.ai_move()
                 
+            elif event.key == pygame.K_l:  # L键回放最近保存的棋谱
+                if not self.ai_player.thinking:
+                    self.start_replay()
+                
+            elif event.key == pygame.K_e:  # E键打开/关闭开局浏览
+                self.toggle_explorer()
+                
             elif event.key == pygame.K_m:  # M键返回菜单
                 print("M键 - 返回菜单")
                 self.game_state = GAME_STATE_MENU
                 
             elif event.key == pygame.K_u:  # U键撤回
                 if not self.ai_player.thinking and self.chess_board.has_moves_to_undo() and self.chess_board.winner == 0:
+                    self.ai_player.stop_pondering()
                     # 撤回两步（玩家的一步 + AI的一步）
                     moves_to_undo = min(2, len(self.chess_board.move_history))
                     for _ in range(moves_to_undo):
@@ -208,17 +323,72 @@ class GobangGame:
                 print("ESC键 - 返回菜单")
                 self.game_state = GAME_STATE_MENU
     
+    def draw_playing(self, ai_thinking=None):
+        """绘制对局画面并只提交脏矩形"""
+        if ai_thinking is None:
+            ai_thinking = self.ai_player.thinking
+        if self.explorer is not None and self.update_explorer():
+            self.full_redraw = True
+        dirty = self.ui.draw_game(self.screen, self.board, self.chess_board.winning_line, self.board_size,
+                                  self.current_player, self.chess_board.winner,
+                                  self.chess_board.move_history, self.chess_board.undo_stack,
+                                  ai_thinking, self.player_side, full_redraw=self.full_redraw,
+                                  explorer=self.explorer_moves if self.explorer is not None else None)
+        self.full_redraw = False
+        if dirty:
+            pygame.display.update(dirty)
+    
+    def draw(self):
+        """根据当前状态绘制画面"""
+        state = self.game_state
+        if state != self.last_drawn_state:
+            self.full_redraw = True
+            self.last_drawn_state = state
+        
+        if state == GAME_STATE_PLAYING:
+            self.draw_playing()
+        elif self.full_redraw:
+            if state == GAME_STATE_MENU:
+                self.ui.draw_menu(self.screen)
+            elif state == GAME_STATE_SELECT_SIZE:
+                self.ui.draw_size_selection(self.screen)
+            elif state == GAME_STATE_SELECT_SIDE:
+                self.ui.draw_side_selection(self.screen)
+            self.full_redraw = False
+            pygame.display.flip()
+        
+        self.needs_redraw = False
+    
+    def is_ai_turn(self):
+        """是否轮到AI落子"""
+        return (self.game_state == GAME_STATE_PLAYING and
+                self.current_player != self.player_side and
+                self.chess_board.winner == 0 and
+                not self.replaying and
+                not self.ai_player.thinking)
+    
     def run(self):
         """运行游戏主循环"""
         running = True
         
         while running:
+            events = pygame.event.get()
+            # 空闲时阻塞等待输入，不占用CPU
+            if not events and not self.needs_redraw and not self.is_ai_turn():
+                events = [pygame.event.wait()]
+            
             # 事件处理
-            for event in pygame.event.get():
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
+                    continue
                 
-                elif self.game_state == GAME_STATE_MENU:
+                if event.type in (pygame.VIDEOEXPOSE, pygame.ACTIVEEVENT):
+                    self.request_redraw(full=True)
+                elif event.type != pygame.MOUSEMOTION:
+                    self.request_redraw()
+                
+                if self.game_state == GAME_STATE_MENU:
                     self.handle_menu_events(event)
                 
                 elif self.game_state == GAME_STATE_SELECT_SIZE:
@@ -231,34 +401,15 @@ class GobangGame:
                     self.handle_game_events(event)
             
             # 绘制
-            if self.game_state == GAME_STATE_MENU:
-                self.ui.draw_menu(self.screen)
+            if self.needs_redraw or self.game_state != self.last_drawn_state:
+                self.draw()
             
-            elif self.game_state == GAME_STATE_SELECT_SIZE:
-                self.ui.draw_size_selection(self.screen)
-            
-            elif self.game_state == GAME_STATE_SELECT_SIDE:
-                self.ui.draw_side_selection(self.screen)
-            
-            elif self.game_state == GAME_STATE_PLAYING:
-                self.ui.draw_background(self.screen)
-                self.ui.draw_board(self.screen, self.board_size)
-                self.ui.draw_pieces(self.screen, self.board, self.chess_board.winning_line, self.board_size)
-                self.ui.draw_game_info(self.screen, self.current_player, self.chess_board.winner, 
-                                      self.chess_board.move_history, self.chess_board.undo_stack, 
-                                      self.ai_player.thinking, self.player_side)
-                
-                # AI回合处理
-                if (self.current_player != self.player_side and
-                        self.chess_board.winner == 0 and
-                        not self.ai_player.thinking):
-                    pygame.time.wait(40)
-                    self.ai_move()
+            # AI回合处理
+            if self.is_ai_turn():
+                pygame.time.wait(40)
+                self.ai_move()
             
-            pygame.display.flip()
             self.clock.tick(60)
         
         pygame.quit()
         sys.exit()
-
-
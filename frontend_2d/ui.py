@@ -4,6 +4,14 @@
 import pygame
 from utils.constants import *
 from utils import load_background_image, load_fonts
+from utils.game_record import format_move
+
+# 顶部信息栏区域（当前玩家、按键提示、AI思考状态）
+INFO_RECT = pygame.Rect(0, 0, SCREEN_WIDTH, 130)
+# 底部开局浏览面板区域
+EXPLORER_RECT = pygame.Rect(0, SCREEN_HEIGHT - 58, SCREEN_WIDTH, 58)
+STONE_RADIUS = 15
+WIN_RING_RADIUS = 18
 
 class GameUI:
     """游戏界面类"""
@@ -13,6 +21,69 @@ class GameUI:
         self.font_large, self.font_medium, self.font_small = load_fonts()
         self.board_x = (SCREEN_WIDTH - 15 * CELL_SIZE) // 2  # 仅用于初始位置
         self.board_y = 120
+        
+        # 静态图层缓存
+        self._overlay = None          # 半透明覆盖层
+        self._screen_cache = {}       # 菜单/选择界面整屏缓存
+        self._board_layers = {}       # 按棋盘大小缓存的背景+棋盘+网格
+        self._stone_sprites = {}      # 预渲染的棋子精灵
+        
+        # 脏矩形状态：上一次绘制的棋盘快照和信息栏内容
+        self._last_board_size = None
+        self._last_cells = {}
+        self._last_info = None
+    
+    def _get_overlay(self):
+        """获取缓存的半透明覆盖层"""
+        if self._overlay is None:
+            self._overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            self._overlay.set_alpha(128)
+            self._overlay.fill(LIGHT_BROWN)
+        return self._overlay
+    
+    def _get_cached_screen(self, key, render):
+        """获取缓存的整屏画面，不存在时调用render生成"""
+        surface = self._screen_cache.get(key)
+        if surface is None:
+            surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+            self.draw_background(surface)
+            surface.blit(self._get_overlay(), (0, 0))
+            render(surface)
+            self._screen_cache[key] = surface
+        return surface
+    
+    def _get_stone_sprite(self, piece, highlighted):
+        """获取预渲染的棋子精灵"""
+        key = (piece, highlighted)
+        sprite = self._stone_sprites.get(key)
+        if sprite is None:
+            sprite = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA).convert_alpha()
+            center = (CELL_SIZE // 2, CELL_SIZE // 2)
+            piece_color = BLACK if piece == PIECE_BLACK else WHITE
+            
+            # 如果是获胜的五子，添加金色边框
+            if highlighted:
+                pygame.draw.circle(sprite, GOLD, center, WIN_RING_RADIUS, 4)
+            
+            pygame.draw.circle(sprite, piece_color, center, STONE_RADIUS)
+            pygame.draw.circle(sprite, BLACK, center, STONE_RADIUS, 2)
+            self._stone_sprites[key] = sprite
+        return sprite
+    
+    def _get_board_layer(self, board_size):
+        """获取指定大小棋盘的静态图层（背景、棋盘、网格、天元）"""
+        layer = self._board_layers.get(board_size)
+        if layer is None:
+            layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+            self.draw_background(layer)
+            self._render_board(layer, board_size)
+            self._board_layers[board_size] = layer
+        return layer
+    
+    def _cell_rect(self, row, col):
+        """获取格子在屏幕上的矩形区域"""
+        return pygame.Rect(self.board_x + col * CELL_SIZE, self.board_y + row * CELL_SIZE,
+                           CELL_SIZE, CELL_SIZE)
     
     def draw_background(self, screen):
         """绘制背景"""
@@ -23,18 +94,14 @@ class GameUI:
     
     def draw_menu(self, screen):
         """绘制开始菜单"""
-        self.draw_background(screen)
-        
-        # 绘制半透明覆盖层
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill(LIGHT_BROWN)
-        screen.blit(overlay, (0, 0))
-        
+        screen.blit(self._get_cached_screen('menu', self._render_menu), (0, 0))
+    
+    def _render_menu(self, surface):
+        """渲染开始菜单的文字内容"""
         # 标题
         title_text = self.font_large.render("五子棋人机对战", True, BLACK)
         title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, 150))
-        screen.blit(title_text, title_rect)
+        surface.blit(title_text, title_rect)
         
         # 游戏说明
         rules = [
@@ -45,7 +112,7 @@ class GameUI:
             "",
             "按键说明：",
             "U键: 撤回",
-            "D键: 恢复", 
+            "D键: 恢复",
             "R键: 重新开始",
             "M键: 返回菜单",
             "",
@@ -56,61 +123,59 @@ class GameUI:
         for rule in rules:
             rule_text = self.font_small.render(rule, True, BLACK)
             rule_rect = rule_text.get_rect(center=(SCREEN_WIDTH // 2, y_offset))
-            screen.blit(rule_text, rule_rect)
+            surface.blit(rule_text, rule_rect)
             y_offset += 30
     
+    def _size_buttons(self):
+        """棋盘大小选择按钮"""
+        sizes = [13, 14, 15]
+        return [(size, pygame.Rect(SCREEN_WIDTH // 2 - 150, 250 + i * 100, 300, 60))
+                for i, size in enumerate(sizes)]
+    
     def draw_size_selection(self, screen):
         """绘制棋盘大小选择界面"""
-        self.draw_background(screen)
-        
-        # 绘制半透明覆盖层
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill(LIGHT_BROWN)
-        screen.blit(overlay, (0, 0))
-        
+        screen.blit(self._get_cached_screen('select_size', self._render_size_selection), (0, 0))
+        return [rect for _, rect in self._size_buttons()]
+    
+    def _render_size_selection(self, surface):
+        """渲染棋盘大小选择界面的标题和按钮"""
         # 标题
         title_text = self.font_medium.render("选择棋盘大小", True, BLACK)
         title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, 150))
-        screen.blit(title_text, title_rect)
+        surface.blit(title_text, title_rect)
         
-        sizes = [13, 14, 15]
-        buttons = []
-        for i, size in enumerate(sizes):
-            rect = pygame.Rect(SCREEN_WIDTH // 2 - 150, 250 + i * 100, 300, 60)
-            pygame.draw.rect(screen, WHITE, rect)
-            pygame.draw.rect(screen, BLACK, rect, 2)
+        for size, rect in self._size_buttons():
+            pygame.draw.rect(surface, WHITE, rect)
+            pygame.draw.rect(surface, BLACK, rect, 2)
             text = self.font_medium.render(f"{size} x {size}", True, BLACK)
             text_rect = text.get_rect(center=rect.center)
-            screen.blit(text, text_rect)
-            buttons.append(rect)
-        
-        return buttons
+            surface.blit(text, text_rect)
+    
+    def _side_buttons(self):
+        """执棋方选择按钮"""
+        button1_rect = pygame.Rect(SCREEN_WIDTH // 2 - 150, 250, 300, 60)
+        button2_rect = pygame.Rect(SCREEN_WIDTH // 2 - 150, 370, 300, 60)
+        return button1_rect, button2_rect
     
-
     def draw_side_selection(self, screen):
         """绘制执棋方选择界面"""
-        self.draw_background(screen)
-        
-        # 绘制半透明覆盖层
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill(LIGHT_BROWN)
-        screen.blit(overlay, (0, 0))
-        
+        screen.blit(self._get_cached_screen('select_side', self._render_side_selection), (0, 0))
+        return self._side_buttons()
+    
+    def _render_side_selection(self, surface):
+        """渲染执棋方选择界面的标题和按钮"""
         # 标题
         title_text = self.font_medium.render("选择执棋方", True, BLACK)
         title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, 150))
-        screen.blit(title_text, title_rect)
+        surface.blit(title_text, title_rect)
         
         # 按钮
-        button1_rect = pygame.Rect(SCREEN_WIDTH // 2 - 150, 250, 300, 60)
-        button2_rect = pygame.Rect(SCREEN_WIDTH // 2 - 150, 370, 300, 60)
+        button1_rect, button2_rect = self._side_buttons()
         
-        pygame.draw.rect(screen, WHITE, button1_rect)
-        pygame.draw.rect(screen, BLACK, button1_rect, 2)
-        pygame.draw.rect(screen, WHITE, button2_rect)
-        pygame.draw.rect(screen, BLACK, button2_rect, 2)
+        pygame.draw.rect(surface, WHITE, button1_rect)
+        pygame.draw.rect(surface, BLACK, button1_rect, 2)
+        pygame.draw.rect(surface, WHITE, button2_rect)
+        pygame.draw.rect(surface, BLACK, button2_rect, 2)
         
         text1 = self.font_medium.render("执黑先行", True, BLACK)
         text2 = self.font_medium.render("执白后行", True, BLACK)
@@ -118,45 +183,45 @@ class GameUI:
         text1_rect = text1.get_rect(center=button1_rect.center)
         text2_rect = text2.get_rect(center=button2_rect.center)
         
-        screen.blit(text1, text1_rect)
-        screen.blit(text2, text2_rect)
-        
-        return button1_rect, button2_rect
+        surface.blit(text1, text1_rect)
+        surface.blit(text2, text2_rect)
     
     def draw_board(self, screen, board_size):
-        """绘制棋盘"""
+        """绘制棋盘（背景+棋盘静态层）"""
+        self.board_x = (SCREEN_WIDTH - board_size * CELL_SIZE) // 2
+        self.board_y = 120
+        screen.blit(self._get_board_layer(board_size), (0, 0))
+    
+    def _render_board(self, surface, board_size):
+        """将棋盘背景、网格线和天元渲染到静态图层"""
         board_x = (SCREEN_WIDTH - board_size * CELL_SIZE) // 2
         board_y = 120
-        self.board_x = board_x
-        self.board_y = board_y
         
         # 绘制棋盘背景
         board_rect = pygame.Rect(board_x - 20, board_y - 20,
                                  board_size * CELL_SIZE + 40, board_size * CELL_SIZE + 40)
-        pygame.draw.rect(screen, BROWN, board_rect)
+        pygame.draw.rect(surface, BROWN, board_rect)
         
         # 绘制网格线
         for i in range(board_size):
             # 垂直线
             start_x = board_x + CELL_SIZE // 2
-            end_x = board_x + CELL_SIZE // 2
             start_y = board_y + CELL_SIZE // 2
             end_y = board_y + (board_size - 1) * CELL_SIZE + CELL_SIZE // 2
             
             line_x = start_x + i * CELL_SIZE
-            pygame.draw.line(screen, BLACK, (line_x, start_y), (line_x, end_y), 2)
+            pygame.draw.line(surface, BLACK, (line_x, start_y), (line_x, end_y), 2)
             
             # 水平线
-            start_x = board_x + CELL_SIZE // 2
             end_x = board_x + (board_size - 1) * CELL_SIZE + CELL_SIZE // 2
             line_y = start_y + i * CELL_SIZE
-            pygame.draw.line(screen, BLACK, (start_x, line_y), (end_x, line_y), 2)
+            pygame.draw.line(surface, BLACK, (start_x, line_y), (end_x, line_y), 2)
         
         # 绘制天元
         center = board_size // 2
         x = board_x + center * CELL_SIZE + CELL_SIZE // 2
         y = board_y + center * CELL_SIZE + CELL_SIZE // 2
-        pygame.draw.circle(screen, BLACK, (x, y), 4)
+        pygame.draw.circle(surface, BLACK, (x, y), 4)
     
     def draw_pieces(self, screen, board, winning_five=None, board_size=None):
         """绘制棋子"""
@@ -164,24 +229,64 @@ class GameUI:
             winning_five = []
         if board_size is None:
             board_size = len(board)
-        board_x = self.board_x
-        board_y = self.board_y
         for row in range(board_size):
             for col in range(board_size):
                 if board[row][col] != PIECE_EMPTY:
-                    x = board_x + col * CELL_SIZE + CELL_SIZE // 2
-                    y = board_y + row * CELL_SIZE + CELL_SIZE // 2
-                    
-                    # 判断棋子颜色
-                    piece_color = BLACK if board[row][col] == PIECE_BLACK else WHITE
-                    
-                    # 如果是获胜的五子，添加金色边框
-                    if (row, col) in winning_five:
-                        pygame.draw.circle(screen, GOLD, (x, y), 18, 4)
-                    
-                    # 绘制棋子
-                    pygame.draw.circle(screen, piece_color, (x, y), 15)
-                    pygame.draw.circle(screen, BLACK, (x, y), 15, 2)
+                    sprite = self._get_stone_sprite(board[row][col], (row, col) in winning_five)
+                    screen.blit(sprite, self._cell_rect(row, col))
+    
+    def draw_game(self, screen, board, winning_five, board_size, current_player, winner,
+                  move_history, undo_stack, ai_thinking, player_side, full_redraw=False, explorer=None):
+        """绘制对局画面，只重绘发生变化的区域
+        
+        explorer 为开局浏览的落子统计（GameArchive.explore 的结果），None 时不显示面板；
+        统计变化时调用方应要求整屏重绘。
+        
+        Returns:
+            list: 本次需要提交到显示器的脏矩形
+        """
+        winning = set(winning_five or [])
+        cells = {(row, col): (board[row][col], (row, col) in winning)
+                 for row in range(board_size) for col in range(board_size)
+                 if board[row][col] != PIECE_EMPTY}
+        info = (current_player, winner, len(move_history), len(undo_stack), ai_thinking, player_side)
+        
+        if full_redraw or self._last_board_size != board_size:
+            self.draw_board(screen, board_size)
+            self.draw_pieces(screen, board, winning_five, board_size)
+            self.draw_game_info(screen, current_player, winner, move_history, undo_stack,
+                                ai_thinking, player_side)
+            if explorer is not None:
+                self.draw_explorer(screen, explorer, board_size)
+            self._last_board_size = board_size
+            self._last_cells = cells
+            self._last_info = info
+            return [screen.get_rect()]
+        
+        layer = self._get_board_layer(board_size)
+        dirty = [self._cell_rect(row, col)
+                 for row, col in set(cells) | set(self._last_cells)
+                 if cells.get((row, col)) != self._last_cells.get((row, col))]
+        info_changed = info != self._last_info
+        if info_changed:
+            dirty.append(INFO_RECT)
+        if not dirty:
+            return []
+        
+        # 用静态图层擦除脏区域，再补画落在脏区域内的棋子
+        for rect in dirty:
+            screen.blit(layer, rect, rect)
+        for (row, col), (piece, highlighted) in cells.items():
+            cell_rect = self._cell_rect(row, col)
+            if cell_rect.collidelist(dirty) != -1:
+                screen.blit(self._get_stone_sprite(piece, highlighted), cell_rect)
+        if info_changed:
+            self.draw_game_info(screen, current_player, winner, move_history, undo_stack,
+                                ai_thinking, player_side)
+        
+        self._last_cells = cells
+        self._last_info = info
+        return dirty
     
     def draw_game_info(self, screen, current_player, winner, move_history, undo_stack, ai_thinking, player_side):
         """绘制游戏信息"""
@@ -208,7 +313,7 @@ class GameUI:
             undo_text = self.font_small.render(f"U键: 撤回 ({len(move_history)}步)", True, GRAY)
         else:
             undo_text = self.font_small.render("U键: 撤回 (不可用)", True, (160, 160, 160))
-            
+        
         if len(undo_stack) > 0 and not ai_thinking:
             redo_text = self.font_small.render(f"D键: 恢复 ({len(undo_stack)}步)", True, GRAY)
         else:
@@ -223,5 +328,21 @@ class GameUI:
         if ai_thinking and winner == 0 and current_player != player_side:
             thinking_text = self.font_small.render("AI思考中...", True, RED)
             screen.blit(thinking_text, (50, 50))
-
-
+    
+    def draw_explorer(self, screen, entries, board_size):
+        """绘制开局浏览：在棋盘上标出对局库中走过的落子序号，底部面板列出局数和得分率"""
+        for rank, entry in enumerate(entries, 1):
+            rect = self._cell_rect(*entry["move"])
+            pygame.draw.circle(screen, BLUE, rect.center, STONE_RADIUS - 3, 2)
+            label = self.font_small.render(str(rank), True, BLUE)
+            screen.blit(label, label.get_rect(center=rect.center))
+        
+        title = "开局浏览（E键关闭）" if entries else "开局浏览（E键关闭）：对局库中没有该局面"
+        screen.blit(self.font_small.render(title, True, GRAY), (EXPLORER_RECT.x + 20, EXPLORER_RECT.y))
+        x = EXPLORER_RECT.x + 20
+        for rank, entry in enumerate(entries, 1):
+            score = f"{entry['score']:.0%}" if entry["score"] is not None else "-"
+            text = f"{rank}.{format_move(*entry['move'], board_size)} {entry['games']}局 {score}"
+            rendered = self.font_small.render(text, True, BLACK)
+            screen.blit(rendered, (x, EXPLORER_RECT.y + 24))
+            x += rendered.get_width() + 14
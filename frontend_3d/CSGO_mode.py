@@ -2,13 +2,12 @@ from direct.showbase.ShowBase import ShowBase
 from panda3d.core import WindowProperties, Vec3
 from direct.task import Task
 from direct.gui.OnscreenText import OnscreenText
-from frontend_3d.setup_scene import SceneSetup
-from frontend_3d.setup_board import BoardSetup
-from frontend_3d.audio_manager import AudioManager
+from frontend_3d.trigger_zones import TriggerZones
 import sys
 from utils.constants import (
     OPPONENT_MODEL_PATH_RAIDEN, OPPONENT_MODEL_PATH_LULU, OPPONENT_MODEL_PATH_PIKA,
-    OPPONENT_MODEL_POSITION_RAIDEN, OPPONENT_MODEL_POSITION_LULU, OPPONENT_MODEL_POSITION_PIKA
+    OPPONENT_MODEL_POSITION_RAIDEN, OPPONENT_MODEL_POSITION_LULU, OPPONENT_MODEL_POSITION_PIKA,
+    ROAM_TRIGGER_ZONES, ROAM_TRIGGER_RADIUS, ROAM_TRIGGER_CELL_SIZE
 )
 
 class CSGOCameraDemo:
@@ -25,8 +24,10 @@ class CSGOCameraDemo:
         self._init_board()
         self._init_controls()
         self._init_ui()
+        self._init_triggers()
         self._start_tasks()
         self._welcome_voice_played = False  # 欢迎语音，只播放一次
+        self._on_camera_moved()
 
     def _setup_window(self):
         props = WindowProperties()
@@ -41,44 +42,39 @@ class CSGOCameraDemo:
         self.yaw = 0
 
     def _init_audio(self):
-        self.audio_manager = AudioManager(self.loader, self.taskMgr)
+        # 音频管理器由主程序持有，跨模式复用
+        self.audio_manager = self.base.audio_manager
 
     def _init_scene(self):
-        self.scene_setup = SceneSetup(self.loader, self.render, self.taskMgr)
-        self.scene_setup.setup_lighting()
-        self.scene_setup.load_scene()
-        self.ground = self.scene_setup.ground_model
+        # 场景由主程序加载一次，这里只取引用
+        self.scene_setup = self.base.scene_setup
 
     def _init_board(self):
         # 第一个棋盘（classical AI）
-        self.board_setup = BoardSetup(
-            self.loader,
-            self.render,
-            opponent_model_path=OPPONENT_MODEL_PATH_RAIDEN,
-            opponent_model_position=Vec3(*OPPONENT_MODEL_POSITION_RAIDEN)
+        self.board_setup = self.base.get_board(
+            "classical",
+            OPPONENT_MODEL_PATH_RAIDEN,
+            Vec3(*OPPONENT_MODEL_POSITION_RAIDEN)
         )
-        self.board_setup.setup_board()
-        self.board_setup.square_root.setX(-30)
-
         # 第二个棋盘（minimax AI）
-        self.board_setup_2 = BoardSetup(
-            self.loader,
-            self.render,
-            opponent_model_path=OPPONENT_MODEL_PATH_LULU,
-            opponent_model_position=Vec3(*OPPONENT_MODEL_POSITION_LULU)
+        self.board_setup_2 = self.base.get_board(
+            "minimax",
+            OPPONENT_MODEL_PATH_LULU,
+            Vec3(*OPPONENT_MODEL_POSITION_LULU)
         )
-        self.board_setup_2.setup_board()
-        self.board_setup_2.square_root.setX(0)
-
         # 第三个棋盘（MCTS AI）
-        self.board_setup_3 = BoardSetup(
-            self.loader,
-            self.render,
-            opponent_model_path=OPPONENT_MODEL_PATH_PIKA,
-            opponent_model_position=Vec3(*OPPONENT_MODEL_POSITION_PIKA)
+        self.board_setup_3 = self.base.get_board(
+            "mcts",
+            OPPONENT_MODEL_PATH_PIKA,
+            Vec3(*OPPONENT_MODEL_POSITION_PIKA)
         )
-        self.board_setup_3.setup_board()
-        self.board_setup_3.square_root.setX(30)
+        self._place_boards()
+
+    def _place_boards(self):
+        """把三个棋盘摆回漫游场景中的位置并显示（下棋模式会移动和隐藏它们）"""
+        for board, x in ((self.board_setup, -30), (self.board_setup_2, 0), (self.board_setup_3, 30)):
+            board.square_root.setPos(x, 0, 0)
+            board.show()
 
     def _init_controls(self):
         self.mouse_sensitivity = 0.05
@@ -103,48 +99,59 @@ class CSGOCameraDemo:
         self.in_gomoku_area = False
         self.hint_text = None
 
+    def _init_triggers(self):
+        """棋盘周围的触发区域，只在摄像机进出区域时响应"""
+        self.trigger_zones = TriggerZones(
+            ROAM_TRIGGER_CELL_SIZE, on_enter=self._on_enter_gomoku_area, on_exit=self._on_exit_gomoku_area
+        )
+        for board_id, (ai_type, label, center) in enumerate(ROAM_TRIGGER_ZONES, start=1):
+            self.trigger_zones.add_zone(board_id, center, ROAM_TRIGGER_RADIUS, (ai_type, label))
+
     def _start_tasks(self):
         self.taskMgr.add(self.update_camera, "UpdateCameraTask")
         self.last_mouse_pos = None
-        self.taskMgr.add(self.check_gomoku_area, "CheckGomokuArea")
 
     def set_key(self, key, value):
         self.key_map[key] = value
 
     def update_camera(self, task):
-        # 鼠标视角
+        # 鼠标视角：指针偏离窗口中心时才转动
         if self.base.mouseWatcherNode.hasMouse():
-            x = self.base.win.getPointer(0).getX()
-            y = self.base.win.getPointer(0).getY()
+            pointer = self.base.win.getPointer(0)
             win_cx = self.base.win.getXSize() // 2
             win_cy = self.base.win.getYSize() // 2
-            if self.last_mouse_pos is not None:
-                dx = x - win_cx
-                dy = y - win_cy
-                self.yaw -= dx * self.mouse_sensitivity
-                self.pitch -= dy * self.mouse_sensitivity
-                self.pitch = max(-89, min(89, self.pitch))
-                self.base.camera.setHpr(self.yaw, self.pitch, 0)
-            self.base.win.movePointer(0, win_cx, win_cy)
-            self.last_mouse_pos = (win_cx, win_cy)
+            dx = pointer.getX() - win_cx
+            dy = pointer.getY() - win_cy
+            if self.last_mouse_pos is None or dx or dy:
+                if self.last_mouse_pos is not None:
+                    self.yaw -= dx * self.mouse_sensitivity
+                    self.pitch -= dy * self.mouse_sensitivity
+                    self.pitch = max(-89, min(89, self.pitch))
+                    self.base.camera.setHpr(self.yaw, self.pitch, 0)
+                self.base.win.movePointer(0, win_cx, win_cy)
+                self.last_mouse_pos = (win_cx, win_cy)
 
-        # 键盘移动
-        dir_vec = Vec3(0, 0, 0)
-        quat = self.base.camera.getQuat()
-        if self.key_map["w"]:
-            dir_vec += quat.getForward()
-        if self.key_map["s"]:
-            dir_vec -= quat.getForward()
-        if self.key_map["a"]:
-            dir_vec -= quat.getRight()
-        if self.key_map["d"]:
-            dir_vec += quat.getRight()
-        dir_vec.setZ(0)
-        if dir_vec.length() > 0:
-            dir_vec.normalize()
-            self.base.camera.setPos(self.base.camera.getPos() + dir_vec * self.move_speed)
+        # 键盘移动：没有按键时不改动摄像机
+        if any(self.key_map.values()):
+            dir_vec = Vec3(0, 0, 0)
+            quat = self.base.camera.getQuat()
+            if self.key_map["w"]:
+                dir_vec += quat.getForward()
+            if self.key_map["s"]:
+                dir_vec -= quat.getForward()
+            if self.key_map["a"]:
+                dir_vec -= quat.getRight()
+            if self.key_map["d"]:
+                dir_vec += quat.getRight()
+            dir_vec.setZ(0)
+            if dir_vec.length() > 0:
+                dir_vec.normalize()
+                self.base.camera.setPos(self.base.camera.getPos() + dir_vec * self.move_speed)
+                self._on_camera_moved()
+        return Task.cont
 
-        # 实时更新摄像机位置文本
+    def _on_camera_moved(self):
+        """摄像机移动后：限制坐标、更新坐标文本、检查触发区域"""
         pos = self.base.camera.getPos()
 
         # 限制摄像机坐标
@@ -154,54 +161,24 @@ class CSGOCameraDemo:
         self.base.camera.setPos(x, y, z)
 
         self.cam_pos_text.setText(f"Pos: ({x:.2f}, {y:.2f}, {z:.2f})")
-        return Task.cont
+        self.trigger_zones.update((x, y, z))
 
-    def check_gomoku_area(self, task):
-        cam_pos = self.base.camera.getPos()
-        gomoku_center_1 = Vec3(-42, 0, 0)
-        gomoku_center_2 = Vec3(0, 0, 0)
-        gomoku_center_3 = Vec3(42, 0, 0)
-        # 棋盘中心点
-        radius = 20
-        near_board = None
-        if (cam_pos - gomoku_center_1).length() < radius:
-            near_board = 1
-        elif (cam_pos - gomoku_center_2).length() < radius:
-            near_board = 2
-        elif (cam_pos - gomoku_center_3).length() < radius:
-            near_board = 3
+    def _on_enter_gomoku_area(self, zone):
+        ai_type, label = zone.data
+        self.in_gomoku_area = True
+        self.hint_text = OnscreenText(
+            f"Press space to challenge {label} AI", pos=(0, 0.8), scale=0.1, fg=(1,1,0,1), parent=self.base.aspect2d)
+        if not self._welcome_voice_played:
+            self._play_welcome_voice(ai_type=ai_type)
+            self._welcome_voice_played = True
+        self.base.accept("space", self._start_gomoku, [zone.zone_id])
 
-        if near_board:
-            if not self.in_gomoku_area:
-                self.in_gomoku_area = True
-                if near_board == 1:
-                    self.hint_text = OnscreenText(
-                    f"Press space to challenge classical AI", pos=(0, 0.8), scale=0.1, fg=(1,1,0,1), parent=self.base.aspect2d)
-                    if not self._welcome_voice_played:
-                        self._play_welcome_voice(ai_type="classical")
-                        self._welcome_voice_played = True
-                elif near_board == 2:
-                    self.hint_text = OnscreenText(
-                    f"Press space to challenge minimax AI", pos=(0, 0.8), scale=0.1, fg=(1,1,0,1), parent=self.base.aspect2d)
-                    if not self._welcome_voice_played:
-                        self._play_welcome_voice(ai_type="minimax")
-                        self._welcome_voice_played = True
-                elif near_board == 3:
-                    self.hint_text = OnscreenText(
-                    f"Press space to challenge MCTS AI", pos=(0, 0.8), scale=0.1, fg=(1,1,0,1), parent=self.base.aspect2d)
-                    if not self._welcome_voice_played:
-                        self._play_welcome_voice(ai_type="mcts")
-                        self._welcome_voice_played = True
-                self.base.accept("space", lambda: self._start_gomoku(near_board))
-
-        else:
-            if self.in_gomoku_area:
-                self.in_gomoku_area = False
-                if self.hint_text:
-                    self.hint_text.destroy()
-                    self.hint_text = None
-                self.base.ignore("space")
-        return Task.cont
+    def _on_exit_gomoku_area(self, zone):
+        self.in_gomoku_area = False
+        if self.hint_text:
+            self.hint_text.destroy()
+            self.hint_text = None
+        self.base.ignore("space")
 
     def _start_gomoku(self, board_id=1):
         # 集中管理参数
@@ -247,21 +224,47 @@ class CSGOCameraDemo:
             result = self.audio_manager.play_ai_voice("欢迎", volume=1, ai_type=ai_type)
             print(f"欢迎语音播放结果: {result}")
 
+    def suspend(self):
+        """进入下棋模式时暂停漫游：停止任务、隐藏提示和棋盘，场景与资源保留"""
+        self.base.taskMgr.remove("UpdateCameraTask")
+        if self.hint_text:
+            self.hint_text.destroy()
+            self.hint_text = None
+        self.in_gomoku_area = False
+        self.trigger_zones.reset()
+        self.base.ignore("space")
+        for key in self.key_map:
+            self.key_map[key] = False
+        self.cam_pos_text.hide()
+        for board in (self.board_setup, self.board_setup_2, self.board_setup_3):
+            board.hide()
+        # 重置欢迎语音标记
+        self._welcome_voice_played = False
+
+    def resume(self, camera_pos=None, camera_hpr=None):
+        """从下棋模式返回时恢复漫游"""
+        self._setup_window()
+        self._place_boards()
+        self._init_controls()
+        self.cam_pos_text.show()
+        if camera_pos is not None:
+            self.base.camera.setPos(camera_pos)
+        if camera_hpr is not None:
+            self.base.camera.setHpr(camera_hpr)
+            self.yaw = camera_hpr[0]
+            self.pitch = camera_hpr[1]
+        self._on_camera_moved()
+        self._start_tasks()
+        self.audio_manager.play_current_bgm()
+
     def cleanup(self):
-        # 清理UI、任务、模型、墙体、音乐等
+        # 清理UI、任务和按键；场景、棋盘和音频归主程序所有，这里只停止音乐
         if self.hint_text:
             self.hint_text.destroy()
-        self.base.taskMgr.remove("CheckGomokuArea")
+            self.hint_text = None
         self.base.taskMgr.remove("UpdateCameraTask")
+        self.base.ignore("space")
         self.cam_pos_text.destroy()
-        if hasattr(self, "scene_setup"):
-            self.scene_setup.cleanup()
-        if hasattr(self, "board_setup"):
-            self.board_setup.cleanup()
-        if hasattr(self, "board_setup_2"):
-            self.board_setup_2.cleanup()
-        if hasattr(self, "board_setup_3"):
-            self.board_setup_3.cleanup()
 
         # 清理音乐
         if hasattr(self, "audio_manager"):
@@ -0,0 +1,109 @@
+"""AI后台计算服务"""
+import queue
+import threading
+
+class AIService:
+    """在工作线程中运行AI引擎，通过队列把落子(row, col)交回主线程
+
+    工作线程只读取请求时复制的局面快照，不接触场景、音频和UI；
+    主线程任务取出结果后调用回调，由回调负责落子和更新场景。
+    每个请求都有编号，取消（悔棋、重开、离开棋盘）时通知引擎停止，之后到达的旧结果会被丢弃。
+    同一时刻只运行一个工作线程，旧计算未结束时新请求会排队等待。
+    ponder() 让引擎在玩家思考时后台搜索，下一次请求命中预测的应手时几乎立即返回。
+    """
+
+    def __init__(self, ai_player, task_mgr, limits=None):
+        self.ai_player = ai_player
+        self.limits = limits      # 搜索预算，None时使用引擎的默认预算
+        self.task_mgr = task_mgr
+        self._results = queue.Queue()
+        self._request_id = 0
+        self._pending = None      # 等待启动的请求 (编号, 局面快照, 执子方)
+        self._callback = None     # 当前请求的结果回调
+        self._worker = None
+        self._poll_task = None
+
+    def request_move(self, position, player_side, callback):
+        """请求AI计算下一步，完成后在主线程调用 callback(move)
+
+        Args:
+            position: 局面（Position），会被复制一份交给工作线程
+            player_side: AI执子方
+            callback: 参数为(row, col)，计算失败时为None
+        """
+        self.cancel()
+        self._pending = (self._request_id, position.copy(), player_side)
+        self._callback = callback
+        self._start_pending()
+        if self._poll_task is None:
+            self._poll_task = self.task_mgr.add(self._poll_results, "aiResultTask")
+
+    def cancel(self):
+        """取消当前请求，通知引擎尽快结束正在进行的计算，其结果会被丢弃"""
+        self._request_id += 1
+        self._pending = None
+        self._callback = None
+        if self.is_busy():
+            self.ai_player.stop()
+
+    def ponder(self, position, player_side):
+        """AI落子后在玩家思考时后台搜索（由引擎的后台线程进行，不占用工作线程）"""
+        self.ai_player.ponder(position, player_side)
+
+    def stop_pondering(self):
+        """停止后台思考并丢弃其结果（请求交给引擎后后台思考已被接管，这里不会影响它）"""
+        self.ai_player.stop_pondering()
+
+    def is_thinking(self):
+        """是否有尚未交付的请求"""
+        return self._callback is not None
+
+    def is_busy(self):
+        """工作线程是否仍在计算（包括已取消的请求）"""
+        return self._worker is not None and self._worker.is_alive()
+
+    def shutdown(self):
+        """取消请求、停止后台思考和轮询任务（工作线程为守护线程，引擎停止后自行结束）"""
+        self.cancel()
+        self.stop_pondering()
+        if self._poll_task is not None:
+            self.task_mgr.remove(self._poll_task)
+            self._poll_task = None
+
+    def _start_pending(self):
+        """没有工作线程在运行时启动排队的请求"""
+        if self._pending is None or self.is_busy():
+            return
+        request_id, position, player_side = self._pending
+        self._pending = None
+        self._worker = threading.Thread(
+            target=self._run, args=(request_id, position, player_side), daemon=True
+        )
+        self._worker.start()
+
+    def _run(self, request_id, position, player_side):
+        """工作线程：只做计算"""
+        try:
+            move = self.ai_player.search(position, self.limits, player_side).move
+        except Exception as e:
+            print(f"AI计算出错: {e}")
+            move = None
+        self._results.put((request_id, move))
+
+    def _poll_results(self, task):
+        """主线程任务：交付结果，启动排队的请求，全部完成后结束"""
+        while True:
+            try:
+                request_id, move = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if request_id == self._request_id and self._callback is not None:
+                callback = self._callback
+                self._callback = None
+                callback(move)
+
+        self._start_pending()
+        if self._callback is None and self._pending is None and not self.is_busy():
+            self._poll_task = None
+            return task.done
+        return task.cont
@@ -0,0 +1,100 @@
+"""资源缓存模块"""
+from panda3d.core import NodePath
+from utils.asset_pipeline import resolve_asset_path
+
+class AssetCache:
+    """进程级资源缓存
+
+    每个模型文件只从磁盘加载一次并保存为原型，之后每次请求返回原型的深拷贝；
+    纹理可以被多个节点共享，直接返回同一对象。
+    加载失败的路径会被记录下来，之后直接返回None，不再重复访问磁盘。
+    有新鲜的预构建产物（build_assets.py）时优先加载产物。
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._textures = {}
+        self._failed = set()
+        self._pending = {}  # 正在异步加载的路径 -> 等待中的回调列表
+
+    def load_model(self, loader, path):
+        """加载模型，返回一个未挂载的新节点；加载失败返回None"""
+        prototype = self._models.get(path)
+        if prototype is None:
+            if path in self._failed:
+                return None
+            try:
+                prototype = loader.loadModel(resolve_asset_path(path))
+            except Exception as e:
+                print(f"模型加载失败: {path} ({e})")
+                prototype = None
+            if prototype is None or prototype.isEmpty():
+                self._failed.add(path)
+                return None
+            self._models[path] = prototype
+        return self._copy_model(path)
+
+    def load_model_async(self, loader, path, callback, priority=0):
+        """在后台线程加载模型，完成后在主线程调用 callback(node)，失败时传入None
+
+        priority越大越先加载；同一路径的并发请求只会读取一次磁盘。
+        """
+        if path in self._models or path in self._failed:
+            callback(self._copy_model(path))
+            return
+        waiting = self._pending.get(path)
+        if waiting is not None:
+            waiting.append(callback)
+            return
+        self._pending[path] = [callback]
+        loader.loadModel(resolve_asset_path(path), callback=self._on_model_loaded, extraArgs=[path], priority=priority)
+
+    def _on_model_loaded(self, path, model):
+        """异步加载完成：缓存原型并分发给所有等待者"""
+        if path not in self._models:
+            if model is None or model.isEmpty():
+                print(f"模型加载失败: {path}")
+                self._failed.add(path)
+            else:
+                self._models[path] = model
+        for callback in self._pending.pop(path, []):
+            callback(self._copy_model(path))
+
+    def _copy_model(self, path):
+        """返回缓存原型的深拷贝"""
+        prototype = self._models.get(path)
+        if prototype is None:
+            return None
+        return NodePath(prototype.node().copySubgraph())
+
+    def pending_count(self):
+        """尚未完成的异步加载数量"""
+        return len(self._pending)
+
+    def load_texture(self, loader, path):
+        """加载纹理（共享同一对象）；加载失败返回None"""
+        texture = self._textures.get(path)
+        if texture is None:
+            if path in self._failed:
+                return None
+            try:
+                texture = loader.loadTexture(resolve_asset_path(path))
+            except Exception as e:
+                print(f"纹理加载失败: {path} ({e})")
+                texture = None
+            if texture is None:
+                self._failed.add(path)
+                return None
+            self._textures[path] = texture
+        return texture
+
+    def clear(self):
+        """释放所有缓存的原型"""
+        for prototype in self._models.values():
+            prototype.removeNode()
+        self._models.clear()
+        self._textures.clear()
+        self._failed.clear()
+
+# 全进程共享的缓存实例
+asset_cache = AssetCache()
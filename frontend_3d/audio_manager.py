@@ -2,12 +2,20 @@
 import os
 import random
 import time
+from collections import OrderedDict
+from panda3d.core import AudioSound, Filename
+from panda3d.core import AudioManager as PandaAudioManager
 from utils.constants import (
-    BGM_LIST, NAHITA_VOICE, TINYUN_VOICE, SOUND_CLICK, SOUND_DRAG, WINNER_MUSIC, LOSER_MUSIC, SOUND_VOLUME
+    BGM_LIST, NAHITA_VOICE, TINYUN_VOICE, SOUND_CLICK, SOUND_DRAG, WINNER_MUSIC, LOSER_MUSIC, SOUND_VOLUME,
+    AUDIO_CACHE_SIZE
 )
 
 class AudioManager:
-    """音频管理器"""
+    """音频管理器
+
+    所有音频都按需加载：语音包在第一次用到时才建立索引，语音在播放时才解码，
+    并以LRU方式最多保留 AUDIO_CACHE_SIZE 个；BGM只登记路径，播放时以流方式打开。
+    """
     
     def __init__(self, loader, task_mgr):
         self.loader = loader
@@ -22,14 +30,17 @@ class AudioManager:
         self.winner_music = None
         self.loser_music = None
         
-        # 背景音乐
+        # 已解码的语音（LRU）
+        self._sound_cache = OrderedDict()
+        
+        # 背景音乐（存在的文件路径，播放时才打开）
         self.bgm_list = []
         self.current_bgm_index = 0
         self.current_bgm = None
         self.bgm_shuffle_order = []  # 新增：打乱后的播放顺序
         self.bgm_is_shuffled = False  # 新增：是否已经打乱顺序
 
-        # Nahita语音 (classical AI)
+        # Nahita语音 (classical AI)，元素为文件路径，文件不存在时为None
         self.nahita_voices = []
         self.nahita_voice_map = {}
         self.last_played_nahita_index = -1
@@ -47,7 +58,7 @@ class AudioManager:
         }
 
         self._init_random_seed()
-        self._load_all_audio()
+        self._load_bgm()
         
         # 自动开始播放BGM
         if self.bgm_list:
@@ -55,6 +66,7 @@ class AudioManager:
     
     def set_ai_type(self, ai_type):
         """设置当前AI类型，用于确定语音包"""
+        old_pack = self.AI_VOICE_MAPPING.get(self.current_ai_type)
         if ai_type in self.AI_VOICE_MAPPING:
             self.current_ai_type = ai_type
             voice_pack = self.AI_VOICE_MAPPING[ai_type]
@@ -62,6 +74,9 @@ class AudioManager:
         else:
             print(f"未知AI类型: {ai_type}, 使用默认classical")
             self.current_ai_type = "classical"
+        # 换了语音包就释放旧语音包已解码的语音
+        if self.AI_VOICE_MAPPING[self.current_ai_type] != old_pack:
+            self._release_voice_pack(old_pack)
     
     def play_ai_voice(self, identifier=None, volume=None, ai_type=None):
         """
@@ -91,6 +106,7 @@ class AudioManager:
     
     def _play_nahita_voice_internal(self, identifier=None, volume=None):
         """内部Nahita语音播放函数"""
+        self._ensure_voice_pack("nahita")
         if not self.nahita_voices:
             print("没有可用的Nahita语音")
             return False
@@ -110,7 +126,10 @@ class AudioManager:
             voice_index = self._get_matched_nahita_voice_index(identifier)
         
         if voice_index is not None and voice_index < len(self.nahita_voices) and self.nahita_voices[voice_index] is not None:
-            voice = self.nahita_voices[voice_index]
+            voice = self._get_sound(self.nahita_voices[voice_index])
+            if voice is None:
+                print(f"Nahita语音加载失败: 索引 {voice_index}")
+                return False
             voice.setVolume(volume if volume is not None else SOUND_VOLUME)
             voice.play()
             
@@ -124,6 +143,7 @@ class AudioManager:
     
     def _play_tinyun_voice_internal(self, identifier=None, volume=None):
         """内部Tinyun语音播放函数"""
+        self._ensure_voice_pack("tinyun")
         if not self.tinyun_voices:
             print("没有可用的Tinyun语音")
             return False
@@ -143,7 +163,10 @@ class AudioManager:
             voice_index = self._get_matched_tinyun_voice_index(identifier)
         
         if voice_index is not None and voice_index < len(self.tinyun_voices) and self.tinyun_voices[voice_index] is not None:
-            voice = self.tinyun_voices[voice_index]
+            voice = self._get_sound(self.tinyun_voices[voice_index])
+            if voice is None:
+                print(f"Tinyun语音加载失败: 索引 {voice_index}")
+                return False
             voice.setVolume(volume if volume is not None else SOUND_VOLUME)
             voice.play()
             
@@ -243,6 +266,7 @@ class AudioManager:
 
     def get_tinyun_voice_list(self):
         """获取可用的Tinyun语音列表"""
+        self._ensure_voice_pack("tinyun")
         voice_list = []
         for i, voice_file in enumerate(TINYUN_VOICE):
             filename = os.path.basename(voice_file).replace('.wav', '')
@@ -257,52 +281,43 @@ class AudioManager:
 
     def play_place_piece_sound(self):
         """播放下棋音效"""
-        if self.place_piece_sound:
-            self.place_piece_sound.setVolume(SOUND_VOLUME)
-            self.place_piece_sound.play()
+        sound = self._get_pinned_sound("place_piece_sound", SOUND_CLICK)
+        if sound:
+            sound.setVolume(SOUND_VOLUME)
+            sound.play()
     
     def play_drag_piece_sound(self):
         """播放提子音效"""
-        if self.drag_piece_sound:
-            self.drag_piece_sound.setVolume(SOUND_VOLUME)
-            self.drag_piece_sound.play()
+        sound = self._get_pinned_sound("drag_piece_sound", SOUND_DRAG)
+        if sound:
+            sound.setVolume(SOUND_VOLUME)
+            sound.play()
     
     def play_winner_sound(self):
         """播放胜利音效并暂停背景音乐"""
         self.stop_all_music()  # 停止所有音乐
-        if self.winner_music:
-            self.winner_music.setVolume(SOUND_VOLUME*0.1)
-            self.winner_music.play()
+        sound = self._get_pinned_sound("winner_music", WINNER_MUSIC, music=True)
+        if sound:
+            sound.setVolume(SOUND_VOLUME*0.1)
+            sound.play()
     
     def play_loser_sound(self):
         """播放失败音效并暂停背景音乐"""
         self.stop_all_music()  # 停止所有音乐
-        if self.loser_music:
-            self.loser_music.setVolume(SOUND_VOLUME-0.1)
-            self.loser_music.play()
+        sound = self._get_pinned_sound("loser_music", LOSER_MUSIC, music=True)
+        if sound:
+            sound.setVolume(SOUND_VOLUME-0.1)
+            sound.play()
     
     def _load_bgm(self):
-        """加载背景音乐"""
-        print(f"开始加载BGM，总数: {len(BGM_LIST)}")
-        loaded_count = 0
-        
-        for i, bgm_path in enumerate(BGM_LIST):
+        """登记可用的背景音乐（只检查文件是否存在，播放时才打开）"""
+        for bgm_path in BGM_LIST:
             if os.path.exists(bgm_path):
-                try:
-                    bgm = self.loader.loadMusic(bgm_path)
-                    if bgm:
-                        self.bgm_list.append(bgm)
-                        loaded_count += 1
-                        filename = os.path.basename(bgm_path)
-                        print(f"成功加载BGM [{loaded_count}]: {filename}")
-                    else:
-                        print(f"加载BGM失败(返回None): {bgm_path}")
-                except Exception as e:
-                    print(f"加载BGM异常: {bgm_path}, 错误: {e}")
+                self.bgm_list.append(bgm_path)
             else:
                 print(f"BGM文件不存在: {bgm_path}")
         
-        print(f"BGM加载完成，成功加载 {loaded_count}/{len(BGM_LIST)} 首")
+        print(f"BGM登记完成，可用 {len(self.bgm_list)}/{len(BGM_LIST)} 首")
         
         # 初始化播放顺序
         if self.bgm_list:
@@ -336,7 +351,7 @@ class AudioManager:
         
         # 显示播放列表
         for i, bgm_index in enumerate(self.bgm_shuffle_order):
-            filename = os.path.basename(BGM_LIST[bgm_index])
+            filename = os.path.basename(self.bgm_list[bgm_index])
             marker = " <- 当前" if i == 0 else ""
             print(f"  {i+1}. {filename}{marker}")
     
@@ -352,20 +367,23 @@ class AudioManager:
         if not self.bgm_is_shuffled:
             self._initialize_bgm_order()
         
-        # 停止当前播放的BGM
+        # 停止并释放当前播放的BGM
         if self.current_bgm:
             self.current_bgm.stop()
+            self.current_bgm = None
         
-        # 获取真实的BGM索引
+        # 获取真实的BGM索引，流式打开这一首
         real_bgm_index = self.bgm_shuffle_order[self.current_bgm_index]
-        self.current_bgm = self.bgm_list[real_bgm_index]
+        self.current_bgm = self._open_bgm(self.bgm_list[real_bgm_index])
+        if self.current_bgm is None:
+            return
         
         # 播放BGM
         self.current_bgm.setVolume(SOUND_VOLUME)
         self.current_bgm.play()
         
         # 显示当前播放信息
-        filename = os.path.basename(BGM_LIST[real_bgm_index])
+        filename = os.path.basename(self.bgm_list[real_bgm_index])
         print(f"正在播放BGM [{self.current_bgm_index + 1}/{len(self.bgm_shuffle_order)}]: {filename}")
         
         # 设置自动切换到下一首
@@ -424,7 +442,7 @@ class AudioManager:
             return "无BGM"
         
         real_bgm_index = self.bgm_shuffle_order[self.current_bgm_index]
-        filename = os.path.basename(BGM_LIST[real_bgm_index])
+        filename = os.path.basename(self.bgm_list[real_bgm_index])
         return f"[{self.current_bgm_index + 1}/{len(self.bgm_shuffle_order)}] {filename}"
     
     def get_bgm_playlist(self):
@@ -434,7 +452,7 @@ class AudioManager:
         
         playlist = []
         for i, bgm_index in enumerate(self.bgm_shuffle_order):
-            filename = os.path.basename(BGM_LIST[bgm_index])
+            filename = os.path.basename(self.bgm_list[bgm_index])
             is_current = (i == self.current_bgm_index)
             playlist.append({
                 'index': i + 1,
@@ -482,74 +500,102 @@ class AudioManager:
         """初始化随机种子"""
         random.seed(int(time.time() * 1000000) % 2**32)
     
-    def _load_all_audio(self):
-        """加载所有音频文件"""
+    def _open_bgm(self, bgm_path):
+        """以流方式打开BGM，不把整首曲子解码进内存"""
+        music_manager = getattr(self.loader.base, "musicManager", None)
         try:
-            # 加载音效
-            if os.path.exists(SOUND_CLICK):
-                self.place_piece_sound = self.loader.loadSfx(SOUND_CLICK)
-            
-            if os.path.exists(SOUND_DRAG):
-                self.drag_piece_sound = self.loader.loadSfx(SOUND_DRAG)
-            
-            if os.path.exists(WINNER_MUSIC):
-                self.winner_music = self.loader.loadMusic(WINNER_MUSIC)
-            
-            if os.path.exists(LOSER_MUSIC):
-                self.loser_music = self.loader.loadMusic(LOSER_MUSIC)
-            
-            # 加载背景音乐
-            self._load_bgm()
-            
-            # 加载Nahita语音
+            if music_manager is not None:
+                return music_manager.getSound(Filename(bgm_path), False, PandaAudioManager.SM_stream)
+            return self.loader.loadMusic(bgm_path)
+        except Exception as e:
+            print(f"加载BGM异常: {bgm_path}, 错误: {e}")
+            return None
+    
+    def _get_pinned_sound(self, attr, path, music=False):
+        """按需加载常驻的音效（落子、提子、胜负音乐），第一次播放时才加载"""
+        sound = getattr(self, attr)
+        if sound is None and os.path.exists(path):
+            try:
+                sound = self.loader.loadMusic(path) if music else self.loader.loadSfx(path)
+            except Exception as e:
+                print(f"加载音频失败: {path}, 错误: {e}")
+                sound = None
+            setattr(self, attr, sound)
+        return sound
+    
+    def _get_sound(self, path):
+        """按需解码语音，已解码的语音按LRU保留"""
+        sound = self._sound_cache.get(path)
+        if sound is not None:
+            self._sound_cache.move_to_end(path)
+            return sound
+        try:
+            sound = self.loader.loadSfx(path)
+        except Exception as e:
+            print(f"加载音频失败: {path}, 错误: {e}")
+            return None
+        if sound:
+            self._sound_cache[path] = sound
+            self._evict_sounds()
+        return sound
+    
+    def _evict_sounds(self):
+        """超过上限时淘汰最久未使用且没有在播放的语音"""
+        overflow = len(self._sound_cache) - AUDIO_CACHE_SIZE
+        for path in list(self._sound_cache):
+            if overflow <= 0:
+                break
+            if self._sound_cache[path].status() != AudioSound.PLAYING:
+                del self._sound_cache[path]
+                overflow -= 1
+    
+    def _ensure_voice_pack(self, voice_pack):
+        """第一次使用语音包时建立索引（只检查文件是否存在，不解码）"""
+        if voice_pack == "nahita" and not self.nahita_voices:
             self._load_nahita_voices()
-            
-            # 加载Tinyun语音
+        elif voice_pack == "tinyun" and not self.tinyun_voices:
             self._load_tinyun_voices()
-            
-        except Exception as e:
-            print(f"加载音频文件时出错: {e}")
+    
+    def get_voice_map(self, voice_pack):
+        """获取语音包的关键词 -> 索引映射（必要时先建立索引）"""
+        self._ensure_voice_pack(voice_pack)
+        return self.nahita_voice_map if voice_pack == "nahita" else self.tinyun_voice_map
+    
+    def _release_voice_pack(self, voice_pack):
+        """释放某个语音包已解码的语音"""
+        pack_paths = set(NAHITA_VOICE if voice_pack == "nahita" else TINYUN_VOICE)
+        for path in [path for path in self._sound_cache if path in pack_paths]:
+            if self._sound_cache[path].status() != AudioSound.PLAYING:
+                del self._sound_cache[path]
     
     def _load_nahita_voices(self):
-        """加载Nahita语音文件"""
+        """建立Nahita语音索引"""
         self.nahita_voices = []
         self.nahita_voice_map = {}
         
         for i, voice_path in enumerate(NAHITA_VOICE):
             if os.path.exists(voice_path):
-                try:
-                    voice = self.loader.loadSfx(voice_path)
-                    self.nahita_voices.append(voice)
-                    
-                    # 建立关键词映射
-                    filename = os.path.basename(voice_path).replace('.wav', '')
-                    self.nahita_voice_map[filename] = i
-                    
-                except Exception as e:
-                    print(f"加载Nahita语音失败: {voice_path}, 错误: {e}")
-                    self.nahita_voices.append(None)
+                self.nahita_voices.append(voice_path)
+                
+                # 建立关键词映射
+                filename = os.path.basename(voice_path).replace('.wav', '')
+                self.nahita_voice_map[filename] = i
             else:
                 print(f"Nahita语音文件不存在: {voice_path}")
                 self.nahita_voices.append(None)
     
     def _load_tinyun_voices(self):
-        """加载Tinyun语音文件"""
+        """建立Tinyun语音索引"""
         self.tinyun_voices = []
         self.tinyun_voice_map = {}
         
         for i, voice_path in enumerate(TINYUN_VOICE):
             if os.path.exists(voice_path):
-                try:
-                    voice = self.loader.loadSfx(voice_path)
-                    self.tinyun_voices.append(voice)
-                    
-                    # 建立关键词映射
-                    filename = os.path.basename(voice_path).replace('.wav', '')
-                    self.tinyun_voice_map[filename] = i
-                    
-                except Exception as e:
-                    print(f"加载Tinyun语音失败: {voice_path}, 错误: {e}")
-                    self.tinyun_voices.append(None)
+                self.tinyun_voices.append(voice_path)
+                
+                # 建立关键词映射
+                filename = os.path.basename(voice_path).replace('.wav', '')
+                self.tinyun_voice_map[filename] = i
             else:
                 print(f"Tinyun语音文件不存在: {voice_path}")
                 self.tinyun_voices.append(None)
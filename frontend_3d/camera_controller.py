@@ -69,6 +69,10 @@ class CameraController:
         # 限制最大速度
         return min(current_speed, self.max_speed)
     
+    def is_active(self):
+        """是否有旋转键被按下"""
+        return any(self.key_map.values())
+
     def update(self, dt):
         """更新摄像机位置(每帧调用)"""
         camera = builtins.camera
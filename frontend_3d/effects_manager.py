@@ -1,77 +1,122 @@
 """特效管理模块"""
-import random
-import math
-from utils.constants import FIREWORK_COLORS, VICTORY_PARTICLE_DURATION, BOARD_SIZE
-from utils.helpers import square_pos
+import builtins
+import numpy as np
+from panda3d.core import GeomNode, GeomVertexFormat, GeomVertexArrayFormat, GeomVertexData, Geom, GeomPoints, RenderModeAttrib, TransparencyAttrib
+from utils.constants import (
+    FIREWORK_COLORS, VICTORY_PARTICLE_COUNT, VICTORY_PARTICLE_DURATION, VICTORY_PARTICLE_DELAY,
+    VICTORY_PARTICLE_RISE_SPEED, PARTICLE_POOL_SIZE, PARTICLE_POINT_SIZE, BOARD_SIZE
+)
+from utils.helpers import square_pos, vertex_array_view
 
 class EffectsManager:
-    """特效管理器"""
-    
-    def __init__(self, render, task_mgr):
+    """特效管理器
+
+    所有粒子共用一个预分配的点几何体（环形缓冲区），
+    由单个任务以向量化方式统一更新位置和透明度。
+    """
+
+    def __init__(self, render, task_mgr, pool_size=PARTICLE_POOL_SIZE):
         self.render = render
         self.task_mgr = task_mgr
-        self.victory_particles = []
-    
-    def create_victory_particles(self, winner_positions):
-        """创建胜利粒子特效"""
-        for pos in winner_positions:
-            for i in range(20):  # 每个位置20个粒子
-                particle = self.render.attachNewNode("particle")
-                square_position = square_pos(pos[0] * BOARD_SIZE + pos[1])
-                particle.setPos(
-                    square_position.x + random.uniform(-0.5, 0.5),
-                    square_position.y + random.uniform(-0.5, 0.5),
-                    random.uniform(0, 2)
-                )
-                
-                # 随机颜色
-                color = random.choice(FIREWORK_COLORS)
-                particle.setColorScale(*color)
-                
-                # 添加动画
-                self._animate_particle(particle, i * 0.05)
-                self.victory_particles.append(particle)
-    
-    def _animate_particle(self, particle, delay):
-        """粒子动画"""
-        def particle_task(task):
-            if not particle or particle.isEmpty():
-                return task.done
-            
-            try:
-                if task.time < VICTORY_PARTICLE_DURATION:
-                    current_pos = particle.getPos()
-                    new_z = current_pos.z + 0.5 * task.dt
-                    particle.setZ(new_z)
-                    
-                    # 透明度变化
-                    alpha = 1.0 - (task.time / VICTORY_PARTICLE_DURATION)
-                    current_color = particle.getColorScale()
-                    particle.setColorScale(current_color[0], current_color[1], current_color[2], alpha)
-                    
-                    return task.cont
-                else:
-                    if not particle.isEmpty():
-                        particle.removeNode()
-                    if particle in self.victory_particles:
-                        self.victory_particles.remove(particle)
-                    return task.done
-            except Exception as e:
-                print(f"粒子动画出错: {e}")
-                try:
-                    if not particle.isEmpty():
-                        particle.removeNode()
-                    if particle in self.victory_particles:
-                        self.victory_particles.remove(particle)
-                except:
-                    pass
-                return task.done
-        
-        self.task_mgr.doMethodLater(delay, particle_task, f"particle_anim_{id(particle)}")
-    
+        self.pool_size = pool_size
+        self.particle_task = None
+        self._next_slot = 0
+
+        # 每个粒子槽位的状态
+        self._origins = np.zeros((pool_size, 3), dtype=np.float32)
+        self._colors = np.zeros((pool_size, 4), dtype=np.float32)
+        self._birth_times = np.full(pool_size, -np.inf)
+
+        self.particle_np = self._create_particle_geom()
+
+    def _create_particle_geom(self):
+        """创建粒子池对应的点几何体"""
+        vformat = GeomVertexFormat()
+        vformat.addArray(GeomVertexArrayFormat("vertex", 3, Geom.NT_float32, Geom.C_point))
+        vformat.addArray(GeomVertexArrayFormat("color", 4, Geom.NT_float32, Geom.C_color))
+        vformat = GeomVertexFormat.registerFormat(vformat)
+        vdata = GeomVertexData("particles", vformat, Geom.UHDynamic)
+        vdata.setNumRows(self.pool_size)
+
+        points = GeomPoints(Geom.UHStatic)
+        points.addConsecutiveVertices(0, self.pool_size)
+        points.closePrimitive()
+        geom = Geom(vdata)
+        geom.addPrimitive(points)
+
+        self.particle_geom_node = GeomNode("victoryParticles")
+        self.particle_geom_node.addGeom(geom)
+        particle_np = self.render.attachNewNode(self.particle_geom_node)
+        particle_np.setAttrib(RenderModeAttrib.make(RenderModeAttrib.MPoint, PARTICLE_POINT_SIZE))
+        particle_np.setTransparency(TransparencyAttrib.MAlpha)
+        particle_np.setDepthWrite(False)
+        particle_np.setLightOff(1)
+        particle_np.detachNode()
+        return particle_np
+
+    def create_victory_particles(self, winner_positions, parent=None):
+        """创建胜利粒子特效
+
+        Args:
+            winner_positions: 获胜棋子的(row, col)列表
+            parent: 粒子挂载的节点（通常是棋盘节点），默认挂在render下
+        """
+        if not winner_positions:
+            return
+
+        per_stone = max(1, VICTORY_PARTICLE_COUNT // len(winner_positions))
+        count = min(per_stone * len(winner_positions), self.pool_size)
+        slots = (self._next_slot + np.arange(count)) % self.pool_size
+        self._next_slot = int((self._next_slot + count) % self.pool_size)
+
+        centers = np.array([
+            tuple(square_pos(row * BOARD_SIZE + col)) for row, col in winner_positions
+        ], dtype=np.float32)
+        stone_index = np.arange(count) // per_stone
+        particle_index = np.arange(count) % per_stone
+
+        origins = centers[stone_index]
+        origins[:, 0] += np.random.uniform(-0.5, 0.5, count)
+        origins[:, 1] += np.random.uniform(-0.5, 0.5, count)
+        origins[:, 2] = np.random.uniform(0, 2, count)
+        self._origins[slots] = origins
+
+        # 随机颜色
+        palette = np.array(FIREWORK_COLORS, dtype=np.float32)
+        self._colors[slots] = palette[np.random.randint(len(palette), size=count)]
+
+        now = builtins.globalClock.getFrameTime()
+        self._birth_times[slots] = now + particle_index * VICTORY_PARTICLE_DELAY
+
+        self.particle_np.reparentTo(parent if parent is not None else self.render)
+        if self.particle_task is None:
+            self.particle_task = self.task_mgr.add(self._update_particles, "victoryParticlesTask")
+
+    def _update_particles(self, task):
+        """统一更新所有粒子（上升 + 淡出）"""
+        age = builtins.globalClock.getFrameTime() - self._birth_times
+        alive = (age >= 0) & (age < VICTORY_PARTICLE_DURATION)
+        pending = age < 0
+
+        positions = self._origins.copy()
+        positions[:, 2] += VICTORY_PARTICLE_RISE_SPEED * np.clip(age, 0, VICTORY_PARTICLE_DURATION)
+        colors = self._colors.copy()
+        colors[:, 3] = np.where(alive, 1.0 - age / VICTORY_PARTICLE_DURATION, 0.0)
+
+        vdata = self.particle_geom_node.modifyGeom(0).modifyVertexData()
+        vertex_array_view(vdata, 0)[:] = positions
+        vertex_array_view(vdata, 1)[:] = colors
+
+        if not alive.any() and not pending.any():
+            self.particle_np.detachNode()
+            self.particle_task = None
+            return task.done
+        return task.cont
+
     def cleanup_particles(self):
         """清理所有粒子"""
-        for particle in self.victory_particles:
-            if particle:
-                particle.removeNode()
-        self.victory_particles = []
\ No newline at end of file
+        if self.particle_task is not None:
+            self.task_mgr.remove(self.particle_task)
+            self.particle_task = None
+        self._birth_times[:] = -np.inf
+        self.particle_np.detachNode()
@@ -2,29 +2,28 @@
 主游戏逻辑 - 重构版本
 """
 import time
-import copy
 import builtins
 import random
-import threading
 from direct.showbase.ShowBase import ShowBase
 from direct.gui.DirectGui import *
 from panda3d.core import WindowProperties, TextNode
 from utils.constants import *
-from utils.helpers import square_pos, square_color
+from utils.helpers import square_color
 from utils.chessboard import ChessBoard
-from pieces.chess_pieces import Pawn
+from utils.game_record import save_game
+from utils.game_archive import archive_game
 from .camera_controller import CameraController
 from .mouse_picker import MousePicker
-from .audio_manager import AudioManager
 from .ui_manager import UIManager
 from .game_statistics import GameStatistics
 from .effects_manager import EffectsManager
+from .piece_manager import PieceManager
 from .input_manager import InputManager
+from .ai_service import AIService
 from Gomoku_ai_classical.ai import AIPlayer
-from .setup_scene import SceneSetup
-from .setup_board import BoardSetup
 from Gomoku_ai_minimax.ai import MinimaxAIPlayer
 from Gomoku_ai_MCTS.aiv3 import MCTSAIPlayer
+from utils.remote_ai import RemoteAI, server_address
 
 class Gomoku_Start(ShowBase):
     """五子棋游戏主类 - 重构版本"""
@@ -60,11 +59,11 @@ class Gomoku_Start(ShowBase):
         # 游戏组件
         self.chessboard = ChessBoard(size=BOARD_SIZE)
         
-        # 根据AI类型创建AI实例
+        # 根据AI类型创建AI实例，AI在后台线程计算
         self._create_ai_player()
+        self.ai_service = AIService(self.ai_player, self.taskMgr)
         
         # 棋盘数据
-        self.squares = [None for _ in range(TOTAL_SQUARES)]
         self.pieces = [None for _ in range(TOTAL_SQUARES)]
         
         # 选择界面
@@ -74,7 +73,12 @@ class Gomoku_Start(ShowBase):
         self._show_side_selection()
     
     def _create_ai_player(self):
-        if self.ai_type == "classical":
+        # 配置了引擎服务时由服务端计算，引擎名与服务端配置一致
+        address = server_address()
+        if address:
+            engine = self.ai_type if self.ai_type in ("classical", "minimax", "mcts") else "classical"
+            self.ai_player = RemoteAI(address, engine)
+        elif self.ai_type == "classical":
             self.ai_player = AIPlayer()
         elif self.ai_type == "minimax":
             self.ai_player = MinimaxAIPlayer()
@@ -238,22 +242,21 @@ class Gomoku_Start(ShowBase):
         # 设置摄像机
         self._setup_camera(self.board_y)
         # self._setup_camera(board_y)
-        # 初始化场景和棋盘外观
-        self.scene_setup = SceneSetup(self.loader, self.render, self.taskMgr)
-        self.scene_setup.setup_lighting()
-        self.scene_setup.load_scene()
-
-        self.board_setup = BoardSetup(
-            self.loader, self.render,
-            opponent_model_path=self.opponent_model_path,
-            opponent_model_position=self.opponent_model_position
+        # 场景和棋盘由主程序持有，这里复用并摆放到下棋位置
+        self.scene_setup = self.base.scene_setup
+        self.board_setup = self.base.get_board(
+            self.ai_type, self.opponent_model_path, self.opponent_model_position
         )
-        self.board_setup.setup_board()
-        self.squares = self.board_setup.squares
+        self.board_setup.reset_layout()
+        self.board_setup.show()
         self.square_root = self.board_setup.square_root
-        self.square_root.setY(self.board_y)
+        self.square_root.setPos(0, self.board_y, 0)
         # self.square_root.setY(board_y)
 
+        # 棋子管理器：增量同步棋盘状态到场景图
+        self.piece_manager = PieceManager(self, self.square_root)
+        self.pieces = self.piece_manager.pieces
+
         # 创建高亮指示器需要在square_root创建完后再创建
         self.mouse_picker._create_highlight_indicator()
 
@@ -267,7 +270,7 @@ class Gomoku_Start(ShowBase):
     
     def _init_managers(self):
         """初始化所有管理器"""
-        self.audio_manager = AudioManager(self.loader, self.taskMgr)  # 初始化音频管理器
+        self.audio_manager = self.base.audio_manager  # 复用主程序的音频管理器
         self.audio_manager.set_ai_type(self.ai_type) # 向音頻管理器傳遞AI类型
         self.ui_manager = UIManager(self) # 初始化UI管理器
         self.statistics = GameStatistics(self.audio_manager) # 初始化游戏统计管理器
@@ -284,7 +287,6 @@ class Gomoku_Start(ShowBase):
         self.input_manager = InputManager(self, self.camera_controller)
         
         # 设置引用
-        self.mouse_picker.set_board_data(self.squares, self.pieces)
         self.mouse_picker.set_game_instance(self)
     
     def _get_rotation_center_by_ai_type(self, ai_type, board_y):
@@ -309,6 +311,9 @@ class Gomoku_Start(ShowBase):
         """启动任务"""
         self.mouse_task = self.taskMgr.add(self._mouse_task, 'mouseTask')
         self.move_task = self.taskMgr.add(self._move_task, 'move')
+        # HUD只在状态变化时刷新，计时由低频时钟推进
+        self.hud_task = self.taskMgr.doMethodLater(HUD_REFRESH_INTERVAL, self._hud_task, 'hudTick')
+        self.refresh_hud()
     
     def _mouse_task(self, task):
         """鼠标任务"""
@@ -317,36 +322,48 @@ class Gomoku_Start(ShowBase):
         return self.mouse_picker.update(self.mouseWatcherNode, self.square_root)
     
     def _move_task(self, task):
-        """主循环任务"""
-        if not self.game_started:
-            return task.cont
-            
-        dt = builtins.globalClock.getDt()
-        self.camera_controller.update(dt)
-        
-        if not self.game_over:
-            # 传递is_ai_enabled和ai_side参数给update_player_time
-            self.statistics.update_player_time(
-                self.current_player, 
-                game_over=self.game_over,
-                is_ai_enabled=self.is_ai_enabled,
-                ai_side=self.ai_side
-            )
-            
-            game_data = self.statistics.get_game_data()
-            self.ui_manager.update_statistics(game_data)
-            
-            # 更新UI时传递player_side信息
-            self.ui_manager.update_current_player(
-                self.current_player, self.is_ai_enabled, 
-                self.ai_side, self.game_over, self.player_side)
-        
+        """主循环任务：只在按下旋转键时移动摄像机"""
+        if self.game_started and self.camera_controller.is_active():
+            self.camera_controller.update(builtins.globalClock.getDt())
         return task.cont
     
+    def _hud_task(self, task):
+        """HUD时钟：推进计时显示和催促语音"""
+        self.refresh_hud()
+        return task.again
+    
+    def refresh_hud(self):
+        """刷新HUD（文本内容不变时不会重新设置）"""
+        if not self.game_started or self.game_over:
+            return
+        # 传递is_ai_enabled和ai_side参数给update_player_time
+        self.statistics.update_player_time(
+            self.current_player, 
+            game_over=self.game_over,
+            is_ai_enabled=self.is_ai_enabled,
+            ai_side=self.ai_side
+        )
+        self.ui_manager.update_statistics(self.statistics.get_game_data())
+        
+        # 更新UI时传递player_side信息
+        self.ui_manager.update_current_player(
+            self.current_player, self.is_ai_enabled, 
+            self.ai_side, self.game_over, self.player_side)
+    
     def _delayed_ai_move(self, task):
-        """延迟AI移动"""
-        threading.Thread(target=self.do_ai_move).start()
+        """延迟AI移动：在后台计算，结果由主线程的 do_ai_move 应用"""
+        if self.game_started and not self.game_over and self.current_player == self.ai_side:
+            self.ai_service.request_move(self.chessboard.position, self.ai_side, self.do_ai_move)
         return task.done
+
+    def _cancel_ai_move(self):
+        """取消尚未开始或正在进行的AI计算"""
+        self.taskMgr.remove('ai-move-task')
+        self.taskMgr.remove('ai-first-move')
+        self.ai_service.cancel()
+        self.ai_service.stop_pondering()
+        if hasattr(self, 'ui_manager'):
+            self.ui_manager.hide_ai_thinking()
     
     # 其他游戏逻辑方法保持不变...
     def switch_player(self):
@@ -361,6 +378,7 @@ class Gomoku_Start(ShowBase):
         # 通知统计管理器（只处理AI语音，不处理时间）
         if hasattr(self, 'statistics'):
             self.statistics.switch_player(new_player)
+        self.refresh_hud()
     
     def update_gomoku_state(self, last_pos):
         """更新游戏状态"""
@@ -397,14 +415,16 @@ class Gomoku_Start(ShowBase):
             self.ui_manager.show_ai_thinking()
             self.taskMgr.doMethodLater(0.1, self._delayed_ai_move, 'ai-move-task')
     
-    def do_ai_move(self):
-        """AI移动"""
-        if not self.game_started:
-            return
-            
-        old_chessboard = copy.deepcopy(self.chessboard)
-        self.chessboard = self.ai_player.get_next_chessboard(self.chessboard, self.ai_side)
+    def do_ai_move(self, move):
+        """AI移动（主线程）：落下AI计算出的(row, col)"""
         self.ui_manager.hide_ai_thinking()
+        if not self.game_started or self.game_over or move is None:
+            return
+        
+        row, col = move
+        if not self.chessboard.place_stone(row, col, self.ai_side):
+            print(f"AI落子无效: ({row}, {col})")
+            return
         
         # 减少AI的棋子数量
         if self.ai_side == PLAYER_WHITE:
@@ -412,12 +432,8 @@ class Gomoku_Start(ShowBase):
         else:
             self.black_pieces_count -= 1
         
-        # 找到AI下的位置并记录移动（不累加时间）
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE):
-                if old_chessboard.board[i][j] != self.chessboard.board[i][j]:
-                    self.statistics.add_move(i, j, self.ai_side)
-                    break
+        # 记录移动（不累加时间）
+        self.statistics.add_move(row, col, self.ai_side)
         
         self.audio_manager.play_place_piece_sound()
 
@@ -428,10 +444,15 @@ class Gomoku_Start(ShowBase):
         
         # 切换玩家
         self.switch_player()
+        
+        # 玩家思考（拖动棋子）时后台搜索玩家可能的应手
+        if PONDER_ENABLED:
+            self.ai_service.ponder(self.chessboard.position, self.ai_side)
     
     def restart_game(self):
         """重新开始游戏"""
         print("Restarting game...")
+        self._cancel_ai_move()
         
         # 重置游戏状态
         self.chessboard = ChessBoard(size=BOARD_SIZE)
@@ -455,6 +476,7 @@ class Gomoku_Start(ShowBase):
         
         # 重新开始背景音乐
         self.audio_manager.play_current_bgm()
+        self.refresh_hud()
     
         # 如果玩家是白棋，则AI先走
         if self.player_side == PLAYER_WHITE:
@@ -470,6 +492,9 @@ class Gomoku_Start(ShowBase):
             print("Cannot undo")
             return
         
+        # 悔棋时丢弃AI正在计算的结果
+        self._cancel_ai_move()
+        
         # 播放悔棋音效
         self.audio_manager.play_drag_piece_sound()
         
@@ -481,7 +506,7 @@ class Gomoku_Start(ShowBase):
         
         # 恢复棋盘状态
         for row, col, player in undone_moves:
-            self.chessboard.board[row][col] = PIECE_EMPTY
+            self.chessboard.remove_stone(row, col)
             if player == PLAYER_WHITE:
                 self.white_pieces_count += 1
             else:
@@ -494,6 +519,7 @@ class Gomoku_Start(ShowBase):
             self.current_player = PLAYER_WHITE if self.current_player == PLAYER_BLACK else PLAYER_BLACK
         
         self._render_all_pieces()
+        self.refresh_hud()
     
     def _back_to_csgo_mode(self):
         """返回CSGO漫游模式"""
@@ -509,12 +535,13 @@ class Gomoku_Start(ShowBase):
             return False
         
         self.game_over = True
+        self.ai_service.stop_pondering()
         winner = "Black" if self.chessboard.winner == PLAYER_BLACK else "White"
         
         # 创建特效
         winner_positions = self.chessboard.get_winner_positions()
         if winner_positions:
-            self.effects_manager.create_victory_particles(winner_positions)
+            self.effects_manager.create_victory_particles(winner_positions, self.square_root)
         
         self.ui_manager.hide_ai_thinking()
         self.audio_manager.stop_bgm()
@@ -536,38 +563,24 @@ class Gomoku_Start(ShowBase):
         final_stats = self.statistics.get_final_statistics()
         self.ui_manager.show_game_over(winner, not is_player_win, final_stats)
         
+        if GAME_RECORD_AUTOSAVE:
+            self._save_record()
+        
         return True
     
+    def _save_record(self):
+        """把结束的对局追加到棋谱文件和对局库"""
+        opponent = self.ai_type if self.is_ai_enabled else "human"
+        meta = {"black": "human" if self.player_side == PLAYER_BLACK else opponent,
+                "white": "human" if self.player_side == PLAYER_WHITE else opponent}
+        save_game(self.chessboard, self.statistics.move_times, meta)
+        archive_game(self.chessboard, self.statistics.move_times, meta)
+    
     def _render_all_pieces(self):
-        """重新渲染所有棋子"""
+        """将棋盘状态同步到场景（只增删变化的棋子）"""
         if not self.game_started:
             return
-            
-        # 清理现有棋子
-        for i in range(TOTAL_SQUARES):
-            if self.pieces[i] is not None:
-                self.pieces[i].obj.removeNode()
-                self.pieces[i] = None
-
-        # 重新创建棋子
-        for row in range(BOARD_SIZE):
-            for col in range(BOARD_SIZE):
-                piece_type = self.chessboard.get_stone(row, col)
-                if piece_type != PIECE_EMPTY:
-                    square_index = row * BOARD_SIZE + col
-
-                    if piece_type == PIECE_BLACK:
-                        color = PIECEBLACK
-                    elif piece_type == PIECE_WHITE:
-                        color = WHITE_3D
-                    else:
-                        continue
-
-                    piece = Pawn(square_index, color, self)
-                    # 关键：棋子obj要reparentTo(self.square_root)
-                    piece.obj.reparentTo(self.square_root)
-                    piece.obj.setPos(square_pos(square_index))
-                    self.pieces[square_index] = piece
+        self.piece_manager.sync(self.chessboard)
     
     def check_winner(self):
         """检查胜利条件"""
@@ -580,11 +593,20 @@ class Gomoku_Start(ShowBase):
             self.side_selection_frame.destroy()
             self.side_selection_frame = None
             
+        # 停止AI计算
+        self.taskMgr.remove('ai-move-task')
+        self.taskMgr.remove('ai-first-move')
+        self.ai_service.shutdown()
+        if isinstance(self.ai_player, RemoteAI):
+            self.ai_player.close()
+            
         # 停止任务
         if hasattr(self, "mouse_task"):
             self.taskMgr.remove(self.mouse_task)
         if hasattr(self, "move_task"):
             self.taskMgr.remove(self.move_task)
+        if hasattr(self, "hud_task"):
+            self.taskMgr.remove(self.hud_task)
             
         # 清理鼠标光标
         if hasattr(self, "mouse_picker"):
@@ -596,16 +618,13 @@ class Gomoku_Start(ShowBase):
         if hasattr(self, "effects_manager"):
             self.effects_manager.cleanup_particles()
             
-        # 清理场景和棋盘
-        if hasattr(self, "scene_setup"):
-            self.scene_setup.cleanup()
+        # 场景和棋盘归主程序所有：只恢复棋盒位置并隐藏棋盘
         if hasattr(self, "board_setup"):
-            self.board_setup.cleanup()
+            self.board_setup.reset_layout()
+            self.board_setup.hide()
             
-        if hasattr(self, "pieces"):
-            for piece in self.pieces:
-                if piece is not None and hasattr(piece, "obj"):
-                    piece.obj.removeNode()
+        if hasattr(self, "piece_manager"):
+            self.piece_manager.clear()
             self.pieces = [None for _ in range(TOTAL_SQUARES)]
             
         # 清理音乐
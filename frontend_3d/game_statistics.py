@@ -22,6 +22,8 @@ class GameStatistics:
         self.player_white_total_time = 0.0
         self.move_count = 0
         self.move_history = []
+        self.move_times = []           # 每手用时（毫秒），与move_history一一对应，保存棋谱用
+        self._last_move_time = time.time()
         self.undo_count = 0
         self.last_player = None
         
@@ -52,7 +54,7 @@ class GameStatistics:
 
 
     def update_player_time(self, current_player, game_over=False, is_ai_enabled=False, ai_side=None):
-        """更新当前玩家用时"""
+        """更新当前玩家用时（由HUD时钟和状态变化时调用）"""
         if game_over:
             return
         
@@ -60,17 +62,13 @@ class GameStatistics:
         
         # 玩家切换逻辑
         if self.last_player != current_player:
-            print(f"玩家切换: {self.last_player} -> {current_player}")
-            
             # 先累加上一个玩家的用时（只在这里累加一次）
             if self.last_player is not None:
                 time_spent = current_time - self.current_player_start_time
                 if self.last_player == PLAYER_BLACK:
                     self.player_black_total_time += time_spent
-                    print(f"黑棋累加时间: {time_spent:.1f}秒，总时间: {self.player_black_total_time:.1f}秒")
                 else:
                     self.player_white_total_time += time_spent
-                    print(f"白棋累加时间: {time_spent:.1f}秒，总时间: {self.player_white_total_time:.1f}秒")
             
             # 重置新玩家的计时
             self.current_player_start_time = current_time
@@ -81,7 +79,6 @@ class GameStatistics:
             if is_human_turn:
                 self._催促_25s_played = False
                 self._催促_60s_played = False
-                print(f"切换到人类玩家，重置催促语音标记")
         
         # 催促语音逻辑 - 只在人类玩家回合触发
         is_human_turn = not is_ai_enabled or current_player != ai_side
@@ -116,7 +113,10 @@ class GameStatistics:
     def add_move(self, row, col, player):
         """添加移动记录 - 不处理时间统计"""
         # 添加移动记录
+        now = time.time()
         self.move_history.append((row, col, player))
+        self.move_times.append(round((now - self._last_move_time) * 1000))
+        self._last_move_time = now
         self.move_count += 1
         
         print(f"添加移动: ({row}, {col}), 玩家: {player}，总步数: {self.move_count}")
@@ -127,6 +127,7 @@ class GameStatistics:
         for _ in range(steps_to_undo):
             if self.move_history:
                 move = self.move_history.pop()
+                self.move_times.pop()
                 undone_moves.append(move)
                 self.move_count -= 1
         
@@ -234,16 +235,10 @@ class GameStatistics:
         
         undo_indices = []
         
-        if voice_pack == "nahita":
-            # 在Nahita语音中查找包含"悔棋"的语音
-            for keyword, index in self.audio_manager.nahita_voice_map.items():
-                if "悔棋" in keyword:
-                    undo_indices.append(index)
-        elif voice_pack == "tinyun":
-            # 在Tinyun语音中查找包含"悔棋"的语音
-            for keyword, index in self.audio_manager.tinyun_voice_map.items():
-                if "悔棋" in keyword:
-                    undo_indices.append(index)
+        # 在对应语音包中查找包含"悔棋"的语音
+        for keyword, index in self.audio_manager.get_voice_map(voice_pack).items():
+            if "悔棋" in keyword:
+                undo_indices.append(index)
         
         print(f"找到 {len(undo_indices)} 个悔棋语音 ({voice_pack}): {undo_indices}")
         return undo_indices
\ No newline at end of file
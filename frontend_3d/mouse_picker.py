@@ -8,7 +8,7 @@ from utils.constants import (
     TOTAL_SQUARES, HIGHLIGHT_INDICATOR_RADIUS, HIGHLIGHT_INDICATOR_SEGMENT, BOARD_SIZE, PLAYER_BLACK, PLAYER_WHITE,
     SOUND_DRAG  # 添加提子音效导入
 )
-from utils.helpers import square_color, point_at_z, square_pos, _get_piece_name
+from utils.helpers import square_color, point_at_z, square_pos, point_to_square, _get_piece_name
 from pieces.chess_pieces import Pawn
 
 class MousePicker:
@@ -24,6 +24,8 @@ class MousePicker:
         self.picker = CollisionTraverser()
         self.pq = CollisionHandlerQueue()
         
+        # 射线只与棋盒(bit 1)碰撞；棋盘格子默认用射线与棋盘平面解析求交
+        self.analytic_picking = True
         self.picker_node = CollisionNode('mouseRay')
         self.picker_np = self.camera.attachNewNode(self.picker_node)
         self.picker_node.setFromCollideMask(BitMask32.bit(1))
@@ -36,7 +38,6 @@ class MousePicker:
 
         # 状态变量
         self.hi_sq = False
-        self.squares = None
         # 移除 pieces 引用，改为使用 chessboard
         
         # 五子棋相关状态
@@ -70,11 +71,6 @@ class MousePicker:
         self.highlight_circle = self.base.square_root.attachNewNode(lines.create())
         self.highlight_circle.hide()  # 初始隐藏
 
-    def set_board_data(self, squares, pieces=None):
-        """设置棋盘数据引用"""
-        self.squares = squares
-        # 不再需要 pieces 参数
-
     def set_game_instance(self, game_instance):
         """设置游戏实例引用"""
         self.game_instance = game_instance
@@ -196,8 +192,8 @@ class MousePicker:
             local_pos = self.base.square_root.getRelativePoint(self.render, global_pos)
             self.temp_piece.obj.setPos(local_pos)
         
-        # 碰撞检测 - 检测整个场景
-        self.picker.traverse(self.render)
+        # 碰撞检测 - 只遍历棋盘节点（棋盒）
+        self.picker.traverse(square_root)
         if self.pq.getNumEntries() > 0:
             self.pq.sortEntries()
             entry = self.pq.getEntry(0)
@@ -205,27 +201,50 @@ class MousePicker:
             
             # 检查是否点击了棋盒
             if hit_node.hasTag('piece_box'):
-                box_type = hit_node.getTag('piece_box')
                 # 棋盒不需要高亮显示，但需要记录这个状态
                 self.hi_sq = -1  # 用特殊值表示棋盒
                 return Task.cont
             
-            # 检查是否点击了棋盘格子
-            if hit_node.hasTag('square'):
-                i = int(hit_node.getTag('square'))
-                
-                # 检查chessboard中对应位置是否为空
-                row = i // BOARD_SIZE
-                col = i % BOARD_SIZE
-                if self.game_instance and self.game_instance.chessboard.is_empty(row, col):
-                    # 高亮指示器挂在 square_root 下，直接用 square_pos(i)
-                    square_position = square_pos(i)
-                    self.highlight_circle.setPos(square_position.x, square_position.y, square_position.z + 0.02)
-                    self.highlight_circle.show()
-                    self.hi_sq = i
+            # 碰撞拾取模式：整块棋盘只有一个碰撞面，用碰撞点换算格子
+            if hit_node.hasTag('square') and not self.analytic_picking:
+                self._highlight_square(point_to_square(entry.getSurfacePoint(square_root)))
+                return Task.cont
+        
+        # 检查是否指向棋盘格子
+        if self.analytic_picking:
+            self._highlight_square(self._pick_square(square_root))
         
         return Task.cont
     
+    def set_analytic_picking(self, enabled):
+        """切换棋盘拾取方式：True为射线-平面解析求交，False为棋盘碰撞面"""
+        self.analytic_picking = enabled
+        mask = BitMask32.bit(1) if enabled else BitMask32.bit(1) | BitMask32.bit(2)
+        self.picker_node.setFromCollideMask(mask)
+    
+    def _pick_square(self, square_root):
+        """鼠标射线与棋盘平面(z=0)求交并换算为格子索引，未指向棋盘返回-1"""
+        origin = square_root.getRelativePoint(self.camera, self.picker_ray.getOrigin())
+        direction = square_root.getRelativeVector(self.camera, self.picker_ray.getDirection())
+        if abs(direction.getZ()) < 1e-6 or origin.getZ() * direction.getZ() > 0:
+            return -1  # 射线与棋盘平行或背离棋盘
+        return point_to_square(point_at_z(0, origin, direction))
+    
+    def _highlight_square(self, i):
+        """高亮指定格子（仅当该位置为空）"""
+        if i < 0:
+            return
+        
+        # 检查chessboard中对应位置是否为空
+        row = i // BOARD_SIZE
+        col = i % BOARD_SIZE
+        if self.game_instance and self.game_instance.chessboard.is_empty(row, col):
+            # 高亮指示器挂在 square_root 下，直接用 square_pos(i)
+            square_position = square_pos(i)
+            self.highlight_circle.setPos(square_position.x, square_position.y, square_position.z + 0.02)
+            self.highlight_circle.show()
+            self.hi_sq = i
+    
     def grab_piece(self):
         """从棋盒创建新棋子（取消移动已有棋子功能）"""
         print(f"grab_piece 被调用，hi_sq = {self.hi_sq}, 碰撞条目数 = {self.pq.getNumEntries()}")
@@ -245,6 +264,8 @@ class MousePicker:
                 return
             else:
                 print("点击了未知对象")
+        elif self.analytic_picking and self._pick_square(self.base.square_root) >= 0:
+            print("棋盘上的棋子无法移动")  # 提示用户
     
     def release_piece(self):
         """释放棋子（只处理新创建的棋子）"""
@@ -0,0 +1,59 @@
+"""棋子节点管理模块"""
+from utils.constants import BOARD_SIZE, TOTAL_SQUARES, PIECE_EMPTY, PIECE_BLACK, PIECE_WHITE, PIECEBLACK, WHITE_3D
+from pieces.chess_pieces import Pawn
+
+class PieceManager:
+    """棋子管理器：将ChessBoard状态增量同步到场景图"""
+
+    PIECE_COLORS = {
+        PIECE_BLACK: PIECEBLACK,
+        PIECE_WHITE: WHITE_3D,
+    }
+
+    def __init__(self, base_instance, parent):
+        self.base = base_instance
+        self.parent = parent
+        self.pieces = [None for _ in range(TOTAL_SQUARES)]
+        self.piece_types = [PIECE_EMPTY for _ in range(TOTAL_SQUARES)]
+
+    def sync(self, chessboard):
+        """对比棋盘与场景图，只增删发生变化的棋子
+
+        Returns:
+            int: 本次发生变化的格子数
+        """
+        changed = 0
+        for row in range(BOARD_SIZE):
+            board_row = chessboard.board[row]
+            for col in range(BOARD_SIZE):
+                square_index = row * BOARD_SIZE + col
+                piece_type = board_row[col]
+                if piece_type != self.piece_types[square_index]:
+                    self._set_square(square_index, piece_type)
+                    changed += 1
+        return changed
+
+    def _set_square(self, square_index, piece_type):
+        """更新单个格子的棋子节点"""
+        self.remove_piece(square_index)
+
+        color = self.PIECE_COLORS.get(piece_type)
+        if color is None:
+            return
+
+        piece = Pawn(square_index, color, self.base, self.parent)
+        self.pieces[square_index] = piece
+        self.piece_types[square_index] = piece_type
+
+    def remove_piece(self, square_index):
+        """移除单个格子上的棋子节点"""
+        piece = self.pieces[square_index]
+        if piece is not None:
+            piece.obj.removeNode()
+            self.pieces[square_index] = None
+        self.piece_types[square_index] = PIECE_EMPTY
+
+    def clear(self):
+        """移除所有棋子节点"""
+        for square_index in range(TOTAL_SQUARES):
+            self.remove_piece(square_index)
@@ -1,12 +1,13 @@
-from panda3d.core import BitMask32, LineSegs
+from panda3d.core import BitMask32, LineSegs, CollisionNode, CollisionPolygon, Point3
 from utils.constants import (
     BOARD_SIZE, TOTAL_SQUARES, SQUARE_SCALE, WHITE_BOX_POS, BLACK_BOX_POS, BOX_SIZE,
     DECORATION_POSITION_OFFSET, DECORATION_SCALE_X, DECORATION_SCALE_Y, DECORATION_SCALE_Z, DECORATION_ROTATION,
     WHITE_3D, PIECEBLACK,OPPONENT_MODEL_POSITION_RAIDEN,
     THICKNESS_POSITION_OFFSET, THICKNESS_SCALE,
-    OPPONENT_MODEL_SCALE, OPPONENT_MODEL_ROTATION
+    OPPONENT_MODEL_SCALE, OPPONENT_MODEL_ROTATION, LOAD_PRIORITY_BOARD, LOAD_PRIORITY_OPPONENT
 )
 from utils.helpers import square_pos, square_color
+from .asset_cache import asset_cache
 
 class BoardSetup:
     def __init__(self, loader, render, opponent_model_path="models/Raiden shogun.bam", opponent_model_position=OPPONENT_MODEL_POSITION_RAIDEN):
@@ -14,8 +15,9 @@ class BoardSetup:
         self.render = render
         self.opponent_model_path = opponent_model_path
         self.opponent_model_position = opponent_model_position
-        self.squares = [None for _ in range(TOTAL_SQUARES)]
         self.square_root = None
+        self.board_mesh = None
+        self.board_collision = None
         self.white_box = None
         self.black_box = None
         self.deco_white = None
@@ -26,24 +28,48 @@ class BoardSetup:
     def setup_board(self):
         """创建棋盘格子和外观装饰"""
         self.square_root = self.render.attachNewNode("squareRoot")
-        # 棋盘格子
-        for i in range(TOTAL_SQUARES):
-            square = self.loader.loadModel("models/square")
-            square.reparentTo(self.square_root)
-            square.setPos(square_pos(i))
-            square.setColor(square_color(i))
-            square.setScale(SQUARE_SCALE)
-            square.find("**/polygon").node().setIntoCollideMask(BitMask32.bit(1))
-            square.find("**/polygon").node().setTag('square', str(i))
-            square.setScale(square.getScale()[0], square.getScale()[1], 0.1)
-            self.squares[i] = square
+        # 棋盘格子（合并为单一网格）
+        self._build_board_mesh()
+        # 棋盘拾取碰撞面
+        self._setup_board_collision()
         # 网格线
         self._draw_gomoku_grid()
         # 棋盒
         self._setup_piece_boxes()
-        # 棋盘厚度和对手模型等装饰
+        # 棋盘厚度和对手模型等装饰（异步加载，完成后再挂到棋盘上）
         self._load_board_decorations()
 
+    def _build_board_mesh(self):
+        """把所有格子复制到同一节点下并合并为一个几何体"""
+        square_model = asset_cache.load_model(self.loader, "models/square")
+        self.board_mesh = self.square_root.attachNewNode("boardMesh")
+        for i in range(TOTAL_SQUARES):
+            square = square_model.copyTo(self.board_mesh)
+            square.setPos(square_pos(i))
+            square.setColor(square_color(i))
+            square.setScale(SQUARE_SCALE, SQUARE_SCALE, 0.1)
+        # 格子不参与鼠标拾取，拾取由整块碰撞面负责
+        self.board_mesh.setCollideMask(BitMask32.allOff())
+        self.board_mesh.flattenStrong()
+        square_model.removeNode()
+
+    def _setup_board_collision(self):
+        """创建覆盖整个棋盘的单一碰撞面
+
+        碰撞节点带有'square'标签，具体格子由碰撞点坐标换算得到（见 point_to_square）。
+        使用bit 2，默认的解析拾取模式下鼠标射线不会与之碰撞。
+        """
+        half = BOARD_SIZE * SQUARE_SCALE / 2
+        polygon = CollisionPolygon(
+            Point3(-half, -half, 0), Point3(half, -half, 0),
+            Point3(half, half, 0), Point3(-half, half, 0)
+        )
+        collision_node = CollisionNode("boardCollision")
+        collision_node.addSolid(polygon)
+        collision_node.setIntoCollideMask(BitMask32.bit(2))
+        collision_node.setTag('square', 'board')
+        self.board_collision = self.square_root.attachNewNode(collision_node)
+
     def _draw_gomoku_grid(self):
         """绘制棋盘网格线"""
         lines = LineSegs()
@@ -64,7 +90,7 @@ class BoardSetup:
     def _setup_piece_boxes(self):
         """创建棋盒及其装饰"""
         # 白棋盒
-        self.white_box = self.loader.loadModel("models/square")
+        self.white_box = asset_cache.load_model(self.loader, "models/square")
         self.white_box.reparentTo(self.square_root)  # 挂到square_root
         self.white_box.setPos(WHITE_BOX_POS)
         self.white_box.setTransparency(True)
@@ -74,20 +100,10 @@ class BoardSetup:
         if polygon_node:
             polygon_node.node().setIntoCollideMask(BitMask32.bit(1))
             polygon_node.node().setTag('piece_box', 'white')
-        # 白棋盒装饰
-        self.deco_white = self.loader.loadModel("models/qihe.obj")
-        if self.deco_white:
-            self.deco_white.reparentTo(self.square_root)  # 挂到square_root
-            self.deco_white.setPos(
-                WHITE_BOX_POS[0] + DECORATION_POSITION_OFFSET[0],
-                WHITE_BOX_POS[1] + DECORATION_POSITION_OFFSET[1],
-                WHITE_BOX_POS[2] + DECORATION_POSITION_OFFSET[2]
-            )
-            self.deco_white.setScale(DECORATION_SCALE_X, DECORATION_SCALE_Y, DECORATION_SCALE_Z)
-            self.deco_white.setHpr(*DECORATION_ROTATION)
-            self.deco_white.setColor(WHITE_3D)
+        # 白棋盒装饰（异步加载）
+        asset_cache.load_model_async(self.loader, "models/qihe.obj", self._on_deco_white_loaded, LOAD_PRIORITY_BOARD)
         # 黑棋盒
-        self.black_box = self.loader.loadModel("models/square")
+        self.black_box = asset_cache.load_model(self.loader, "models/square")
         self.black_box.reparentTo(self.square_root)  # 挂到square_root
         self.black_box.setPos(BLACK_BOX_POS)
         self.black_box.setTransparency(True)
@@ -97,39 +113,78 @@ class BoardSetup:
         if polygon_node:
             polygon_node.node().setIntoCollideMask(BitMask32.bit(1))
             polygon_node.node().setTag('piece_box', 'black')
-        # 黑棋盒装饰
-        self.deco_black = self.loader.loadModel("models/qihe.obj")
+        # 黑棋盒装饰（异步加载）
+        asset_cache.load_model_async(self.loader, "models/qihe.obj", self._on_deco_black_loaded, LOAD_PRIORITY_BOARD)
+
+    def _on_deco_white_loaded(self, model):
+        self.deco_white = self._attach_decoration(model, self.white_box, WHITE_3D)
+
+    def _on_deco_black_loaded(self, model):
+        self.deco_black = self._attach_decoration(model, self.black_box, PIECEBLACK)
+
+    def _attach_decoration(self, model, box, color):
+        """棋盒装饰加载完成后挂到棋盘上，位置跟随棋盒当前位置（先后手选择可能已交换棋盒）"""
+        if model is None or self.square_root is None:
+            return None
+        model.reparentTo(self.square_root)  # 挂到square_root
+        model.setPos(self._decoration_pos(box.getPos()))
+        model.setScale(DECORATION_SCALE_X, DECORATION_SCALE_Y, DECORATION_SCALE_Z)
+        model.setHpr(*DECORATION_ROTATION)
+        model.setColor(color)
+        return model
+
+    @staticmethod
+    def _decoration_pos(box_pos):
+        """棋盒装饰相对棋盒的位置"""
+        return tuple(box_pos[i] + DECORATION_POSITION_OFFSET[i] for i in range(3))
+
+    def reset_layout(self):
+        """把棋盒及装饰恢复到默认位置（选择黑棋时会交换它们）"""
+        self.white_box.setPos(WHITE_BOX_POS)
+        self.black_box.setPos(BLACK_BOX_POS)
+        if self.deco_white:
+            self.deco_white.setPos(self._decoration_pos(WHITE_BOX_POS))
         if self.deco_black:
-            self.deco_black.reparentTo(self.square_root)  # 挂到square_root
-            self.deco_black.setPos(
-                BLACK_BOX_POS[0] + DECORATION_POSITION_OFFSET[0],
-                BLACK_BOX_POS[1] + DECORATION_POSITION_OFFSET[1],
-                BLACK_BOX_POS[2] + DECORATION_POSITION_OFFSET[2]
-            )
-            self.deco_black.setScale(DECORATION_SCALE_X, DECORATION_SCALE_Y, DECORATION_SCALE_Z)
-            self.deco_black.setHpr(*DECORATION_ROTATION)
-            self.deco_black.setColor(PIECEBLACK)
+            self.deco_black.setPos(self._decoration_pos(BLACK_BOX_POS))
+
+    def show(self):
+        """显示棋盘"""
+        if self.square_root:
+            self.square_root.show()
+
+    def hide(self):
+        """隐藏棋盘（节点和资源保留，供下次切换模式时复用）"""
+        if self.square_root:
+            self.square_root.hide()
 
     def _load_board_decorations(self):
         """棋盘厚度、对手模型等装饰"""
-        # 棋盘厚度
-        self.thickness_model = self.loader.loadModel("models/qi_pan.obj")
-        if self.thickness_model:
-            self.thickness_model.reparentTo(self.square_root)
-            self.thickness_model.setPos(*THICKNESS_POSITION_OFFSET)
-            self.thickness_model.setScale(
-                BOARD_SIZE * SQUARE_SCALE * THICKNESS_SCALE[0],
-                BOARD_SIZE * SQUARE_SCALE * THICKNESS_SCALE[1],
-                THICKNESS_SCALE[2]
-            )
-            self.thickness_model.setColor(0.71, 0.55, 0.35, 1)
-        # 对手模型
-        self.opponent_model = self.loader.loadModel(self.opponent_model_path)
-        if self.opponent_model:
-            self.opponent_model.reparentTo(self.square_root)  # 挂到棋盘节点下
-            self.opponent_model.setPos(*self.opponent_model_position)  # 这里的坐标是相对棋盘的
-            self.opponent_model.setScale(*OPPONENT_MODEL_SCALE)
-            self.opponent_model.setHpr(*OPPONENT_MODEL_ROTATION)
+        asset_cache.load_model_async(self.loader, "models/qi_pan.obj", self._on_thickness_loaded, LOAD_PRIORITY_BOARD)
+        asset_cache.load_model_async(self.loader, self.opponent_model_path, self._on_opponent_loaded, LOAD_PRIORITY_OPPONENT)
+
+    def _on_thickness_loaded(self, model):
+        """棋盘厚度"""
+        if model is None or self.square_root is None:
+            return
+        self.thickness_model = model
+        self.thickness_model.reparentTo(self.square_root)
+        self.thickness_model.setPos(*THICKNESS_POSITION_OFFSET)
+        self.thickness_model.setScale(
+            BOARD_SIZE * SQUARE_SCALE * THICKNESS_SCALE[0],
+            BOARD_SIZE * SQUARE_SCALE * THICKNESS_SCALE[1],
+            THICKNESS_SCALE[2]
+        )
+        self.thickness_model.setColor(0.71, 0.55, 0.35, 1)
+
+    def _on_opponent_loaded(self, model):
+        """对手模型"""
+        if model is None or self.square_root is None:
+            return
+        self.opponent_model = model
+        self.opponent_model.reparentTo(self.square_root)  # 挂到棋盘节点下
+        self.opponent_model.setPos(*self.opponent_model_position)  # 这里的坐标是相对棋盘的
+        self.opponent_model.setScale(*OPPONENT_MODEL_SCALE)
+        self.opponent_model.setHpr(*OPPONENT_MODEL_ROTATION)
 
     def cleanup(self):
         """清理棋盘和装饰节点"""
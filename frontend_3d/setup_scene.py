@@ -1,8 +1,36 @@
-from panda3d.core import AmbientLight, DirectionalLight, LVector3, CardMaker, GeomNode, GeomVertexFormat, GeomVertexData, Geom, GeomVertexWriter, GeomPoints, RenderModeAttrib,GeomVertexReader
+from panda3d.core import AmbientLight, DirectionalLight, LVector3, CardMaker, GeomNode, GeomVertexFormat, GeomVertexData, Geom, GeomVertexWriter, GeomPoints, RenderModeAttrib, GeomVertexArrayFormat, Shader
 from direct.actor.Actor import Actor
+import builtins
 import random
 import math
+import numpy as np
 from utils.constants import *
+from utils.helpers import vertex_array_view
+from .asset_cache import asset_cache
+
+# 星星闪烁着色器：亮度 = 基础颜色 * (1 + 振幅 * sin(时间 * 频率 + 相位))
+STAR_TWINKLE_VERTEX_SHADER = """
+#version 120
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform float osg_FrameTime;
+uniform float twinkle_amplitude;
+attribute vec4 p3d_Vertex;
+attribute vec4 p3d_Color;
+attribute vec2 twinkle;
+varying vec4 star_color;
+void main() {
+    gl_Position = p3d_ModelViewProjectionMatrix * p3d_Vertex;
+    float flicker = 1.0 + twinkle_amplitude * sin(osg_FrameTime * twinkle.y + twinkle.x);
+    star_color = vec4(clamp(p3d_Color.rgb * flicker, 0.2, 1.0), p3d_Color.a);
+}
+"""
+STAR_TWINKLE_FRAGMENT_SHADER = """
+#version 120
+varying vec4 star_color;
+void main() {
+    gl_FragColor = star_color;
+}
+"""
 
 class SceneSetup:
     def __init__(self, loader, render, taskMgr):
@@ -38,7 +66,7 @@ class SceneSetup:
         """加载场景模型（背景、地面、角色、星空）"""
         # 背景
         try:
-            background_texture = self.loader.loadTexture("models/background2.jpg")
+            background_texture = asset_cache.load_texture(self.loader, "models/background2.jpg")
             card_maker = CardMaker("background")
             card_maker.setFrame(-1, 1, -1, 1)
             self.background_card = self.render.attachNewNode(card_maker.generate())
@@ -48,16 +76,8 @@ class SceneSetup:
         except Exception as e:
             print(f"背景加载失败: {e}")
 
-        # 地面
-        try:
-            self.ground_model = self.loader.loadModel("models/kk.bam")
-            self.ground_model.reparentTo(self.render)
-            self.ground_model.setPos(0, 0, -5)
-            self.ground_model.setScale(20)
-            self.ground_model.setHpr(180, 0, 0)
-            
-        except Exception as e:
-            print(f"地面模型加载失败: {e}")
+        # 地面、角色和天空球都在后台按优先级加载，加载完成后再挂到场景中
+        asset_cache.load_model_async(self.loader, "models/kk.bam", self._on_ground_loaded, LOAD_PRIORITY_SCENE)
 
         # 角色模型
         self._load_character_models()
@@ -65,10 +85,28 @@ class SceneSetup:
         # 星空
         self.load_space()
 
+    def _on_ground_loaded(self, model):
+        """地面"""
+        if model is None:
+            print("地面模型加载失败")
+            return
+        self.ground_model = model
+        self.ground_model.reparentTo(self.render)
+        self.ground_model.setPos(0, 0, -5)
+        self.ground_model.setScale(20)
+        self.ground_model.setHpr(180, 0, 0)
+
     def _load_character_models(self):
         """加载角色模型"""
+        asset_cache.load_model_async(self.loader, "models/pikaqiu.bam", self._on_character_loaded, LOAD_PRIORITY_CHARACTER)
+
+    def _on_character_loaded(self, model):
+        """角色模型加载完成后创建Actor并开始动画"""
+        if model is None:
+            print("皮卡丘模型加载失败")
+            return
         try:
-            self.leidian_model = Actor("models/pikaqiu.bam")
+            self.leidian_model = Actor(model, copy=False)
             self.leidian_model.reparentTo(self.render)
             self.leidian_model.setPos(-50, 30, -3)  
             self.leidian_model.setScale(15)
@@ -123,14 +161,7 @@ class SceneSetup:
 
     def create_star_sprites(self):
         """使用点精灵创建3D星星 - 最可靠的方法"""
-        skydome = self.loader.loadModel(SKYDOME_MODEL_PATH)
-        skydome.setScale(SKYDOME_SCALE)
-        skydome.setTwoSided(True)
-        skydome.setColor(*SKYDOME_COLOR)
-        skydome.setBin(SKYDOME_BIN, 0)
-        skydome.setDepthWrite(SKYDOME_DEPTHWRITE)
-        skydome.setLightOff(SKYDOME_LIGHTOFF)
-        skydome.reparentTo(self.render)
+        asset_cache.load_model_async(self.loader, SKYDOME_MODEL_PATH, self._on_skydome_loaded, LOAD_PRIORITY_SKY)
 
         self.stars = self.render.attachNewNode(STAR_CONTAINER_NAME)
         self.stars.setBin(STAR_BIN, 1)
@@ -140,27 +171,39 @@ class SceneSetup:
         self.star_points = GeomNode(STAR_POINTS_NODE_NAME)
         star_points_np = self.stars.attachNewNode(self.star_points)
 
-        vformat = GeomVertexFormat.getV3c4()
+        # 顶点、颜色、闪烁参数(相位, 频率)分别放在独立数组中，便于整块读写
+        vformat = GeomVertexFormat()
+        vformat.addArray(GeomVertexArrayFormat("vertex", 3, Geom.NT_float32, Geom.C_point))
+        vformat.addArray(GeomVertexArrayFormat("color", 4, Geom.NT_float32, Geom.C_color))
+        vformat.addArray(GeomVertexArrayFormat(STAR_TWINKLE_COLUMN, 2, Geom.NT_float32, Geom.C_other))
+        vformat = GeomVertexFormat.registerFormat(vformat)
         vdata = GeomVertexData("stars", vformat, Geom.UHStatic)
-        vertex = GeomVertexWriter(vdata, "vertex")
-        color = GeomVertexWriter(vdata, "color")
+        vdata.setNumRows(STAR_NUM)
 
-        for _ in range(STAR_NUM):
-            theta = random.uniform(0, math.pi)
-            phi = random.uniform(0, 2 * math.pi)
-            r = SKYDOME_RADIUS
-            x = r * math.sin(theta) * math.cos(phi)
-            y = r * math.sin(theta) * math.sin(phi)
-            z = r * math.cos(theta)
-            vertex.addData3f(x, y, z)
-            brightness = random.uniform(0.7, 1.0)
-            if random.random() < 0.8:
-                rr = gg = bb = brightness
-            else:
-                rr = brightness * random.uniform(0.8, 1.0)
-                gg = brightness * random.uniform(0.7, 0.9)
-                bb = brightness * random.uniform(0.9, 1.0)
-            color.addData4f(rr, gg, bb, 1.0)
+        theta = np.random.uniform(0, math.pi, STAR_NUM)
+        phi = np.random.uniform(0, 2 * math.pi, STAR_NUM)
+        r = SKYDOME_RADIUS
+        vertices = np.column_stack((
+            r * np.sin(theta) * np.cos(phi),
+            r * np.sin(theta) * np.sin(phi),
+            r * np.cos(theta),
+        ))
+        brightness = np.random.uniform(0.7, 1.0, STAR_NUM)
+        tint = np.ones((STAR_NUM, 3))
+        tinted = np.random.random(STAR_NUM) >= 0.8
+        num_tinted = int(tinted.sum())
+        tint[tinted, 0] = np.random.uniform(0.8, 1.0, num_tinted)
+        tint[tinted, 1] = np.random.uniform(0.7, 0.9, num_tinted)
+        tint[tinted, 2] = np.random.uniform(0.9, 1.0, num_tinted)
+        colors = np.column_stack((tint * brightness[:, None], np.ones(STAR_NUM)))
+        twinkle = np.column_stack((
+            np.random.uniform(0, 2 * math.pi, STAR_NUM),
+            np.random.uniform(*STAR_TWINKLE_SPEED_RANGE, STAR_NUM),
+        ))
+
+        vertex_array_view(vdata, 0)[:] = vertices
+        vertex_array_view(vdata, 1)[:] = colors
+        vertex_array_view(vdata, 2)[:] = twinkle
 
         points = GeomPoints(Geom.UHStatic)
         points.addConsecutiveVertices(0, STAR_NUM)
@@ -170,29 +213,50 @@ class SceneSetup:
         self.star_points.addGeom(geom)
         star_points_np.setAttrib(RenderModeAttrib.make(1))
         star_points_np.setRenderModeThickness(STAR_POINT_SIZE)
-        self.star_twinkle_task = self.taskMgr.add(self.twinkle_stars, "twinkleStars")
+
+        if self._supports_shaders():
+            # 闪烁完全在GPU上计算，不需要每帧任务
+            star_points_np.setShader(Shader.make(Shader.SL_GLSL, STAR_TWINKLE_VERTEX_SHADER, STAR_TWINKLE_FRAGMENT_SHADER))
+            star_points_np.setShaderInput("twinkle_amplitude", STAR_TWINKLE_AMPLITUDE)
+        else:
+            # 不支持着色器时，用NumPy整块写回颜色数组
+            self._star_base_colors = colors.astype(np.float32)
+            self._star_twinkle = twinkle.astype(np.float32)
+            self.star_twinkle_task = self.taskMgr.add(self.twinkle_stars, "twinkleStars")
         return self.stars
 
+    def _on_skydome_loaded(self, skydome):
+        """天空球"""
+        if skydome is None:
+            print("天空球加载失败")
+            return
+        skydome.setScale(SKYDOME_SCALE)
+        skydome.setTwoSided(True)
+        skydome.setColor(*SKYDOME_COLOR)
+        skydome.setBin(SKYDOME_BIN, 0)
+        skydome.setDepthWrite(SKYDOME_DEPTHWRITE)
+        skydome.setLightOff(SKYDOME_LIGHTOFF)
+        skydome.reparentTo(self.render)
+        self.skydome = skydome
+
+    def _supports_shaders(self):
+        """当前图形设备是否支持GLSL着色器"""
+        base = getattr(builtins, "base", None)
+        if base is None or base.win is None:
+            return False
+        gsg = base.win.getGsg()
+        return gsg is not None and gsg.getSupportsGlsl()
+
     def twinkle_stars(self, task):
-        """星星闪烁动画效果"""
+        """星星闪烁动画效果（无着色器时的回退方案）"""
         if hasattr(self, 'star_points'):
             try:
-                geom = self.star_points.modifyGeom(0)
-                vdata = geom.modifyVertexData()
-                color_reader = GeomVertexReader(vdata, "color")
-                color_writer = GeomVertexWriter(vdata, "color")
-                num_vertices = vdata.getNumRows()
-                for i in range(num_vertices):
-                    color_reader.setRow(i)
-                    color_writer.setRow(i)
-                    r, g, b, a = color_reader.getData4f()
-                    if random.random() < 0.1:
-                        brightness_change = random.uniform(0.8, 1.2)
-                        r = min(1.0, max(0.2, r * brightness_change))
-                        g = min(1.0, max(0.2, g * brightness_change))
-                        b = min(1.0, max(0.2, b * brightness_change))
-                        color_writer.setData4f(r, g, b, a)
-                geom.setVertexData(vdata)
+                vdata = self.star_points.modifyGeom(0).modifyVertexData()
+                phase = self._star_twinkle[:, 0]
+                speed = self._star_twinkle[:, 1]
+                flicker = 1.0 + STAR_TWINKLE_AMPLITUDE * np.sin(task.time * speed + phase)
+                colors = vertex_array_view(vdata, 1)
+                np.clip(self._star_base_colors[:, :3] * flicker[:, None], 0.2, 1.0, out=colors[:, :3])
             except Exception as e:
                 print(f"星星闪烁动画出错: {e}")
         return task.cont
@@ -200,14 +264,7 @@ class SceneSetup:
     def _load_starfield(self):
         """加载星空"""
         try:
-            skydome = self.loader.loadModel(SKYDOME_MODEL_PATH)
-            skydome.setScale(SKYDOME_SCALE)
-            skydome.setTwoSided(True)
-            skydome.setColor(*SKYDOME_COLOR)
-            skydome.setBin(SKYDOME_BIN, 0)
-            skydome.setDepthWrite(SKYDOME_DEPTHWRITE)
-            skydome.setLightOff(SKYDOME_LIGHTOFF)
-            skydome.reparentTo(self.render)
+            asset_cache.load_model_async(self.loader, SKYDOME_MODEL_PATH, self._on_skydome_loaded, LOAD_PRIORITY_SKY)
             self._create_stars()
         except Exception as e:
             print(f"星空加载失败: {e}")
@@ -0,0 +1,69 @@
+"""触发区域模块"""
+import math
+
+class TriggerZone:
+    """球形触发区域"""
+
+    def __init__(self, zone_id, center, radius, data=None):
+        self.zone_id = zone_id
+        self.center = tuple(center)
+        self.radius = radius
+        self.data = data
+
+    def contains(self, pos):
+        """坐标是否在区域内"""
+        dx = pos[0] - self.center[0]
+        dy = pos[1] - self.center[1]
+        dz = pos[2] - self.center[2]
+        return dx * dx + dy * dy + dz * dz < self.radius * self.radius
+
+class TriggerZones:
+    """按网格分桶索引的触发区域集合
+
+    每个区域登记到它在XY平面上覆盖的所有网格单元中，查询时只检查坐标所在单元里的区域，
+    耗时与区域总数无关。update() 只在进入或离开区域时调用回调。
+    """
+
+    def __init__(self, cell_size, on_enter=None, on_exit=None):
+        self.cell_size = cell_size
+        self.on_enter = on_enter
+        self.on_exit = on_exit
+        self.current = None
+        self._cells = {}
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def add_zone(self, zone_id, center, radius, data=None):
+        """添加区域"""
+        zone = TriggerZone(zone_id, center, radius, data)
+        min_x, min_y = self._cell(zone.center[0] - radius, zone.center[1] - radius)
+        max_x, max_y = self._cell(zone.center[0] + radius, zone.center[1] + radius)
+        for ix in range(min_x, max_x + 1):
+            for iy in range(min_y, max_y + 1):
+                self._cells.setdefault((ix, iy), []).append(zone)
+        return zone
+
+    def find(self, pos):
+        """返回包含该坐标的区域（按添加顺序取第一个），不在任何区域内时返回None"""
+        for zone in self._cells.get(self._cell(pos[0], pos[1]), ()):
+            if zone.contains(pos):
+                return zone
+        return None
+
+    def update(self, pos):
+        """根据新坐标更新当前区域，跨越区域边界时触发离开/进入回调"""
+        zone = self.find(pos)
+        if zone is self.current:
+            return zone
+        previous = self.current
+        self.current = zone
+        if previous is not None and self.on_exit:
+            self.on_exit(previous)
+        if zone is not None and self.on_enter:
+            self.on_enter(zone)
+        return zone
+
+    def reset(self):
+        """清除当前区域（不触发回调）"""
+        self.current = None
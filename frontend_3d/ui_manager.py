@@ -20,6 +20,7 @@ class UIManager:
         self.tab_hint = None
         self.ai_thinking_text = None
         self.game_over_text = None
+        self._hud_cache = {}  # 各HUD文本当前显示的内容，内容不变时不重新设置
         
         self._setup_control_ui()
         self._setup_function_ui()
@@ -118,10 +119,18 @@ class UIManager:
             else:
                 self.tab_hint.setText("Press TAB to show controls and stats")
     
+    def _set_hud_text(self, key, text, fg=None):
+        """复用已有文本节点，只有内容或颜色变化时才更新"""
+        element = self.function_ui.get(key)
+        if not element or self._hud_cache.get(key) == (text, fg):
+            return
+        self._hud_cache[key] = (text, fg)
+        element.setText(text)
+        if fg is not None:
+            element.setFg(fg)
+    
     def update_statistics(self, game_data):
         """更新统计信息"""
-        if not self.function_ui['stats_text']:
-            return
         
         def format_time(seconds):
             minutes = int(seconds // 60)
@@ -134,7 +143,7 @@ class UIManager:
         stats_text += f"White Time: {format_time(game_data['white_time'])}\n"
         stats_text += f"Undo Left: {MAX_UNDO_STEPS - game_data['undo_count']}"
         
-        self.function_ui['stats_text'].setText(stats_text)
+        self._set_hud_text('stats_text', stats_text)
     
     def update_current_player(self, current_player, is_ai_enabled, ai_side, game_over, player_side=None):
         """更新当前玩家显示（支持动态先后手）"""
@@ -159,9 +168,7 @@ class UIManager:
             current_text = f"AI Turn ({ai_color})"  
             color = (1, 1, 0, 1)  # 黄色
         
-        if hasattr(self, 'current_player_label'):
-            self.current_player_label['text'] = current_text
-            self.current_player_label['text_fg'] = color
+        self._set_hud_text('current_player', current_text, color)
     
     def show_ai_thinking(self):
         """显示AI思考状态"""
@@ -182,6 +189,9 @@ class UIManager:
             victory_text = f" Congratulations! {winner} Wins!"
             text_color = UI_COLOR_GREEN
         
+        if self.function_ui.get('current_player'):
+            self.function_ui['current_player'].hide()
+        
         combined_text = victory_text + "\n\n" + final_stats + "\nPress B to go back to the world" + "\nPress R to Restart"
         
         self.game_over_text = OnscreenText(
@@ -192,6 +202,8 @@ class UIManager:
         """清理游戏结束UI"""
         if hasattr(self, 'game_over_text') and self.game_over_text:
             self.game_over_text.destroy()
+        if self.function_ui.get('current_player'):
+            self.function_ui['current_player'].show()
     
     def cleanup(self):
         """彻底清理所有UI元素"""
@@ -215,6 +227,7 @@ class UIManager:
                 if element:
                     element.destroy()
             self.function_ui.clear()
+        self._hud_cache.clear()
 
         # 销毁可隐藏UI
         if hasattr(self, 'hideable_ui_elements'):
@@ -1,21 +1,39 @@
 """棋子类定义"""
 
 from utils.helpers import square_pos
+from utils.asset_pipeline import resolve_asset_path
 
 class Piece(object):
-    """棋子基类"""
-    def __init__(self, square, color, base_instance):
+    """棋子基类
+
+    同一模型只加载一次作为原型，每个棋子是原型的一个实例(instanceTo)，
+    颜色、位置等状态设置在棋子自己的父节点上，不会影响其他实例。
+    """
+    _prototypes = {}
+
+    def __init__(self, square, color, base_instance, parent=None):
         self.square = square
         self.base = base_instance
-        self.obj = self.base.loader.loadModel(self.model)
-        self.obj.reparentTo(self.base.render)
+        if parent is None:
+            parent = self.base.render
+        self.obj = parent.attachNewNode(self.__class__.__name__)
+        self.get_prototype(self.base.loader).instanceTo(self.obj)
         self.obj.setColor(color)
         self.obj.setPos(square_pos(square))
 
+    @classmethod
+    def get_prototype(cls, loader):
+        """获取该棋子类型的共享模型原型"""
+        prototype = Piece._prototypes.get(cls.model)
+        if prototype is None:
+            prototype = loader.loadModel(resolve_asset_path(cls.model))
+            Piece._prototypes[cls.model] = prototype
+        return prototype
+
 class Pawn(Piece):
     model = "models/white_chess_piece.obj"
 
-    def __init__(self, square_index, color, base):
-        super().__init__(square_index, color, base)
+    def __init__(self, square_index, color, base, parent=None):
+        super().__init__(square_index, color, base, parent)
         self.obj.setScale(0.3, 0.3, 0.3)  # 缩小模型
-        self.obj.setHpr(0, -90, 0)       # 调整方向
\ No newline at end of file
+        self.obj.setHpr(0, -90, 0)       # 调整方向
@@ -4,31 +4,80 @@ Run Gomoku game.
 """
 
 from direct.showbase.ShowBase import ShowBase
+from direct.gui.OnscreenText import OnscreenText
 from frontend_3d.CSGO_mode import CSGOCameraDemo
 from frontend_3d.game import Gomoku_Start
+from frontend_3d.audio_manager import AudioManager
+from frontend_3d.setup_scene import SceneSetup
+from frontend_3d.setup_board import BoardSetup
+from frontend_3d.asset_cache import asset_cache
 
 class MainApp(ShowBase):
     def __init__(self):
         super().__init__()
         self.mode = "csgo"
+
+        # 跨模式共享的持久对象：场景、音频和棋盘只创建一次，切换模式时只做显示/隐藏
+        self.audio_manager = AudioManager(self.loader, self.taskMgr)
+        self.scene_setup = SceneSetup(self.loader, self.render, self.taskMgr)
+        self.scene_setup.setup_lighting()
+        self.scene_setup.load_scene()
+        self.boards = {}
+
         self.csgo_mode = CSGOCameraDemo(self)
         self.gomoku_mode = None
         self.last_camera_pos = None
         self.last_camera_hpr = None
 
+        # 模型在后台加载时显示加载进度（棋盘已经可以交互）
+        self.loading_text = None
+        self.loading_remaining = None
+        self.taskMgr.add(self._update_loading_screen, "loadingScreenTask")
+
         # 监听切换事件
         self.accept("start-gomoku", self.start_gomoku)
         self.accept("back-to-csgo", self.back_to_csgo)
 
+    def _update_loading_screen(self, task):
+        """显示剩余的后台加载数量，全部完成后移除提示"""
+        remaining = asset_cache.pending_count()
+        if remaining == 0:
+            if self.loading_text:
+                self.loading_text.destroy()
+                self.loading_text = None
+            return task.done
+        if remaining != self.loading_remaining:
+            self.loading_remaining = remaining
+            if self.loading_text is None:
+                # Panda3D默认字体没有中文字形，使用2D版本的字体
+                font = self.loader.loadFont("frontend_2d/font/12345.TTF")
+                self.loading_text = OnscreenText(
+                    text="", pos=(0, -0.9), scale=0.06, fg=(1, 1, 1, 1), font=font, parent=self.aspect2d
+                )
+            self.loading_text.setText(f"正在加载模型...（剩余 {remaining} 个）")
+        return task.cont
+
+    def get_board(self, ai_type, opponent_model_path, opponent_model_position):
+        """获取某个AI对应的棋盘，首次使用时创建，之后一直复用"""
+        board = self.boards.get(ai_type)
+        if board is None:
+            board = BoardSetup(
+                self.loader,
+                self.render,
+                opponent_model_path=opponent_model_path,
+                opponent_model_position=opponent_model_position
+            )
+            board.setup_board()
+            self.boards[ai_type] = board
+        return board
+
     def start_gomoku(self, camera_pos, camera_hpr, ai_type="classical", board_y=0, opponent_model_path=None, opponent_model_position=None):
         self.last_camera_pos = camera_pos
         self.last_camera_hpr = camera_hpr
         if self.gomoku_mode:
             self.gomoku_mode.cleanup()
             self.gomoku_mode = None
-        if self.csgo_mode:
-            self.csgo_mode.cleanup()
-            self.csgo_mode = None
+        self.csgo_mode.suspend()
 
         self.gomoku_mode = Gomoku_Start(
             self,
@@ -44,17 +93,10 @@ class MainApp(ShowBase):
         if self.gomoku_mode:
             self.gomoku_mode.cleanup()
             self.gomoku_mode = None
-        # 清理旧的 csgo_mode
-        if self.csgo_mode:
-            self.csgo_mode.cleanup()
-            self.csgo_mode = None
         # 恢复CSGO模式
-        self.csgo_mode = CSGOCameraDemo(self)
-        if self.last_camera_pos:
-            self.csgo_mode.camera.setPos(self.last_camera_pos)
-            self.csgo_mode.camera.setHpr(self.last_camera_hpr)
+        self.csgo_mode.resume(self.last_camera_pos, self.last_camera_hpr)
         self.mode = "csgo"
 
 if __name__ == "__main__":
     app = MainApp()
-    app.run()
\ No newline at end of file
+    app.run()
@@ -0,0 +1,10 @@
+#!/usr/bin/env python
+"""
+Headless engine-vs-engine arena.
+"""
+
+import sys
+from utils.arena import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+#!/usr/bin/env python
+"""
+Local engine server for concurrent games.
+"""
+
+import sys
+from utils.engine_server import main
+
+if __name__ == "__main__":
+    sys.exit(main())
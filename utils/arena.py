@@ -0,0 +1,235 @@
+"""无界面对战场
+
+在进程池中让多个引擎配置两两对战，每对引擎按相同的随机开局交换先后手各下一局，
+统计胜负和、Elo差及置信区间，并记录每一步的思考时间。
+引擎通过 GomokuAI.get_next_chessboard 落子，配置写作 "名称:参数=值,..."，例如 minimax:depth=2。
+"""
+import io
+import ast
+import json
+import math
+import random
+import argparse
+import importlib
+import itertools
+import contextlib
+import unicodedata
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .chessboard import ChessBoard
+from .constants import BOARD_SIZE, PLAYER_BLACK, PLAYER_WHITE
+
+ENGINES = {
+    "classical": ("Gomoku_ai_classical.ai", "AIPlayer"),
+    "minimax": ("Gomoku_ai_minimax.ai", "MinimaxAIPlayer"),
+    "mcts": ("Gomoku_ai_MCTS.aiv3", "MCTSAIPlayer"),
+}
+
+def parse_engine_spec(spec):
+    """把 "名称:参数=值,..." 解析为 (名称, 参数字典)"""
+    name, _, args = spec.partition(':')
+    if name not in ENGINES:
+        raise ValueError(f"未知引擎: {name}（可选: {', '.join(ENGINES)}）")
+    kwargs = {}
+    for item in filter(None, args.split(',')):
+        key, _, value = item.partition('=')
+        try:
+            kwargs[key.strip()] = ast.literal_eval(value.strip())
+        except (ValueError, SyntaxError):
+            kwargs[key.strip()] = value.strip()
+    return name, kwargs
+
+def create_engine(spec):
+    """按配置创建引擎实例（按需导入引擎模块）"""
+    name, kwargs = parse_engine_spec(spec)
+    module_name, class_name = ENGINES[name]
+    return getattr(importlib.import_module(module_name), class_name)(**kwargs)
+
+def random_opening(rng, moves, board_size):
+    """在中心附近随机摆放开局棋子（黑白交替）"""
+    center = board_size // 2
+    cells = [(center + dr, center + dc) for dr in range(-2, 3) for dc in range(-2, 3)]
+    return rng.sample(cells, moves)
+
+def play_game(task):
+    """在工作进程中下一局，返回对局记录
+
+    引擎出错或没有落子时判负；棋盘下满或达到手数上限时为和棋。
+    use_book 为False时引擎不查询开局库（生成开局库的自对弈）。
+    """
+    index, black, white, seed, opening, max_moves, board_size, verbose, use_book = task
+    random.seed(seed)
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        engines = {PLAYER_BLACK: create_engine(black), PLAYER_WHITE: create_engine(white)}
+        for engine in engines.values():
+            engine.use_book = use_book
+        board = ChessBoard(size=board_size)
+        for row, col in opening:
+            board.place_stone(row, col, board.position.side_to_move)
+
+        moves = []
+        winner = 0
+        reason = "draw"
+        while board.position.stones < board_size * board_size and len(moves) < max_moves:
+            side = board.position.side_to_move
+            played = len(board.move_history)
+            start = perf_counter()
+            try:
+                board = engines[side].get_next_chessboard(board, side)
+            except Exception as e:
+                print(f"引擎出错: {e}")
+            think_time = perf_counter() - start
+            if len(board.move_history) == played:
+                winner = PLAYER_WHITE if side == PLAYER_BLACK else PLAYER_BLACK
+                reason = "forfeit"
+                break
+            row, col, _ = board.move_history[-1]
+            moves.append((row, col, side, round(think_time, 4)))
+            if board.winner != 0:
+                winner = board.winner
+                reason = "five"
+                break
+
+    return {
+        "index": index,
+        "black": black,
+        "white": white,
+        "seed": seed,
+        "opening": opening,
+        "moves": moves,
+        "winner": winner,
+        "reason": reason,
+    }
+
+def schedule_games(engines, games, seed, opening_moves, max_moves, board_size, verbose):
+    """两两配对，每对下games局；相邻两局使用同一开局并交换先后手"""
+    tasks = []
+    for a, b in itertools.combinations(engines, 2):
+        for game in range(games):
+            pair_rng = random.Random(f"{seed}:{a}:{b}:{game // 2}")
+            opening = random_opening(pair_rng, opening_moves, board_size)
+            black, white = (a, b) if game % 2 == 0 else (b, a)
+            tasks.append((len(tasks), black, white, seed + len(tasks), opening, max_moves, board_size, verbose, True))
+    return tasks
+
+def elo_from_score(score):
+    """期望得分换算为Elo差，得分为0或1时截断，避免无穷大"""
+    score = min(max(score, 0.001), 0.999)
+    return -400 * math.log10(1 / score - 1)
+
+def elo_interval(scores, z=1.96):
+    """按每局得分(1/0.5/0)估计Elo差及其置信区间，返回 (elo, 下限, 上限)"""
+    n = len(scores)
+    mean = sum(scores) / n
+    variance = sum((s - mean) ** 2 for s in scores) / n
+    margin = z * math.sqrt(variance / n)
+    return elo_from_score(mean), elo_from_score(mean - margin), elo_from_score(mean + margin)
+
+def summarize(engines, records):
+    """汇总每对引擎的胜负和与Elo差、每个引擎的思考时间"""
+    pairs = []
+    for a, b in itertools.combinations(engines, 2):
+        scores = []
+        wins = draws = losses = 0
+        for record in records:
+            if {record["black"], record["white"]} != {a, b}:
+                continue
+            a_side = PLAYER_BLACK if record["black"] == a else PLAYER_WHITE
+            if record["winner"] == 0:
+                draws += 1
+                scores.append(0.5)
+            elif record["winner"] == a_side:
+                wins += 1
+                scores.append(1.0)
+            else:
+                losses += 1
+                scores.append(0.0)
+        if not scores:
+            continue
+        elo, low, high = elo_interval(scores)
+        pairs.append({
+            "engine": a, "opponent": b, "games": len(scores),
+            "wins": wins, "draws": draws, "losses": losses,
+            "score": sum(scores) / len(scores),
+            "elo": elo, "elo_low": low, "elo_high": high,
+        })
+
+    timing = {}
+    for engine in engines:
+        times = [
+            think_time
+            for record in records
+            for _, _, side, think_time in record["moves"]
+            if record["black" if side == PLAYER_BLACK else "white"] == engine
+        ]
+        timing[engine] = {
+            "moves": len(times),
+            "mean_time": sum(times) / len(times) if times else 0,
+            "max_time": max(times, default=0),
+        }
+    return {"pairs": pairs, "timing": timing}
+
+def _cell(text, width, left=False):
+    """按显示宽度对齐（中文字符占两格）"""
+    text = str(text)
+    padding = width - sum(2 if unicodedata.east_asian_width(ch) in 'WF' else 1 for ch in text)
+    return text + ' ' * padding if left else ' ' * padding + text
+
+def print_summary(summary):
+    print("\n对战结果（以左侧引擎为准）:")
+    print(_cell('引擎', 24, True) + _cell('对手', 24, True) + ''.join(
+        _cell(h, w) for h, w in (('局数', 6), ('胜', 5), ('和', 5), ('负', 5), ('得分率', 8))) + "  Elo差 (95%置信区间)")
+    for p in summary["pairs"]:
+        print(_cell(p['engine'], 24, True) + _cell(p['opponent'], 24, True)
+              + f"{p['games']:>6}{p['wins']:>5}{p['draws']:>5}{p['losses']:>5}{p['score']:>8.1%}"
+              + f"  {p['elo']:+.0f} [{p['elo_low']:+.0f}, {p['elo_high']:+.0f}]")
+
+    print("\n思考时间:")
+    print(_cell('引擎', 24, True) + _cell('步数', 8) + _cell('平均(秒)', 12) + _cell('最长(秒)', 12))
+    for engine, t in summary["timing"].items():
+        print(_cell(engine, 24, True) + f"{t['moves']:>8}{t['mean_time']:>12.3f}{t['max_time']:>12.3f}")
+
+def run_arena(engines, games=2, workers=None, seed=0, opening_moves=2, max_moves=BOARD_SIZE * BOARD_SIZE,
+              board_size=BOARD_SIZE, verbose=False):
+    """运行所有对局，返回 (对局记录, 汇总)"""
+    for spec in engines:
+        parse_engine_spec(spec)
+    tasks = schedule_games(engines, games, seed, opening_moves, max_moves, board_size, verbose)
+    records = []
+    # ProcessPoolExecutor 的工作进程不是守护进程，MCTS引擎可以在其中再创建自己的进程池
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_game, task) for task in tasks]
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            result = {0: "和棋", PLAYER_BLACK: "黑胜", PLAYER_WHITE: "白胜"}[record["winner"]]
+            print(f"[{len(records)}/{len(tasks)}] {record['black']} (黑) vs {record['white']} (白): "
+                  f"{result}，{len(record['moves'])}手")
+    records.sort(key=lambda r: r["index"])
+    return records, summarize(engines, records)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无界面引擎对战：两两对局，统计胜负与Elo")
+    parser.add_argument('engines', nargs='+', help="引擎配置，如 classical、minimax:depth=2、mcts:num_processes=1,max_time=2")
+    parser.add_argument('--games', type=int, default=2, help="每对引擎的对局数（建议为偶数，先后手各半）")
+    parser.add_argument('--workers', type=int, default=None, help="并行对局的进程数，默认为CPU核数")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子，决定开局和引擎内部的随机数")
+    parser.add_argument('--opening-moves', type=int, default=2, help="在中心附近随机摆放的开局棋子数")
+    parser.add_argument('--max-moves', type=int, default=BOARD_SIZE * BOARD_SIZE, help="每局最多手数，超过判和")
+    parser.add_argument('--output', help="把对局记录和汇总写入JSON文件")
+    parser.add_argument('--verbose', action='store_true', help="显示引擎自身的输出")
+    args = parser.parse_args(argv)
+    if len(set(args.engines)) < 2:
+        parser.error("至少需要两个不同的引擎配置")
+
+    records, summary = run_arena(
+        list(dict.fromkeys(args.engines)), games=args.games, workers=args.workers, seed=args.seed,
+        opening_moves=args.opening_moves, max_moves=args.max_moves, verbose=args.verbose
+    )
+    print_summary(summary)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"config": vars(args), "summary": summary, "games": records}, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入: {args.output}")
+    return 0
@@ -0,0 +1,191 @@
+"""资源构建管线
+
+离线把 models/ 下的 OBJ/MTL 模型转换为 BAM（可选压缩为 .bam.pz），
+把纹理转换为预生成 mipmap 的 TXO。产物放在 ASSET_BUILD_DIR 下，
+文件名带源文件内容哈希，对应关系记录在清单文件中。
+
+运行时通过 resolve_asset_path() 选择加载路径：产物存在且源文件没有变化时
+返回产物路径，否则返回原路径，照常在运行时解析源文件。
+"""
+import os
+import json
+import hashlib
+import argparse
+from .constants import ASSET_SOURCE_DIR, ASSET_BUILD_DIR, ASSET_MANIFEST
+
+MODEL_EXTENSIONS = ('.obj',)
+TEXTURE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+_manifest = None
+
+def _normalize(path):
+    """统一路径写法，作为清单中的键"""
+    return os.path.normpath(path).replace(os.sep, '/')
+
+def load_manifest():
+    """读取产物清单，不存在或损坏时返回空清单"""
+    try:
+        with open(os.path.join(ASSET_BUILD_DIR, ASSET_MANIFEST), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"assets": {}}
+    manifest.setdefault("assets", {})
+    return manifest
+
+def save_manifest(manifest):
+    """写入产物清单"""
+    os.makedirs(ASSET_BUILD_DIR, exist_ok=True)
+    with open(os.path.join(ASSET_BUILD_DIR, ASSET_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+def source_dependencies(path):
+    """资源的全部源文件：模型本身及其引用的MTL"""
+    sources = [_normalize(path)]
+    if path.lower().endswith('.obj'):
+        base_dir = os.path.dirname(path)
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                if line.startswith('mtllib'):
+                    mtl_path = os.path.join(base_dir, line.split(None, 1)[1].strip())
+                    if os.path.exists(mtl_path):
+                        sources.append(_normalize(mtl_path))
+    return sources
+
+def content_hash(sources):
+    """所有源文件内容的SHA1"""
+    digest = hashlib.sha1()
+    for source in sources:
+        digest.update(source.encode('utf-8'))
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def _stat_signature(sources):
+    """源文件的(路径, 大小, 修改时间)，用于快速判断是否变化"""
+    signature = []
+    for source in sources:
+        stat = os.stat(source)
+        signature.append([source, stat.st_size, stat.st_mtime_ns])
+    return signature
+
+def resolve_asset_path(path):
+    """返回应加载的路径：有新鲜的预构建产物时返回产物，否则返回原路径"""
+    global _manifest
+    if _manifest is None:
+        _manifest = load_manifest()
+    entry = _manifest["assets"].get(_normalize(path))
+    if entry is None:
+        return path
+    output_path = os.path.join(ASSET_BUILD_DIR, entry["output"])
+    if not os.path.exists(output_path):
+        return path
+
+    sources = [source[0] for source in entry["sources"]]
+    try:
+        signature = _stat_signature(sources)
+        if signature != entry["sources"]:
+            # 修改时间变了（例如重新检出），内容哈希一致仍视为新鲜
+            if content_hash(sources) != entry["hash"]:
+                return path
+            entry["sources"] = signature
+    except OSError:
+        return path
+    return output_path
+
+def _bake_mipmaps(texture):
+    """为纹理生成mipmap并启用三线性过滤"""
+    from panda3d.core import SamplerState
+    texture.setMinfilter(SamplerState.FT_linear_mipmap_linear)
+    if texture.hasRamImage():
+        texture.generateRamMipmapImages()
+
+def build_model(path, output_path):
+    """把单个模型转换为BAM，纹理连同mipmap一起写入"""
+    from panda3d.core import Loader, LoaderOptions, NodePath, Filename
+    node = Loader.getGlobalPtr().loadSync(
+        Filename.fromOsSpecific(path), LoaderOptions(LoaderOptions.LF_no_cache)
+    )
+    if node is None:
+        raise IOError(f"无法加载模型: {path}")
+    model = NodePath(node)
+    for texture in model.findAllTextures():
+        _bake_mipmaps(texture)
+    if not model.writeBamFile(Filename.fromOsSpecific(output_path)):
+        raise IOError(f"无法写入: {output_path}")
+
+def build_texture(path, output_path):
+    """把单个纹理转换为带mipmap的TXO"""
+    from panda3d.core import TexturePool, Filename
+    texture = TexturePool.loadTexture(Filename.fromOsSpecific(path))
+    if texture is None:
+        raise IOError(f"无法加载纹理: {path}")
+    _bake_mipmaps(texture)
+    if not texture.write(Filename.fromOsSpecific(output_path)):
+        raise IOError(f"无法写入: {output_path}")
+
+def build_assets(source_dir=ASSET_SOURCE_DIR, compress=False, force=False):
+    """构建所有资源，源文件内容没有变化的跳过
+
+    Returns:
+        tuple: (构建数量, 跳过数量, 失败数量)
+    """
+    from panda3d.core import loadPrcFileData
+    # 纹理数据（含mipmap）直接写入BAM，而不是只记录纹理文件名
+    loadPrcFileData("", "bam-texture-mode rawdata")
+
+    os.makedirs(ASSET_BUILD_DIR, exist_ok=True)
+    manifest = load_manifest()
+    built = skipped = failed = 0
+
+    for name in sorted(os.listdir(source_dir)):
+        path = _normalize(os.path.join(source_dir, name))
+        stem, ext = os.path.splitext(name)
+        ext = ext.lower()
+        if ext in MODEL_EXTENSIONS:
+            builder, suffix = build_model, '.bam'
+        elif ext in TEXTURE_EXTENSIONS:
+            builder, suffix = build_texture, '.txo'
+        else:
+            continue
+
+        sources = source_dependencies(path)
+        digest = content_hash(sources)
+        output = f"{stem}-{digest[:16]}{suffix}" + ('.pz' if compress else '')
+        output_path = os.path.join(ASSET_BUILD_DIR, output)
+        entry = manifest["assets"].get(path)
+        if not force and entry and entry["output"] == output and os.path.exists(output_path):
+            skipped += 1
+            continue
+
+        try:
+            builder(path, output_path)
+        except Exception as e:
+            print(f"构建失败: {path} ({e})")
+            failed += 1
+            continue
+
+        # 删除旧的产物
+        if entry and entry["output"] != output:
+            old_path = os.path.join(ASSET_BUILD_DIR, entry["output"])
+            if os.path.exists(old_path):
+                os.remove(old_path)
+        manifest["assets"][path] = {
+            "hash": digest,
+            "output": output,
+            "sources": _stat_signature(sources),
+        }
+        built += 1
+        print(f"已构建: {path} -> {output}")
+
+    save_manifest(manifest)
+    print(f"资源构建完成: 构建 {built} 个，跳过 {skipped} 个，失败 {failed} 个")
+    return built, skipped, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="把OBJ模型和纹理预构建为BAM/TXO")
+    parser.add_argument('--compress', action='store_true', help="压缩产物(.pz)")
+    parser.add_argument('--force', action='store_true', help="忽略清单，全部重新构建")
+    args = parser.parse_args(argv)
+    _, _, failed = build_assets(compress=args.compress, force=args.force)
+    return 1 if failed else 0
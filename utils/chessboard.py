@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from typing import List, Optional, Tuple
 from utils.constants import PIECE_EMPTY, PIECE_BLACK, PIECE_WHITE, PLAYER_BLACK, PLAYER_WHITE, BOARD_SIZE
+from utils.position import Position
 
 class ChessBoard(BaseModel):
     size: int = Field(default=15, description="棋盘大小")
@@ -11,11 +12,18 @@ class ChessBoard(BaseModel):
     winning_line: List[Tuple[int, int]] = Field(default_factory=list, description="获胜连线")
     winner_positions: List[Tuple[int, int]] = Field(default_factory=list, description="获胜的五个棋子位置")
     board_size: int = Field(default=BOARD_SIZE, description="棋盘大小")
+    _position: Position = PrivateAttr(default=None)
     
     def __init__(self, **data):
         super().__init__(**data)
         if not self.board:
             self.board = [[PIECE_EMPTY for _ in range(self.size)] for _ in range(self.size)]
+        self._position = Position.from_board(self.board)
+    
+    @property
+    def position(self) -> Position:
+        """与board同步的紧凑局面，只能通过本类的方法修改"""
+        return self._position
     
     def place_stone(self, row: int, col: int, player: int) -> bool:
         """在指定位置放置棋子
@@ -30,6 +38,7 @@ class ChessBoard(BaseModel):
         if 0 <= row < self.size and 0 <= col < self.size and self.board[row][col] == PIECE_EMPTY:
             piece = PIECE_BLACK if player == PLAYER_BLACK else PIECE_WHITE
             self.board[row][col] = piece
+            self._position.place(row, col, player)
             
             # 记录落子历史
             self.move_history.append((row, col, player))
@@ -115,6 +124,7 @@ class ChessBoard(BaseModel):
             
             # 清空棋盘位置
             self.board[row][col] = PIECE_EMPTY
+            self._position.remove(row, col)
             
             # 重置赢家信息
             self.winner = 0
@@ -132,6 +142,7 @@ class ChessBoard(BaseModel):
             # 将棋子放回棋盘
             piece = PIECE_BLACK if player == PLAYER_BLACK else PIECE_WHITE
             self.board[row][col] = piece
+            self._position.place(row, col, player)
             
             # 添加回历史记录
             self.move_history.append((row, col, player))
@@ -144,6 +155,24 @@ class ChessBoard(BaseModel):
             return (row, col, player)
         return None
     
+    def remove_stone(self, row: int, col: int) -> bool:
+        """移除指定位置的棋子（不进入恢复栈），用于由外部管理悔棋记录的场合
+        
+        Returns:
+            bool: 该位置是否有棋子
+        """
+        if not (0 <= row < self.size and 0 <= col < self.size) or self.board[row][col] == PIECE_EMPTY:
+            return False
+        self.board[row][col] = PIECE_EMPTY
+        self._position.remove(row, col)
+        for i in range(len(self.move_history) - 1, -1, -1):
+            if self.move_history[i][:2] == (row, col):
+                del self.move_history[i]
+                break
+        self.winner = 0
+        self.winning_line = []
+        return True
+    
     def is_empty(self, row: int, col: int) -> bool:
         """检查指定位置是否为空"""
         return 0 <= row < self.size and 0 <= col < self.size and self.board[row][col] == PIECE_EMPTY
@@ -157,6 +186,7 @@ class ChessBoard(BaseModel):
     def clear_board(self):
         """清空棋盘"""
         self.board = [[PIECE_EMPTY for _ in range(self.size)] for _ in range(self.size)]
+        self._position = Position(self.size)
         self.move_history = []
         self.undo_stack = []
         self.winner = 0
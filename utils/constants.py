@@ -67,6 +67,18 @@ HIGHLIGHT_INDICATOR_RADIUS = 0.3  # 高亮指示器缩放比例
 HIGHLIGHT_INDICATOR_SEGMENT = 32  # 高亮指示器分段数，越多越圆滑
 MODEL_SCALE = 0.5  # 模型缩放比例，用于调节模型大小
 
+# 异步加载优先级（数值越大越先加载）；棋盘格子、棋盒和棋子同步加载，保证最先可交互
+LOAD_PRIORITY_BOARD = 40      # 棋盘厚度、棋盒装饰
+LOAD_PRIORITY_OPPONENT = 30   # 对手模型
+LOAD_PRIORITY_SCENE = 20      # 地面
+LOAD_PRIORITY_CHARACTER = 10  # 场景角色
+LOAD_PRIORITY_SKY = 0         # 天空球
+
+# 资源构建常量（python build_assets.py）
+ASSET_SOURCE_DIR = "models"          # 源模型和纹理目录
+ASSET_BUILD_DIR = "models/build"     # 预构建的BAM/TXO产物目录
+ASSET_MANIFEST = "manifest.json"     # 产物清单：源文件 -> 内容哈希、产物文件名
+
 # 棋盒位置
 WHITE_BOX_POS = (0, -6, 0)  # 白棋盒位置
 BLACK_BOX_POS = (0, 6, 0)   # 黑棋盒位置
@@ -98,6 +110,15 @@ OPPONENT_MODEL_POSITION_PIKA = (0,20,-5)  # 皮卡丘默认位置 (X, Y, Z)
 OPPONENT_MODEL_SCALE = (15,15,15)  # 默认缩放比例 (X, Y, Z)
 OPPONENT_MODEL_ROTATION = (0, 0, 0)  # 默认旋转角度 (X, Y, Z)
 
+# 漫游模式触发区域：(AI类型, 提示名称, 区域中心)，进入后可按空格开始对局
+ROAM_TRIGGER_ZONES = [
+    ("classical", "classical", (-42, 0, 0)),
+    ("minimax", "minimax", (0, 0, 0)),
+    ("mcts", "MCTS", (42, 0, 0)),
+]
+ROAM_TRIGGER_RADIUS = 20     # 触发区域半径
+ROAM_TRIGGER_CELL_SIZE = 20  # 触发区域网格索引的单元大小
+
 # 星空相关常量
 SKYDOME_MODEL_PATH = "models/misc/sphere"
 SKYDOME_SCALE = 1000
@@ -113,6 +134,9 @@ STAR_LIGHTOFF = 1
 STAR_POINTS_NODE_NAME = "star_points"
 STAR_NUM = 3000
 STAR_POINT_SIZE = 3.0
+STAR_TWINKLE_COLUMN = "twinkle"           # 每颗星的闪烁参数列(相位, 频率)
+STAR_TWINKLE_AMPLITUDE = 0.2              # 闪烁亮度变化幅度
+STAR_TWINKLE_SPEED_RANGE = (0.5, 3.0)     # 闪烁频率范围(弧度/秒)
 FALLBACK_SKY_FRAME = (-100, 100, -100, 100)
 FALLBACK_SKY_P = -90
 FALLBACK_SKY_Z = -50
@@ -203,6 +227,7 @@ TINYUN_VOICE = [
 WINNER_MUSIC = "sound/winner_music.wav"  # 获胜音乐
 LOSER_MUSIC = "sound/nahita/loser_music.wav"  # 失败音乐
 SOUND_VOLUME = 0.18  # BGM默认音量
+AUDIO_CACHE_SIZE = 12  # 内存中最多保留的已解码语音数量（LRU淘汰）
 
 # 游戏统计和功能常量
 MAX_UNDO_STEPS = 3                  # 最大悔棋次数
@@ -210,8 +235,12 @@ PLAYER_THINK_TIME_LIMIT = 30        # 玩家思考时间限制（秒）
 STATISTICS_DISPLAY_TIME = 10        # 统计信息显示时间（秒）
 
 # 特效常量
-VICTORY_PARTICLE_COUNT = 100        # 胜利粒子数量
+VICTORY_PARTICLE_COUNT = 100        # 胜利粒子数量（平均分配到获胜的五子上）
 VICTORY_PARTICLE_DURATION = 3.0     # 胜利特效持续时间
+VICTORY_PARTICLE_DELAY = 0.05       # 同一棋子上相邻粒子的出现间隔（秒）
+VICTORY_PARTICLE_RISE_SPEED = 0.5   # 粒子上升速度
+PARTICLE_POOL_SIZE = 2048           # 粒子池容量（环形复用）
+PARTICLE_POINT_SIZE = 4.0           # 粒子点大小
 FIREWORK_COLORS = [
     (1, 0.8, 0, 1),    # 金色
     (1, 0, 0, 1),      # 红色
@@ -223,6 +252,7 @@ FIREWORK_COLORS = [
 # UI常量
 UI_TEXT_SCALE = 0.06
 UI_TEXT_SCALE_SMALL = 0.05
+HUD_REFRESH_INTERVAL = 0.25  # HUD计时刷新间隔（秒），4 Hz
 
 # 统计信息位置（右上角）
 UI_STATS_POS = (1.3, 0.85)
@@ -252,4 +282,46 @@ SIDE_SELECTION_BUTTON_NORMAL = (0.5, 0.5, 0.5, 0.9)
 SIDE_SELECTION_BUTTON_HOVER = (0.6, 0.6, 0.6, 0.9)
 
 # 五子棋规则常量
-TRADITIONAL_FIRST_PLAYER = PLAYER_BLACK  # 传统规则黑棋先手
\ No newline at end of file
+TRADITIONAL_FIRST_PLAYER = PLAYER_BLACK  # 传统规则黑棋先手
+
+# AI搜索常量
+MCTS_REPORT_INTERVAL = 0.5   # 并行MCTS子进程汇报搜索进度的间隔（秒）
+MCTS_POLL_INTERVAL = 0.05    # 等待子进程结果时检查预算和stop()的间隔（秒）
+MCTS_STOP_GRACE = 2.0        # 搜索出错时等待子进程响应停止标志的最长时间（秒），超过后结束进程池
+MCTS_CANDIDATE_CACHE_SIZE = 20000  # 每个进程缓存的候选落子局面数，超过后清空
+MINIMAX_TT_SIZE = 500000     # Minimax置换表在多次搜索间保留的局面数，超过后在下一次搜索开始时清空
+
+# 开局库常量
+OPENING_BOOK_PATH = "data/opening_book.bin"  # 默认开局库文件（不存在时引擎不使用开局库）
+OPENING_BOOK_MAX_PLIES = 8   # 开局库收录的手数（局面中棋子数小于该值）
+OPENING_BOOK_MIN_GAMES = 2   # 落子至少出现在这么多局中才会被选用
+OPENING_BOOK_MIN_SCORE = 0.5 # 得分率低于该值的落子不选用，交给搜索
+
+# 棋谱常量
+GAME_RECORD_PATH = "data/games.gmr"  # 对局结束时自动追加到该棋谱（.gmr为二进制，其余扩展名为文本）
+GAME_RECORD_AUTOSAVE = True          # 前端是否在对局结束时自动保存棋谱
+
+# 对局库常量
+GAME_ARCHIVE_PATH = "data/games.sqlite"  # 对局结束时也写入该对局库，2D界面的开局浏览从中查询
+GAME_ARCHIVE_MAX_PLIES = 60   # 每局只为前这么多手建立局面索引（之后的局面几乎不会重复）
+GAME_ARCHIVE_BATCH_SIZE = 5000  # 导入时每个事务包含的局数
+GAME_ARCHIVE_EXPLORER_MOVES = 5  # 开局浏览面板显示的落子数
+
+# 引擎服务常量
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 7878
+SERVER_WORKERS = 2            # 常驻引擎进程数
+SERVER_MAX_PENDING = 64       # 所有进程排队的请求上限，超过时回复busy
+SERVER_MAX_TIME = 30.0        # 单次请求的最长思考时间（秒）
+SERVER_GAMES_PER_WORKER = 32  # 每个工作进程保留引擎状态的局数，超过时丢弃最久未用的局
+SERVER_STOP_GRACE = 2.0       # 超过预算这么多秒仍未返回时要求停止（秒）
+ENGINE_SERVER_ADDRESS = None  # 设置后前端改用引擎服务，如 "127.0.0.1:7878" 或Unix socket路径（也可用环境变量 GOMOKU_ENGINE_SERVER）
+
+# 后台思考常量
+PONDER_ENABLED = True    # 前端是否在AI落子后、对方思考时继续后台搜索
+PONDER_REPLIES = 3       # 依次后台搜索对方最可能的这么多个应手
+PONDER_MAX_TIME = 30.0   # 每个应手最长的后台搜索时间（秒），引擎默认预算更短时按默认预算
+
+# 分析常量
+ANALYSIS_MULTIPV = 5     # analyze() 默认给出的候选数
+ANALYSIS_INTERVAL = 0.5  # analyze() 默认的快照间隔（秒）
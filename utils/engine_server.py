@@ -0,0 +1,369 @@
+"""本地引擎服务
+
+asyncio 服务端，通过TCP或Unix socket接受多局棋的落子请求，分发给固定数量的常驻引擎进程。
+
+协议：每条消息是一行JSON。请求带 id，回复原样带回 id，同一连接上可以同时有多个请求：
+    {"id": 1, "op": "move", "game": "g1", "engine": "minimax:depth=3", "board": "000...120...",
+     "side": 1, "time": 2.0, "nodes": null, "depth": null, "book": true}
+        board 为按行排列的 size*size 个字符（0空、1黑、2白），side 为执子方（省略时为轮到的一方），
+        time/nodes/depth 为本次预算（time 不超过 SERVER_MAX_TIME，都省略时用引擎的默认预算）
+    -> {"id": 1, "ok": true, "move": [7, 8], "score": 0.0, "pv": [[7, 8]], "nodes": 1234, "depth": 3, "time": 1.98}
+    {"id": 2, "op": "stop", "game": "g1"}   让该局正在进行的搜索尽快返回（该局的请求还在排队时忽略）
+    {"id": 3, "op": "end", "game": "g1"}    对局结束，丢弃该局在工作进程中的引擎状态
+    {"id": 4, "op": "status"}               工作进程、对局数和排队情况
+    出错时回复 {"id": ..., "ok": false, "error": "..."}；排队已满时 error 为 "busy"，客户端应稍后重试。
+
+每局棋固定分给一个工作进程（新局分给对局最少的进程），引擎实例按局保存在该进程中，
+Minimax的置换表、MCTS的引擎和进程池在同一局的多次请求之间保留；
+MCTS的搜索树在进程池的子进程中，任务不固定分给某个子进程，每次搜索重新建立。
+每个工作进程同时只搜索一个局面，其余请求排队；
+所有进程排队的请求总数达到 max_pending 时拒绝新请求。超过预算仍未返回的搜索会被要求停止。
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+import multiprocessing as mp
+from collections import OrderedDict
+from .arena import parse_engine_spec, create_engine
+from .constants import (PIECE_EMPTY, PIECE_BLACK, PIECE_WHITE, SERVER_HOST, SERVER_PORT, SERVER_WORKERS,
+                        SERVER_MAX_PENDING, SERVER_MAX_TIME, SERVER_GAMES_PER_WORKER, SERVER_STOP_GRACE)
+
+_PIECES = {'0': PIECE_EMPTY, '1': PIECE_BLACK, '2': PIECE_WHITE}
+
+# ---------------------------------------------------------------- 工作进程
+
+def _board_size(board):
+    """检查按行排列的 0/1/2 字符串，返回棋盘大小"""
+    size = int(round(len(board) ** 0.5))
+    if size == 0 or size * size != len(board) or set(board) - set(_PIECES):
+        raise ValueError("board 应为 size*size 个 0/1/2 字符")
+    return size
+
+def _position_from_text(board):
+    """把按行排列的 0/1/2 字符串还原为局面"""
+    from .position import Position
+
+    size = _board_size(board)
+    return Position.from_board([[_PIECES[ch] for ch in board[row * size:(row + 1) * size]] for row in range(size)])
+
+def _watch_stop(stop_request, current):
+    """工作进程中的监视线程：服务端把 stop_request 设为当前请求编号时停止引擎"""
+    while True:
+        time.sleep(0.02)
+        request_id, engine = current
+        if engine is not None and stop_request.value == request_id:
+            engine.stop()
+
+def _worker_main(conn, stop_request, max_games):
+    """工作进程主循环：按局保存引擎，逐个处理请求"""
+    from .gomoku_ai import SearchLimits
+
+    engines = OrderedDict()   # 局 -> (引擎配置, 引擎)，超过max_games时丢弃最久未用的局
+    current = [0, None]       # 正在处理的 (请求编号, 引擎)，供监视线程读取
+    threading.Thread(target=_watch_stop, args=(stop_request, current), daemon=True).start()
+    while True:
+        try:
+            request_id, request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+        try:
+            if request["op"] == "end":
+                engines.pop(request["game"], None)
+                reply = {"ok": True}
+            else:
+                game, spec = request["game"], request.get("engine", "classical")
+                position = _position_from_text(request["board"])
+                entry = engines.pop(game, None)
+                if entry is None or entry[0] != spec:
+                    entry = (spec, create_engine(spec))
+                engines[game] = entry
+                while len(engines) > max_games:
+                    engines.popitem(last=False)
+                engine = entry[1]
+                engine.use_book = request.get("book", True)
+                limits = None
+                if any(request.get(k) is not None for k in ("time", "nodes", "depth")):
+                    limits = SearchLimits(time=request.get("time"), nodes=request.get("nodes"),
+                                          depth=request.get("depth"))
+                current[:] = [request_id, engine]
+                try:
+                    result = engine.search(position, limits, request.get("side"))
+                finally:
+                    current[:] = [request_id, None]
+                reply = {"ok": True, "move": result.move, "score": result.score, "pv": result.pv,
+                         "nodes": result.nodes, "depth": result.depth, "time": result.time}
+        except Exception as e:
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        conn.send(reply)
+
+class _Worker:
+    """服务端持有的一个工作进程：管道、停止信号、分到的局和请求锁"""
+
+    def __init__(self, index, max_games):
+        self.index = index
+        self.max_games = max_games
+        self.games = set()
+        self.queued = 0
+        self.lock = asyncio.Lock()
+        self._request_id = 0
+        self._start()
+
+    def _start(self):
+        self.conn, child = mp.Pipe()
+        self.stop_request = mp.Value('q', 0, lock=False)
+        # 非守护进程：MCTS引擎需要在其中创建自己的进程池
+        self.process = mp.Process(target=_worker_main, args=(child, self.stop_request, self.max_games),
+                                  name=f"engine-worker-{self.index}")
+        self.process.start()
+        child.close()
+        self.busy = None   # 正在处理的 (请求编号, 局)
+
+    def restart(self):
+        """进程异常退出后重启，已分到的局的引擎状态随之丢失"""
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self._start()
+
+    async def call(self, request, timeout):
+        """把请求交给工作进程并等待回复（调用方持有lock），timeout秒后要求引擎停止"""
+        self._request_id += 1
+        request_id = self._request_id
+        loop = asyncio.get_running_loop()
+        self.busy = (request_id, request.get("game"))
+        try:
+            self.conn.send((request_id, request))
+            future = loop.run_in_executor(None, self.conn.recv)
+            if timeout is not None:
+                done, _ = await asyncio.wait({future}, timeout=timeout)
+                if not done:
+                    # 超出预算：先要求停止，仍不返回时重启进程
+                    self.stop()
+                    done, _ = await asyncio.wait({future}, timeout=SERVER_STOP_GRACE)
+                    if not done:
+                        # 旧管道上的recv随进程重启以异常结束，其结果不再需要
+                        future.cancel()
+                        self.restart()
+                        return {"ok": False, "error": "搜索超时，工作进程已重启"}
+            return await future
+        except (EOFError, OSError, BrokenPipeError):
+            self.restart()
+            return {"ok": False, "error": "工作进程异常退出，已重启"}
+        finally:
+            self.busy = None
+
+    def stop(self, game=None):
+        """要求正在进行的搜索停止；给出game时只在正在搜索的是该局时停止
+
+        一个工作进程处理多局棋，正在搜索的可能是别的局，不能被这一局的stop打断。
+        """
+        if self.busy is not None and (game is None or self.busy[1] == game):
+            self.stop_request.value = self.busy[0]
+
+    def close(self):
+        try:
+            self.conn.send((0, None))
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+class EngineServer:
+    """引擎服务：管理工作进程、对局分配和排队，处理客户端连接"""
+
+    def __init__(self, workers=SERVER_WORKERS, max_pending=SERVER_MAX_PENDING, max_time=SERVER_MAX_TIME,
+                 games_per_worker=SERVER_GAMES_PER_WORKER):
+        self.num_workers = workers
+        self.max_pending = max_pending
+        self.max_time = max_time
+        self.games_per_worker = games_per_worker
+        self.workers = []
+        self.assignment = {}     # 局 -> 工作进程
+        self.pending = 0
+        self.requests = 0
+        self._server = None
+        self._clients = {}       # 连接 -> 处理该连接的任务
+
+    async def start(self, host=SERVER_HOST, port=SERVER_PORT, unix_path=None):
+        """启动工作进程并开始监听；unix_path 不为空时监听Unix socket"""
+        self.workers = [_Worker(i, self.games_per_worker) for i in range(self.num_workers)]
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self._handle_client, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, host, port)
+        return self._server
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            await asyncio.gather(*self._clients.values(), return_exceptions=True)
+            await self._server.wait_closed()
+        for worker in self.workers:
+            worker.close()
+
+    def _worker_for(self, game):
+        """局固定分给一个工作进程，新局分给对局最少的进程"""
+        worker = self.assignment.get(game)
+        if worker is None:
+            worker = min(self.workers, key=lambda w: (len(w.games), w.queued))
+            worker.games.add(game)
+            self.assignment[game] = worker
+        return worker
+
+    def _forget(self, game):
+        worker = self.assignment.pop(game, None)
+        if worker is not None:
+            worker.games.discard(game)
+        return worker
+
+    def status(self):
+        return {
+            "ok": True,
+            "workers": [{"games": len(w.games), "queued": w.queued, "busy": w.busy is not None,
+                         "pid": w.process.pid} for w in self.workers],
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "requests": self.requests,
+        }
+
+    async def handle(self, request):
+        """处理一个请求，返回回复（不含id）"""
+        op = request.get("op")
+        if op == "status":
+            return self.status()
+        game = request.get("game")
+        if not isinstance(game, str) or not game:
+            return {"ok": False, "error": "缺少 game"}
+        if op == "stop":
+            # 该局的请求还在排队时不处理：停止的是发出stop时正在进行的搜索
+            worker = self.assignment.get(game)
+            if worker is not None:
+                worker.stop(game)
+            return {"ok": True}
+        if op == "end":
+            worker = self._forget(game)
+            if worker is not None:
+                async with worker.lock:
+                    await worker.call({"op": "end", "game": game}, None)
+            return {"ok": True}
+        if op != "move":
+            return {"ok": False, "error": f"未知操作: {op}"}
+        if not isinstance(request.get("board"), str):
+            return {"ok": False, "error": "缺少 board"}
+        # 先检查请求，无效的请求不分配工作进程
+        try:
+            _board_size(request["board"])
+            parse_engine_spec(request.setdefault("engine", "classical"))
+        except ValueError as e:
+            return {"ok": False, "error": str(e)}
+        if self.pending >= self.max_pending:
+            return {"ok": False, "error": "busy"}
+
+        if request.get("time") is not None:
+            request["time"] = min(float(request["time"]), self.max_time)
+        elif request.get("nodes") is None and request.get("depth") is None:
+            request["time"] = None
+        # 没有时间预算的请求（按节点或深度，或用引擎默认预算）最多等 max_time 后要求停止
+        timeout = (request["time"] or self.max_time) + SERVER_STOP_GRACE
+        new_game = game not in self.assignment
+        worker = self._worker_for(game)
+        self.pending += 1
+        worker.queued += 1
+        try:
+            async with worker.lock:
+                worker.queued -= 1
+                self.requests += 1
+                reply = await worker.call(request, timeout)
+        finally:
+            self.pending -= 1
+        # 新局的第一个请求失败（如引擎参数错误）时不保留分配，避免影响按对局数的分配
+        if new_game and not reply.get("ok"):
+            self._forget(game)
+        return reply
+
+    async def _write(self, writer, write_lock, reply):
+        async with write_lock:
+            writer.write(json.dumps(reply, ensure_ascii=False).encode('utf-8') + b'\n')
+            await writer.drain()
+
+    async def _respond(self, writer, write_lock, request):
+        try:
+            reply = await self.handle(dict(request))
+        except Exception as e:
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        await self._write(writer, write_lock, {"id": request.get("id"), **reply})
+
+    async def _handle_client(self, reader, writer):
+        """一个连接：逐行读取请求，每个请求一个任务，回复按完成顺序写回"""
+        write_lock = asyncio.Lock()
+        tasks = set()
+        self._clients[writer] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("请求应为JSON对象")
+                except ValueError as e:
+                    await self._write(writer, write_lock, {"id": None, "ok": False, "error": f"无效请求: {e}"})
+                    continue
+                task = asyncio.create_task(self._respond(writer, write_lock, request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self._clients.pop(writer, None)
+            writer.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地引擎服务：JSON over TCP/Unix socket，多局并发")
+    parser.add_argument('--host', default=SERVER_HOST, help="监听地址")
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help="监听端口")
+    parser.add_argument('--unix', help="改为监听Unix socket路径")
+    parser.add_argument('--workers', type=int, default=SERVER_WORKERS, help="常驻引擎进程数")
+    parser.add_argument('--max-pending', type=int, default=SERVER_MAX_PENDING, help="排队请求上限，超过时回复busy")
+    parser.add_argument('--max-time', type=float, default=SERVER_MAX_TIME, help="单次请求的最长思考时间（秒）")
+    args = parser.parse_args(argv)
+
+    server = EngineServer(args.workers, args.max_pending, args.max_time)
+
+    async def run():
+        await server.start(args.host, args.port, args.unix)
+        print(f"引擎服务已启动: {args.unix or f'{args.host}:{args.port}'}，{args.workers}个工作进程")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
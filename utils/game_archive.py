@@ -0,0 +1,203 @@
+"""对局库（SQLite）
+
+保存大量对局，并按局面汇总"从这个局面走过哪些棋、结果如何"，供开局浏览使用。
+
+表结构：
+    games  每局一行：棋盘大小、结果、二进制落子（game_record.encode 的正文）、附加信息(JSON)、来源
+    moves  按 (规范哈希, 规范方向下的落子格子) 汇总：局数，以及落子一方的胜、和、负局数
+
+局面用规范Zobrist哈希（8种对称取最小，见 symmetry.py）索引，互为对称的局面共用统计，
+查询时把落子用逆变换映射回当前方向。(hash, cell) 是 moves 表的主键，按局面查询只走一次索引范围扫描。
+导入按批在一个事务中完成，同一批内先在内存中合并统计再写入。
+"""
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import itertools
+from collections import defaultdict
+from .constants import (BOARD_SIZE, PLAYER_BLACK, GAME_ARCHIVE_PATH, GAME_ARCHIVE_MAX_PLIES,
+                        GAME_ARCHIVE_BATCH_SIZE)
+from .position import Position
+from .symmetry import transform, inverse
+from .game_record import GameRecord, RESULT_DRAW, encode, read_games, parse_moves, format_move
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    size INTEGER NOT NULL,
+    winner INTEGER,
+    moves BLOB NOT NULL,
+    meta TEXT,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS moves (
+    hash INTEGER NOT NULL,
+    cell INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    draws INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    PRIMARY KEY (hash, cell)
+) WITHOUT ROWID;
+"""
+
+_UPSERT = """
+INSERT INTO moves (hash, cell, games, wins, draws, losses) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (hash, cell) DO UPDATE SET
+    games = games + excluded.games,
+    wins = wins + excluded.wins,
+    draws = draws + excluded.draws,
+    losses = losses + excluded.losses
+"""
+
+def _signed(key):
+    """SQLite的INTEGER是有符号64位，把无符号哈希映射过去"""
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+def _index_game(record, stats, max_plies):
+    """把一局的前max_plies手累加到 stats[(哈希, 格子)] = [局数, 胜, 和, 负]"""
+    size = record.size
+    position = Position(size)
+    for row, col in record.moves[:max_plies]:
+        side = position.side_to_move
+        key, sym = position.canonical()
+        r, c = transform(row, col, size, sym)
+        entry = stats[(_signed(key), r * size + c)]
+        entry[0] += 1
+        if record.winner == RESULT_DRAW:
+            entry[2] += 1
+        elif record.winner == side:
+            entry[1] += 1
+        elif record.winner is not None:
+            entry[3] += 1
+        position.place(row, col, side)
+
+class GameArchive:
+    """对局库，path 不存在时新建"""
+
+    def __init__(self, path=GAME_ARCHIVE_PATH, max_plies=GAME_ARCHIVE_MAX_PLIES):
+        self.path = path
+        self.max_plies = max_plies
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def add_games(self, records, source=None):
+        """在一个事务中加入一批对局（GameRecord），返回加入的局数"""
+        stats = defaultdict(lambda: [0, 0, 0, 0])
+        rows = []
+        for record in records:
+            meta = json.dumps(record.meta, ensure_ascii=False) if record.meta else None
+            rows.append((record.size, record.winner, encode(record), meta, source))
+            _index_game(record, stats, self.max_plies)
+        with self.conn:
+            self.conn.executemany("INSERT INTO games (size, winner, moves, meta, source) VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.executemany(_UPSERT, [(key, cell, *counts) for (key, cell), counts in stats.items()])
+        return len(rows)
+
+    def add_chessboard(self, chessboard, times=None, meta=None, source=None):
+        """加入一局已下完的 ChessBoard（按 move_history）"""
+        return self.add_games([GameRecord.from_chessboard(chessboard, times, meta)], source)
+
+    def import_file(self, path, batch_size=GAME_ARCHIVE_BATCH_SIZE):
+        """导入棋谱文件（.gmr、文本棋谱或每行一局的纯落子列表），按批提交，返回导入的局数"""
+        games = read_games(path)
+        total = 0
+        while True:
+            batch = list(itertools.islice(games, batch_size))
+            if not batch:
+                return total
+            total += self.add_games(batch, source=os.path.basename(path))
+
+    def explore(self, position, limit=None):
+        """局面下走过的落子，按局数从多到少
+
+        Returns:
+            list: [{"move": (row, col), "games", "wins", "draws", "losses", "score"}]，
+                  胜负从落子一方看，score 为已分胜负局（含和棋）中的得分率，没有时为None
+        """
+        size = position.size
+        key, sym = position.canonical()
+        back = inverse(sym)
+        sql = "SELECT cell, games, wins, draws, losses FROM moves WHERE hash = ? ORDER BY games DESC"
+        moves = []
+        for cell, games, wins, draws, losses in self.conn.execute(sql, (_signed(key),)):
+            row, col = transform(cell // size, cell % size, size, back)
+            if not position.is_empty(row, col):
+                continue
+            decided = wins + draws + losses
+            moves.append({
+                "move": (row, col),
+                "games": games,
+                "wins": wins,
+                "draws": draws,
+                "losses": losses,
+                "score": (wins + draws / 2) / decided if decided else None,
+            })
+            if limit is not None and len(moves) >= limit:
+                break
+        return moves
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def archive_game(chessboard, times=None, meta=None, path=GAME_ARCHIVE_PATH):
+    """把结束的对局加入对局库（前端在对局结束时调用），失败时只打印错误，返回是否成功"""
+    try:
+        with GameArchive(path) as archive:
+            archive.add_chessboard(chessboard, times, meta, source="play")
+    except (sqlite3.Error, OSError, ValueError) as e:
+        print(f"写入对局库失败: {e}")
+        return False
+    return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="对局库：导入棋谱、查询局面下的落子统计")
+    parser.add_argument('--db', default=GAME_ARCHIVE_PATH, help="对局库文件")
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help="导入棋谱文件")
+    importer.add_argument('files', nargs='+', help=".gmr、文本棋谱或每行一局的落子列表")
+    query = commands.add_parser('query', help="查询局面下的落子统计")
+    query.add_argument('moves', nargs='?', default="", help="到达该局面的落子，如 \"h8 i9\"，省略时为空棋盘")
+    query.add_argument('--size', type=int, default=BOARD_SIZE, help="棋盘大小")
+    query.add_argument('--limit', type=int, default=10, help="最多显示的落子数")
+    args = parser.parse_args(argv)
+
+    with GameArchive(args.db) as archive:
+        if args.command == 'import':
+            for path in args.files:
+                print(f"{path}: 导入 {archive.import_file(path)} 局")
+            print(f"对局库共 {len(archive)} 局")
+            return 0
+
+        position = Position(args.size)
+        moves, _ = parse_moves(args.moves, args.size)
+        for row, col in moves:
+            if not position.is_empty(row, col):
+                parser.error(f"重复落子: {format_move(row, col, args.size)}")
+            position.place(row, col, position.side_to_move)
+        side = "黑方" if position.side_to_move == PLAYER_BLACK else "白方"
+        print(f"{side}走，共 {len(archive)} 局")
+        for entry in archive.explore(position, args.limit):
+            score = f"{entry['score']:.1%}" if entry["score"] is not None else "-"
+            print(f"  {format_move(*entry['move'], args.size):<5}{entry['games']:>8}局  "
+                  f"胜{entry['wins']} 和{entry['draws']} 负{entry['losses']}  得分率 {score}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
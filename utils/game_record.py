@@ -0,0 +1,486 @@
+"""对局记录
+
+对局按黑方先行、黑白交替的落子序列保存，有两种格式：
+
+二进制棋谱（.gmr，紧凑，适合大量对局）：
+    文件头: 魔数 b"GMKGAME1"
+    每局:   varint 正文长度 + 正文
+    正文:   棋盘大小(u8)、标志(u8，低2位为结果 0和1黑胜2白胜3未完，第3位表示带每手用时)、
+            varint 手数、每手的 varint 格子编号(row*size+col)、[每手的 varint 用时(毫秒)]、
+            varint 附加信息长度 + UTF-8 JSON（如黑白双方、日期）
+文本棋谱（与常见的五子棋/连珠记谱兼容）：
+    列用字母 a-o（从左到右），行用数字 1-15（从下到上），天元为 h8；
+    每局以 [Key "value"] 标签开头，之后是落子和结果（1-0 黑胜、0-1 白胜、1/2-1/2 和棋、* 未完），局与局之间空一行：
+        [Size "15"]
+        [Black "human"]
+        [Times "1520 830 2210"]
+        1. h8 i9 2. h9 1-0
+
+两种格式的读写都是流式的：RecordReader 逐局读出，RecordWriter 逐局追加，整个文件不会读入内存。
+回放时把落子放进 ChessBoard 的恢复栈，用 redo_move/undo_move 前后翻看（见 replay）。
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+from .constants import BOARD_SIZE, PLAYER_BLACK, PLAYER_WHITE, GAME_RECORD_PATH
+
+MAGIC = b"GMKGAME1"
+
+RESULT_DRAW = 0
+RESULT_UNFINISHED = 3
+
+_FLAG_TIMES = 0x04
+
+_RESULT_TEXT = {PLAYER_BLACK: "1-0", PLAYER_WHITE: "0-1", RESULT_DRAW: "1/2-1/2", None: "*"}
+_TEXT_RESULT = {text: winner for winner, text in _RESULT_TEXT.items()}
+
+class GameRecord:
+    """一局棋：落子 [(row, col)]（黑方先行、交替落子）、每手用时（毫秒，可为None）、胜者和附加信息
+
+    winner 为 PLAYER_BLACK/PLAYER_WHITE，RESULT_DRAW(0) 表示和棋，None 表示未下完。
+    """
+
+    __slots__ = ('size', 'moves', 'times', 'winner', 'meta')
+
+    def __init__(self, moves, size=BOARD_SIZE, winner=None, times=None, meta=None):
+        self.size = size
+        self.moves = list(moves)
+        self.times = list(times) if times is not None else None
+        self.winner = winner
+        self.meta = dict(meta) if meta else {}
+        if self.times is not None and len(self.times) != len(self.moves):
+            raise ValueError(f"用时数({len(self.times)})与手数({len(self.moves)})不一致")
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __eq__(self, other):
+        return (isinstance(other, GameRecord) and self.size == other.size and self.moves == other.moves
+                and self.times == other.times and self.winner == other.winner and self.meta == other.meta)
+
+    def __repr__(self):
+        return f"GameRecord({len(self.moves)}手, 结果={_RESULT_TEXT[self.winner]}, size={self.size})"
+
+    def history(self):
+        """转换为 ChessBoard.move_history 的格式 [(row, col, player)]"""
+        return [(row, col, PLAYER_BLACK if i % 2 == 0 else PLAYER_WHITE) for i, (row, col) in enumerate(self.moves)]
+
+    @classmethod
+    def from_history(cls, history, size=BOARD_SIZE, winner=None, times=None, meta=None):
+        """由 [(row, col, player)] 生成记录，落子必须黑方先行、交替进行；times 少于手数时不保存用时"""
+        moves = []
+        for i, (row, col, player) in enumerate(history):
+            expected = PLAYER_BLACK if i % 2 == 0 else PLAYER_WHITE
+            if player != expected:
+                raise ValueError(f"第{i + 1}手应为玩家{expected}，实际为玩家{player}")
+            if not (0 <= row < size and 0 <= col < size):
+                raise ValueError(f"第{i + 1}手超出棋盘: ({row}, {col})")
+            moves.append((row, col))
+        if times is not None:
+            times = list(times)[:len(moves)] if len(times) >= len(moves) else None
+        return cls(moves, size, winner, times, meta)
+
+    @classmethod
+    def from_chessboard(cls, chessboard, times=None, meta=None):
+        """由 ChessBoard 的落子历史生成记录；有胜者时结果为胜者，棋盘下满为和棋，否则为未完"""
+        history = chessboard.move_history
+        if chessboard.winner:
+            winner = chessboard.winner
+        elif len(history) == chessboard.size * chessboard.size:
+            winner = RESULT_DRAW
+        else:
+            winner = None
+        return cls.from_history(history, chessboard.size, winner, times, meta)
+
+# ---------------------------------------------------------------- 二进制格式
+
+def _put_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _get_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def encode(record):
+    """把一局编码为二进制正文（不含长度前缀）"""
+    size = record.size
+    out = bytearray()
+    flags = RESULT_UNFINISHED if record.winner is None else record.winner
+    if record.times is not None:
+        flags |= _FLAG_TIMES
+    out.append(size)
+    out.append(flags)
+    _put_varint(out, len(record.moves))
+    for row, col in record.moves:
+        _put_varint(out, row * size + col)
+    if record.times is not None:
+        for ms in record.times:
+            _put_varint(out, max(0, int(ms)))
+    meta = json.dumps(record.meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8') if record.meta else b""
+    _put_varint(out, len(meta))
+    out += meta
+    return bytes(out)
+
+def decode(data):
+    """从二进制正文解码一局"""
+    try:
+        size = data[0]
+        flags = data[1]
+        count, pos = _get_varint(data, 2)
+        moves = []
+        for _ in range(count):
+            cell, pos = _get_varint(data, pos)
+            moves.append(divmod(cell, size))
+        times = None
+        if flags & _FLAG_TIMES:
+            times = []
+            for _ in range(count):
+                ms, pos = _get_varint(data, pos)
+                times.append(ms)
+        length, pos = _get_varint(data, pos)
+        meta = json.loads(data[pos:pos + length].decode('utf-8')) if length else None
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"损坏的对局记录: {e}") from None
+    result = flags & 0x03
+    return GameRecord(moves, size, None if result == RESULT_UNFINISHED else result, times, meta)
+
+class BinaryRecordWriter:
+    """逐局追加写入二进制棋谱，文件不存在或为空时先写文件头"""
+
+    def __init__(self, path, append=True):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'ab' if append else 'wb')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self.count = 0
+
+    def write(self, record):
+        payload = encode(record)
+        prefix = bytearray()
+        _put_varint(prefix, len(payload))
+        self._file.write(prefix)
+        self._file.write(payload)
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class BinaryRecordReader:
+    """逐局读取二进制棋谱，每次只读入一局"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f"不是有效的棋谱文件: {path}")
+
+    def _read_length(self):
+        value = 0
+        shift = 0
+        while True:
+            byte = self._file.read(1)
+            if not byte:
+                if shift:
+                    raise ValueError(f"棋谱文件被截断: {self.path}")
+                return None
+            value |= (byte[0] & 0x7F) << shift
+            if byte[0] < 0x80:
+                return value
+            shift += 7
+
+    def _next_payload(self):
+        length = self._read_length()
+        if length is None:
+            return None
+        payload = self._file.read(length)
+        if len(payload) != length:
+            raise ValueError(f"棋谱文件被截断: {self.path}")
+        return payload
+
+    def __iter__(self):
+        while True:
+            payload = self._next_payload()
+            if payload is None:
+                return
+            yield decode(payload)
+
+    def skip(self):
+        """跳过下一局而不解码，没有更多对局时返回False"""
+        length = self._read_length()
+        if length is None:
+            return False
+        self._file.seek(length, io.SEEK_CUR)
+        return True
+
+    def last(self):
+        """跳到最后一局并返回它，没有对局时返回None（前面的对局只读长度，不解码）"""
+        offset = last_length = None
+        while True:
+            length = self._read_length()
+            if length is None:
+                break
+            offset, last_length = self._file.tell(), length
+            self._file.seek(length, io.SEEK_CUR)
+        if offset is None:
+            return None
+        self._file.seek(offset)
+        return decode(self._file.read(last_length))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ---------------------------------------------------------------- 文本格式
+
+def format_move(row, col, size=BOARD_SIZE):
+    """(row, col) 转为记谱坐标，如 (7, 7) -> h8"""
+    return f"{chr(ord('a') + col)}{size - row}"
+
+def parse_move(text, size=BOARD_SIZE):
+    """记谱坐标转为 (row, col)，如 h8 -> (7, 7)"""
+    text = text.strip().lower()
+    if len(text) < 2 or not 'a' <= text[0] <= 'z' or not text[1:].isdigit():
+        raise ValueError(f"无法识别的落子: {text}")
+    row, col = size - int(text[1:]), ord(text[0]) - ord('a')
+    if not (0 <= row < size and 0 <= col < size):
+        raise ValueError(f"落子超出棋盘: {text}")
+    return row, col
+
+def format_moves(moves, size=BOARD_SIZE):
+    """落子序列转为带回合号的记谱文本：1. h8 i9 2. h9"""
+    parts = []
+    for i, (row, col) in enumerate(moves):
+        if i % 2 == 0:
+            parts.append(f"{i // 2 + 1}.")
+        parts.append(format_move(row, col, size))
+    return ' '.join(parts)
+
+def parse_moves(text, size=BOARD_SIZE):
+    """解析一段记谱文本中的落子，忽略回合号（"1."）和结果，返回 (落子列表, 结果)
+
+    结果为 PLAYER_BLACK/PLAYER_WHITE/RESULT_DRAW，文本中没有结果或为 * 时为 None。
+    """
+    moves = []
+    winner = None
+    for token in text.replace(',', ' ').split():
+        if token in _TEXT_RESULT:
+            winner = _TEXT_RESULT[token]
+        elif token.endswith('.') and token[:-1].isdigit():
+            continue
+        else:
+            moves.append(parse_move(token, size))
+    return moves, winner
+
+def format_game(record):
+    """一局的文本棋谱（以换行结束）"""
+    lines = [f'[Size "{record.size}"]', f'[Result "{_RESULT_TEXT[record.winner]}"]']
+    for key, value in record.meta.items():
+        lines.append(f'[{key} "{str(value).replace(chr(34), chr(39))}"]')
+    if record.times is not None:
+        lines.append(f'[Times "{" ".join(str(int(ms)) for ms in record.times)}"]')
+    movetext = format_moves(record.moves, record.size)
+    lines.append(f"{movetext} {_RESULT_TEXT[record.winner]}".strip())
+    return '\n'.join(lines) + '\n'
+
+def _parse_tag(line):
+    key, _, value = line[1:-1].partition(' ')
+    return key, value.strip().strip('"')
+
+def _build_game(tags, movetext, source):
+    size = int(tags.pop("Size", BOARD_SIZE))
+    result = tags.pop("Result", None)
+    times = tags.pop("Times", None)
+    try:
+        moves, winner = parse_moves(' '.join(movetext), size)
+    except ValueError as e:
+        raise ValueError(f"{source}: {e}") from None
+    if result is not None:
+        winner = _TEXT_RESULT.get(result, winner)
+    if times is not None:
+        times = [int(ms) for ms in times.split()]
+    return GameRecord(moves, size, winner, times, tags or None)
+
+class TextRecordWriter:
+    """逐局追加写入文本棋谱"""
+
+    def __init__(self, path, append=True):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self._blank = self._file.tell() > 0
+        self.count = 0
+
+    def write(self, record):
+        if self._blank:
+            self._file.write('\n')
+        self._file.write(format_game(record))
+        self._blank = True
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class TextRecordReader:
+    """逐局读取文本棋谱
+
+    一局在遇到结果、空行或下一局的标签时结束；没有标签的行按15路棋盘解析，
+    因此每行一局的纯落子列表（如 "h8 i9 h9"，结果可有可无）也可以直接读取。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, encoding='utf-8')
+
+    def __iter__(self):
+        tags = {}
+        movetext = []
+        start = 0
+        for line_no, line in enumerate(self._file, 1):
+            line = line.strip()
+            if not line:
+                if movetext:
+                    yield _build_game(tags, movetext, f"{self.path}:{start}")
+                    tags, movetext = {}, []
+                continue
+            if line.startswith('[') and line.endswith(']'):
+                if movetext:
+                    yield _build_game(tags, movetext, f"{self.path}:{start}")
+                    tags, movetext = {}, []
+                if not tags:
+                    start = line_no
+                key, value = _parse_tag(line)
+                tags[key] = value
+                continue
+            if not tags and not movetext:
+                start = line_no
+            movetext.append(line)
+            ended = line.split()[-1] in _TEXT_RESULT
+            if ended or not tags:
+                yield _build_game(tags, movetext, f"{self.path}:{start}")
+                tags, movetext = {}, []
+        if movetext:
+            yield _build_game(tags, movetext, f"{self.path}:{start}")
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ---------------------------------------------------------------- 打开、保存与回放
+
+def is_binary(path):
+    """按扩展名判断格式：.gmr 为二进制棋谱，其余为文本棋谱"""
+    return path.lower().endswith('.gmr')
+
+def open_reader(path):
+    return BinaryRecordReader(path) if is_binary(path) else TextRecordReader(path)
+
+def open_writer(path, append=True):
+    return BinaryRecordWriter(path, append) if is_binary(path) else TextRecordWriter(path, append)
+
+def read_games(path):
+    """逐局迭代棋谱文件中的对局"""
+    with open_reader(path) as reader:
+        yield from reader
+
+def load_last_game(path=GAME_RECORD_PATH):
+    """棋谱文件中的最后一局，文件不存在或没有对局时返回None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        if is_binary(path):
+            with BinaryRecordReader(path) as reader:
+                return reader.last()
+        record = None
+        for record in read_games(path):
+            pass
+        return record
+    except (OSError, ValueError) as e:
+        print(f"读取棋谱失败: {e}")
+        return None
+
+def save_game(chessboard, times=None, meta=None, path=GAME_RECORD_PATH):
+    """把一局追加到棋谱文件（前端在对局结束时调用），失败时只打印错误，返回是否成功"""
+    meta = dict(meta or {})
+    meta.setdefault("date", time.strftime("%Y-%m-%d %H:%M:%S"))
+    try:
+        record = GameRecord.from_chessboard(chessboard, times, meta)
+        with open_writer(path) as writer:
+            writer.write(record)
+    except (OSError, ValueError) as e:
+        print(f"保存棋谱失败: {e}")
+        return False
+    print(f"棋谱已保存: {path}（{len(record)}手）")
+    return True
+
+def replay(record):
+    """返回一个空棋盘，整局落子都在恢复栈中：redo_move() 前进一手，undo_move() 后退一手"""
+    from .chessboard import ChessBoard
+
+    board = ChessBoard(size=record.size)
+    board.undo_stack = list(reversed(record.history()))
+    return board
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="棋谱格式转换：.gmr 为二进制棋谱，其余扩展名为文本棋谱")
+    parser.add_argument('input', help="输入棋谱")
+    parser.add_argument('output', nargs='?', help="输出棋谱，省略时只统计对局数")
+    args = parser.parse_args(argv)
+
+    count = 0
+    moves = 0
+    writer = open_writer(args.output, append=False) if args.output else None
+    try:
+        for record in read_games(args.input):
+            count += 1
+            moves += len(record)
+            if writer:
+                writer.write(record)
+    finally:
+        if writer:
+            writer.close()
+    print(f"{count} 局，{moves} 手" + (f"，已写入: {args.output}" if writer else ""))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
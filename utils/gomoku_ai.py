@@ -1,8 +1,317 @@
-from abc import ABC, abstractmethod
+import time
+import asyncio
+import threading
+from typing import List, Optional, Tuple
+from pydantic import BaseModel, Field
 from utils.chessboard import ChessBoard
+from utils.position import Position
+from utils.instrumentation import metrics
+from utils.opening_book import default_book
+from utils.constants import PLAYER_BLACK, PLAYER_WHITE, PONDER_MAX_TIME, ANALYSIS_MULTIPV, ANALYSIS_INTERVAL
+
+class SearchLimits(BaseModel):
+    """搜索预算，未设置的项不限制；多项同时设置时先到者生效"""
+    time: Optional[float] = Field(default=None, description="最长思考时间（秒）")
+    nodes: Optional[int] = Field(default=None, description="最多搜索节点数")
+    depth: Optional[int] = Field(default=None, description="最大搜索深度")
+
+class AnalysisLine(BaseModel):
+    """一个候选落子及其主要变例"""
+    move: Tuple[int, int] = Field(description="候选落子(row, col)")
+    score: float = Field(default=0, description="引擎自己的评分（MCTS为胜率），不同引擎之间不可比较")
+    visits: Optional[int] = Field(default=None, description="访问次数，只有MCTS给出")
+    pv: List[Tuple[int, int]] = Field(default_factory=list, description="从该落子开始的主要变例")
+
+class Analysis(BaseModel):
+    """analyze() 产出的一次快照"""
+    lines: List[AnalysisLine] = Field(default_factory=list, description="目前最好的几个候选，从好到坏")
+    nodes: int = Field(default=0, description="已搜索节点数")
+    nps: float = Field(default=0, description="每秒节点数")
+    depth: int = Field(default=0, description="已完成的搜索深度（不按深度搜索的引擎为0）")
+    time: float = Field(default=0, description="已用时间（秒）")
+    done: bool = Field(default=False, description="搜索是否已结束（最后一个快照为True）")
+
+class SearchResult(BaseModel):
+    """一次搜索的结果与统计"""
+    move: Optional[Tuple[int, int]] = Field(default=None, description="最佳落子(row, col)")
+    score: float = Field(default=0, description="引擎自己的评分，不同引擎之间不可比较")
+    pv: List[Tuple[int, int]] = Field(default_factory=list, description="主要变例")
+    nodes: int = Field(default=0, description="搜索节点数")
+    nps: float = Field(default=0, description="每秒节点数")
+    depth: int = Field(default=0, description="完成的搜索深度（不按深度搜索的引擎为0）")
+    time: float = Field(default=0, description="用时（秒）")
+    lines: List[AnalysisLine] = Field(default_factory=list, description="前几个候选（多主要变例），第一个为最佳落子")
+
+class SearchStopped(Exception):
+    """搜索预算用完或收到stop()，引擎用它从递归中退出"""
+
+class SearchContext:
+    """一次搜索的计数与停止判断，由引擎在热循环中调用tick()
+
+    引擎在得到新的候选排序时（完成一层、收到并行MCTS的进度汇报）调用report()，
+    analyze() 从其他线程读取 lines 产出快照；report() 整体替换列表，读取方不需要加锁。
+    """
+
+    def __init__(self, limits: SearchLimits, stop_event: threading.Event, multipv: int = 1):
+        self.limits = limits
+        self.multipv = multipv
+        self.lines = []
+        self.depth = 0
+        self.nodes = 0
+        self.start = time.perf_counter()
+        self.deadline = self.start + limits.time if limits.time is not None else None
+        self._stop_event = stop_event
+
+    def tick(self, count=1) -> bool:
+        """记录count个节点，返回是否应当停止"""
+        self.nodes += count
+        return self.should_stop()
+
+    def should_stop(self) -> bool:
+        if self._stop_event.is_set():
+            return True
+        if self.limits.nodes is not None and self.nodes >= self.limits.nodes:
+            return True
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def report(self, lines: List[AnalysisLine], depth: Optional[int] = None):
+        """报告目前的候选（从好到坏），只保留前 multipv 个"""
+        self.lines = lines[:self.multipv]
+        if depth is not None:
+            self.depth = depth
+
+    def snapshot(self, done=False) -> Analysis:
+        elapsed = self.elapsed()
+        return Analysis(
+            lines=self.lines, nodes=self.nodes,
+            nps=self.nodes / elapsed if elapsed > 0 else 0,
+            depth=self.depth, time=elapsed, done=done
+        )
+
+    def result(self, move, score, pv, depth) -> SearchResult:
+        """由引擎返回的 (move, score, pv, depth) 构造结果，引擎没有报告候选时以最佳落子作为唯一的候选"""
+        elapsed = self.elapsed()
+        lines = self.lines
+        if not lines and move is not None:
+            lines = [AnalysisLine(move=move, score=score, pv=pv)]
+        return SearchResult(
+            move=move, score=score, pv=pv, nodes=self.nodes,
+            nps=self.nodes / elapsed if elapsed > 0 else 0,
+            depth=depth, time=elapsed, lines=lines
+        )
+
+    def retarget(self, limits: SearchLimits, stop_event: Optional[threading.Event] = None):
+        """改用新的预算继续这次搜索（后台思考命中时），已用的时间和节点都计入新的预算
+
+        stop_event 不为None时改为响应该停止信号（接管的实际搜索的信号）。
+        """
+        if stop_event is not None:
+            self._stop_event = stop_event
+        self.deadline = self.start + limits.time if limits.time is not None else None
+        self.limits = SearchLimits(time=limits.time, nodes=limits.nodes, depth=self.limits.depth)
 
 class GomokuAI:
+    """引擎统一接口
+
+    子类实现 _search(position, player_side, ctx)，返回 (move, score, pv, depth)，
+    并在热循环中调用 ctx.tick()，返回True时尽快结束并给出目前最好的结果。
+    传给 _search 的 position 是副本，引擎可以直接修改。
+    同一实例同一时刻只进行一次搜索；stop() 可以从其他线程调用。
+    每次搜索、分析和后台思考一开始就换用新的停止信号，stop() 只停止当前这一次，
+    开始之后（包括等待后台思考的结果时）收到的 stop() 不会丢失。
+    search 先查询开局库（book为None时使用默认开局库），命中时不搜索。
+    ponder() 在对方思考时后台搜索预测的应手，之后的 search 命中时直接使用其结果（见 pondering.py）。
+    analyze() 边搜索边产出前几个候选的快照，引擎通过 ctx.report() 提供候选。
+    """
+
+    def __init__(self):
+        self.thinking = False
+        self.use_book = True
+        self.book = None
+        self._stop_event = threading.Event()
+        self._ponder = None
+
+    def default_limits(self) -> SearchLimits:
+        """未指定预算时使用的预算"""
+        return SearchLimits()
+
+    def ponder_limits(self) -> SearchLimits:
+        """后台思考每个应手的预算：默认预算，时间不超过 PONDER_MAX_TIME"""
+        limits = self.default_limits()
+        ponder_time = PONDER_MAX_TIME if limits.time is None else min(limits.time, PONDER_MAX_TIME)
+        return SearchLimits(time=ponder_time, nodes=limits.nodes, depth=limits.depth)
+
+    def search(self, position, limits: Optional[SearchLimits] = None, player_side: Optional[int] = None,
+               multipv: int = 1) -> SearchResult:
+        """搜索当前局面的最佳落子
+
+        Args:
+            position: Position、ChessBoard或二维棋盘数组，不会被修改
+            limits: 搜索预算，None时使用 default_limits()
+            player_side: 执子方，None时为局面中轮到的一方
+            multipv: 结果的 lines 中最多保留的候选数
+        """
+        stop_event = self._stop_event = threading.Event()
+        position, player_side = self._prepare(position, player_side)
+        limits = limits or self.default_limits()
+
+        ponder, self._ponder = self._ponder, None
+        if ponder is not None:
+            result = ponder.take(position, player_side, limits, stop_event)
+            if result is not None:
+                return result
+        return self._run(position, player_side, SearchContext(limits, stop_event, multipv))
+
+    def _prepare(self, position, player_side):
+        """把输入的局面复制为 Position，并确定执子方"""
+        if isinstance(position, ChessBoard):
+            position = position.position.copy()
+        elif isinstance(position, Position):
+            position = position.copy()
+        else:
+            position = Position.from_board(position)
+        if player_side is None:
+            player_side = position.side_to_move
+        return position, player_side
+
+    def _run(self, position, player_side, ctx):
+        """查询开局库或调用引擎搜索，记录埋点"""
+        self.thinking = True
+        metrics.begin_search(type(self).__name__)
+        move, score, depth = None, 0, 0
+        try:
+            move = self.book_move(position, player_side)
+            if move is not None:
+                metrics.count("book_hits")
+                pv = [move]
+            else:
+                move, score, pv, depth = self._search(position, player_side, ctx)
+        finally:
+            self.thinking = False
+            metrics.count("nodes", ctx.nodes)
+            metrics.end_search(move=move, score=score, depth=depth, stones=position.stones)
+        return ctx.result(move, score, pv, depth)
+
+    async def search_async(self, position, limits: Optional[SearchLimits] = None, player_side: Optional[int] = None) -> SearchResult:
+        """在线程池中搜索，不阻塞事件循环；任务被取消时停止搜索"""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(None, self.search, position, limits, player_side)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            self.stop()
+            raise
+
+    def analyze(self, position, limits: Optional[SearchLimits] = None, player_side: Optional[int] = None,
+                multipv: int = ANALYSIS_MULTIPV, interval: float = ANALYSIS_INTERVAL):
+        """边搜索边产出分析快照（Analysis）的生成器
+
+        搜索在后台线程中进行，每隔interval秒检查一次，引擎报告了新的候选时产出前multipv个候选，
+        搜索结束后产出 done=True 的最终结果。提前关闭生成器时停止搜索；开始前停止后台思考。
+        参数与 search 相同。
+        """
+        stop_event = self._stop_event = threading.Event()
+        position, player_side = self._prepare(position, player_side)
+        self.stop_pondering()
+        ctx = SearchContext(limits or self.default_limits(), stop_event, multipv)
+        outcome = {}
+
+        def run():
+            try:
+                outcome["result"] = self._run(position, player_side, ctx)
+            except Exception as e:
+                outcome["error"] = e
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        try:
+            reported = None
+            while True:
+                worker.join(interval)
+                if not worker.is_alive():
+                    break
+                lines = ctx.lines
+                if lines and lines is not reported:
+                    reported = lines
+                    yield ctx.snapshot()
+        finally:
+            if worker.is_alive():
+                self.stop()
+                worker.join()
+        if "error" in outcome:
+            raise outcome["error"]
+        result = outcome["result"]
+        yield Analysis(lines=result.lines, nodes=result.nodes, nps=result.nps,
+                       depth=result.depth, time=result.time, done=True)
+
+    async def analyze_async(self, position, limits: Optional[SearchLimits] = None, player_side: Optional[int] = None,
+                            multipv: int = ANALYSIS_MULTIPV, interval: float = ANALYSIS_INTERVAL):
+        """analyze() 的异步迭代器版本：async for 逐个取出快照，不阻塞事件循环；提前退出或被取消时停止搜索"""
+        loop = asyncio.get_running_loop()
+        snapshots = self.analyze(position, limits, player_side, multipv, interval)
+        cancelled = False
+        try:
+            while True:
+                snapshot = await loop.run_in_executor(None, next, snapshots, None)
+                if snapshot is None:
+                    return
+                yield snapshot
+        except asyncio.CancelledError:
+            # next() 仍在线程池中执行，生成器此时不能关闭，只通知引擎停止
+            cancelled = True
+            self.stop()
+            raise
+        finally:
+            if not cancelled:
+                snapshots.close()
+
+    def book_move(self, position, player_side):
+        """开局库中的落子；不使用开局库、局面不在库中或执子方不是轮到的一方时返回None"""
+        if not self.use_book or player_side != position.side_to_move:
+            return None
+        book = self.book or default_book()
+        return book.choose(position) if book is not None else None
+
+    def stop(self):
+        """请求停止当前搜索，引擎会尽快返回目前最好的落子"""
+        self._stop_event.set()
+
+    def ponder(self, position, player_side: Optional[int] = None):
+        """AI落子后在后台思考对方可能的应手，直到下一次 search 或 stop_pondering()
+
+        Args:
+            position: AI落子后的局面（Position或ChessBoard，轮到对方），会被复制
+            player_side: AI执子方，None时为局面中轮到一方的对方
+        """
+        # 导入放在这里：pondering 依赖本模块
+        from utils.pondering import Ponder
+
+        self.stop_pondering()
+        if isinstance(position, ChessBoard):
+            position = position.position
+        if player_side is None:
+            player_side = PLAYER_WHITE if position.side_to_move == PLAYER_BLACK else PLAYER_BLACK
+        self._stop_event = threading.Event()
+        self._ponder = Ponder(self, position, player_side, self._stop_event)
+        self._ponder.start()
+
+    def stop_pondering(self):
+        """停止后台思考并丢弃其结果（悔棋、重开、对局结束时调用）"""
+        ponder, self._ponder = self._ponder, None
+        if ponder is not None:
+            ponder.stop()
+
+    def _search(self, position, player_side, ctx):
+        """搜索position中player_side的最佳落子，返回 (move, score, pv, depth)"""
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def get_move(self, board, board_size, player_side=None):
+        """获取AI的下一步移动(row, col)，按默认预算搜索"""
+        return self.search(board, player_side=player_side).move
 
     def get_next_chessboard(self, input_chessboard: ChessBoard, player_side: int) -> ChessBoard:
         """获取AI的下一步棋盘状态"""
-        raise NotImplementedError("This method should be overridden by subclasses")
\ No newline at end of file
+        raise NotImplementedError("This method should be overridden by subclasses")
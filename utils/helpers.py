@@ -2,6 +2,7 @@
 from .constants import TOTAL_SQUARES, BOARD_SIZE
 from panda3d.core import LPoint3
 import math  # 添加数学函数支持
+import numpy as np
 
 def point_at_z(z, point, vec):
     """
@@ -10,6 +11,12 @@ def point_at_z(z, point, vec):
     """
     return point + vec * ((z - point.getZ()) / vec.getZ())
 
+def vertex_array_view(vdata, index):
+    """获取GeomVertexData中第index个数组的NumPy可写视图(float32)，每行一个顶点"""
+    num_columns = vdata.getFormat().getArray(index).getStride() // 4
+    buffer = memoryview(vdata.modifyArray(index)).cast("B").cast("f")
+    return np.frombuffer(buffer, dtype=np.float32).reshape(-1, num_columns)
+
 def square_pos(i):
     """获取棋盘格子i的3D位置 - 15x15棋盘"""
     from .constants import SQUARE_SCALE, BOARD_SIZE
@@ -20,6 +27,14 @@ def square_pos(i):
     y = (7 - row) * SQUARE_SCALE  # Y轴翻转
     return LPoint3(x, y, 0)
 
+def point_to_square(point):
+    """将棋盘节点坐标系下的点换算为格子索引(square_pos的逆运算)，棋盘外返回-1"""
+    from .constants import SQUARE_SCALE, BOARD_SIZE
+    center = BOARD_SIZE // 2
+    col = int(round(point.getX() / SQUARE_SCALE)) + center
+    row = center - int(round(point.getY() / SQUARE_SCALE))
+    return gomoku_pos_to_square(row, col)
+
 def square_color(i):
     """设定棋盘颜色"""
     from .constants import WOOD_MEDIUM
@@ -0,0 +1,236 @@
+"""引擎埋点
+
+引擎在热路径上调用 metrics.count(名称)、metrics.timer(名称)、metrics.event(名称, 字段...) 记录计数、计时和事件，
+不再直接 print。关闭时（默认）这些方法被替换为空函数，开销只剩一次方法调用；
+开启后每次 GomokuAI.search 结束时把本次搜索的计数和计时作为一条记录交给各输出端。
+
+常用名称：nodes（节点，由搜索上下文给出）、tt_hits（置换表命中）、evals（局面评估）、
+rollouts（MCTS模拟）、expansions（MCTS扩展）、pool_dispatch（进程池分发延迟，计时）。
+
+用法:
+    from utils.instrumentation import metrics, JsonLinesSink, StatsSink
+    stats = StatsSink()
+    metrics.enable([JsonLinesSink("metrics.jsonl"), stats], profile="cprofile")
+    ...
+    print(stats.stats)
+
+profile 为每次搜索开启 cProfile 或 pyinstrument，结果写入 profile_dir，只覆盖调用 search 的线程
+（MCTS子进程中的模拟不在其中）。
+"""
+import os
+import sys
+import json
+import time
+import contextlib
+from collections import defaultdict
+
+_NULL_TIMER = contextlib.nullcontext()
+
+def _noop(*args, **kwargs):
+    pass
+
+def _null_timer(name):
+    return _NULL_TIMER
+
+class _Timer:
+    """累加一段代码的耗时和调用次数"""
+
+    __slots__ = ('_timers', '_name', '_start')
+
+    def __init__(self, timers, name):
+        self._timers = timers
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        entry = self._timers[self._name]
+        entry[0] += 1
+        entry[1] += time.perf_counter() - self._start
+
+class JsonLinesSink:
+    """每条记录写成一行JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class StatsSink:
+    """在进程内累计所有搜索的计数和计时，结果在 stats 中"""
+
+    def __init__(self):
+        self.stats = {"searches": 0, "counters": defaultdict(int), "timers": defaultdict(float)}
+
+    def write(self, record):
+        if record["type"] != "search":
+            return
+        self.stats["searches"] += 1
+        for name, value in record["counters"].items():
+            self.stats["counters"][name] += value
+        for name, timer in record["timers"].items():
+            self.stats["timers"][name] += timer["time"]
+
+    def close(self):
+        pass
+
+class ConsoleSink:
+    """把事件和搜索摘要打印到控制台（相当于以前引擎里的print）"""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write(self, record):
+        stream = self.stream or sys.stdout
+        if record["type"] == "event":
+            fields = ', '.join(f"{k}={v}" for k, v in record.items() if k not in ('type', 'event'))
+            print(f"[{record['event']}] {fields}", file=stream)
+        else:
+            counters = ', '.join(f"{k}={v}" for k, v in record["counters"].items())
+            print(f"[search] {record['engine']} {record['time']:.3f}s {counters}", file=stream)
+
+    def close(self):
+        pass
+
+class Instrumentation:
+    """计数器、计时器和事件的收集者，进程内只有一个实例 metrics
+
+    同一时刻只记录一次搜索（与 GomokuAI 一次只搜索一个局面一致）。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sinks = []
+        self.profile = None
+        self.profile_dir = None
+        self.counters = defaultdict(int)
+        self.timers = defaultdict(lambda: [0, 0.0])
+        self._engine = None
+        self._start = None
+        self._profiler = None
+        self._searches = 0
+        self._set_hooks(False)
+
+    def _set_hooks(self, enabled):
+        if enabled:
+            self.count = self._count
+            self.add_time = self._add_time
+            self.timer = self._timer
+            self.event = self._event
+        else:
+            self.count = _noop
+            self.add_time = _noop
+            self.timer = _null_timer
+            self.event = _noop
+
+    def enable(self, sinks, profile=None, profile_dir="profiles"):
+        """开启埋点
+
+        Args:
+            sinks: 输出端列表，每个输出端实现 write(record) 和 close()
+            profile: None、"cprofile" 或 "pyinstrument"，为每次搜索开启性能分析
+            profile_dir: 性能分析结果的目录
+        """
+        if profile not in (None, "cprofile", "pyinstrument"):
+            raise ValueError(f"未知的性能分析器: {profile}")
+        if profile == "pyinstrument":
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                raise ImportError("需要安装pyinstrument: pip install pyinstrument") from None
+        self.sinks = list(sinks)
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.enabled = True
+        self._set_hooks(True)
+
+    def disable(self):
+        """关闭埋点并关闭所有输出端"""
+        for sink in self.sinks:
+            sink.close()
+        self.sinks = []
+        self.profile = None
+        self.enabled = False
+        self._set_hooks(False)
+
+    def _count(self, name, n=1):
+        self.counters[name] += n
+
+    def _add_time(self, name, seconds):
+        entry = self.timers[name]
+        entry[0] += 1
+        entry[1] += seconds
+
+    def _timer(self, name):
+        return _Timer(self.timers, name)
+
+    def _event(self, name, **fields):
+        record = {"type": "event", "event": name, "engine": self._engine}
+        if self._start is not None:
+            record["elapsed"] = round(time.perf_counter() - self._start, 6)
+        record.update(fields)
+        self._write(record)
+
+    def _write(self, record):
+        for sink in self.sinks:
+            sink.write(record)
+
+    def begin_search(self, engine):
+        """开始记录一次搜索，由 GomokuAI.search 调用"""
+        if not self.enabled:
+            return
+        self.counters.clear()
+        self.timers.clear()
+        self._engine = engine
+        self._start = time.perf_counter()
+        self._searches += 1
+        if self.profile == "cprofile":
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.profile == "pyinstrument":
+            import pyinstrument
+            self._profiler = pyinstrument.Profiler()
+            self._profiler.start()
+
+    def end_search(self, **fields):
+        """结束本次搜索，把计数、计时和结果字段作为一条记录输出"""
+        if not self.enabled or self._start is None:
+            return
+        record = {
+            "type": "search",
+            "engine": self._engine,
+            "time": time.perf_counter() - self._start,
+            "counters": dict(self.counters),
+            "timers": {name: {"calls": calls, "time": total} for name, (calls, total) in self.timers.items()},
+        }
+        record.update(fields)
+        if self._profiler is not None:
+            record["profile"] = self._save_profile()
+        self._start = None
+        self._write(record)
+
+    def _save_profile(self):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base = os.path.join(self.profile_dir, f"{self._engine}-{os.getpid()}-{self._searches}")
+        profiler, self._profiler = self._profiler, None
+        if self.profile == "cprofile":
+            profiler.disable()
+            path = base + ".prof"
+            profiler.dump_stats(path)
+        else:
+            profiler.stop()
+            path = base + ".html"
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+        return path
+
+metrics = Instrumentation()
@@ -1,5 +1,9 @@
 from .constants import *
 from .utils_minimax import *
+from .gomoku_ai import SearchStopped
+from .instrumentation import metrics
+from .position import zobrist_table
+from .symmetry import SYMMETRIES, symmetry_table, toggle
 import math
 
 class MinimaxAIEngine:
@@ -11,14 +15,18 @@ class MinimaxAIEngine:
         self.currentJ = -1
         self.nextBound = {}
         self.boardValue = 0
+        self.rootScores = {}  # 根节点每个已搜完的落子的值，除最佳落子外是被剪枝后的上界
         self.turn = 0
         self.lastPlayed = 0
         self.emptyCells = self.board_size * self.board_size
         self.patternDict = create_pattern_dict()
-        self.zobristTable = init_zobrist()
+        # 置换表按8个对称方向中最小的哈希索引，互为对称的局面共用一个条目
+        self.zobristKeys = zobrist_table(self.board_size)[0]
+        self.symTable = symmetry_table(self.board_size)
+        self.symHashes = [0] * SYMMETRIES
         self.update_TTable = update_TTable
-        self.rollingHash = 0
         self.TTable = {}
+        self.tick = None  # 每个节点调用一次，返回True时抛出SearchStopped中止搜索
     
     
     def isValid(self, i, j, state=True):
@@ -28,6 +36,36 @@ class MinimaxAIEngine:
             return self.boardMap[i][j] == 0
         return True
 
+    def setBoard(self, board):
+        """设置初始棋盘（己方1、对方-1），并从棋盘上已有的棋子计算8个方向的哈希"""
+        self.board_size = len(board)
+        self.boardMap = board
+        self.zobristKeys = zobrist_table(self.board_size)[0]
+        self.symTable = symmetry_table(self.board_size)
+        self.symHashes = [0] * SYMMETRIES
+        for i in range(self.board_size):
+            for j in range(self.board_size):
+                if board[i][j] != 0:
+                    self.toggleHash(i, j, board[i][j])
+
+    def toggleHash(self, i, j, state):
+        """在(i, j)放上或拿走state(1/-1)的棋子时更新8个方向的哈希"""
+        toggle(self.symHashes, self.symTable, self.zobristKeys, i * self.board_size + j, 1 if state == 1 else 2)
+
+    def startSearch(self, board, depth):
+        """以board为根开始一次depth层的搜索：重置根节点的结果和边界，置换表保留"""
+        self.depth = depth
+        self.setBoard(board)
+        self.currentI = -1
+        self.currentJ = -1
+        self.boardValue = 0
+        self.rootScores = {}
+        self.nextBound = {}
+        for i in range(self.board_size):
+            for j in range(self.board_size):
+                if board[i][j] != 0:
+                    self.updateBound(i, j, self.nextBound)
+
     def setState(self, i, j, state):
         self.boardMap[i][j] = state
         self.lastPlayed = state
@@ -120,6 +158,7 @@ class MinimaxAIEngine:
         return count
 
     def evaluate(self, i, j, board_value, turn, bound):
+        metrics.count("evals")
         value_before = 0
         value_after = 0
         opponent_weight = 3.0  # 对对方威胁的加权系数
@@ -145,13 +184,27 @@ class MinimaxAIEngine:
         return board_value + value_after - value_before
 
     def alphaBetaPruning(self, depth, board_value, bound, alpha, beta, maximizingPlayer):
+        if self.tick is not None and self.tick():
+            raise SearchStopped()
+
         # 终止条件
         if depth <= 0 or self.checkResult() is not None:
             return board_value
         
-        # 置换表查找
-        if self.rollingHash in self.TTable and self.TTable[self.rollingHash][1] >= depth:
-            return self.TTable[self.rollingHash][0]
+        # 置换表查找（对称局面的估值相同）；根节点要记录每个落子的值，不查表
+        # 表中存的是相对本节点静态值的结果，与从哪个局面开始搜索无关，可以跨搜索使用
+        key = min(self.symHashes)
+        alpha_orig, beta_orig = alpha, beta
+        if depth < self.depth and key in self.TTable and self.TTable[key][1] >= depth:
+            score, _, flag = self.TTable[key]
+            value = board_value + score
+            if flag == TT_LOWER:
+                alpha = max(alpha, value)
+            elif flag == TT_UPPER:
+                beta = min(beta, value)
+            if flag == TT_EXACT or alpha >= beta:
+                metrics.count("tt_hits")
+                return value
         
         if maximizingPlayer:
             max_val = -math.inf
@@ -162,11 +215,13 @@ class MinimaxAIEngine:
                 
                 # 更新棋盘状态
                 self.boardMap[i][j] = 1
-                self.rollingHash ^= self.zobristTable[i][j][0]
+                self.toggleHash(i, j, 1)
                 self.updateBound(i, j, new_bound)
                 
                 # 递归搜索
                 eval_val = self.alphaBetaPruning(depth-1, new_val, new_bound, alpha, beta, False)
+                if depth == self.depth:
+                    self.rootScores[child] = eval_val
                 if eval_val > max_val:
                     max_val = eval_val
                     if depth == self.depth:
@@ -179,12 +234,12 @@ class MinimaxAIEngine:
                 
                 # 恢复棋盘状态
                 self.boardMap[i][j] = 0
-                self.rollingHash ^= self.zobristTable[i][j][0]
+                self.toggleHash(i, j, 1)
                 
                 if beta <= alpha:
                     break
             
-            self.update_TTable(self.TTable, self.rollingHash, max_val, depth)
+            self.update_TTable(self.TTable, key, max_val - board_value, depth, self._bound(max_val, alpha_orig, beta_orig))
             return max_val
         
         else:
@@ -196,7 +251,7 @@ class MinimaxAIEngine:
                 
                 # 更新棋盘状态
                 self.boardMap[i][j] = -1
-                self.rollingHash ^= self.zobristTable[i][j][1]
+                self.toggleHash(i, j, -1)
                 self.updateBound(i, j, new_bound)
                 
                 # 递归搜索
@@ -213,14 +268,22 @@ class MinimaxAIEngine:
                 
                 # 恢复棋盘状态
                 self.boardMap[i][j] = 0
-                self.rollingHash ^= self.zobristTable[i][j][1]
+                self.toggleHash(i, j, -1)
                 
                 if beta <= alpha:
                     break
             
-            self.update_TTable(self.TTable, self.rollingHash, min_val, depth)
+            self.update_TTable(self.TTable, key, min_val - board_value, depth, self._bound(min_val, alpha_orig, beta_orig))
             return min_val
 
+    def _bound(self, value, alpha, beta):
+        """按进入节点时的窗口判断搜索结果是精确值还是上下界"""
+        if value <= alpha:
+            return TT_UPPER
+        if value >= beta:
+            return TT_LOWER
+        return TT_EXACT
+
     def firstMove(self):
         center = self.board_size // 2
         self.currentI, self.currentJ = center, center
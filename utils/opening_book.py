@@ -0,0 +1,189 @@
+"""开局库
+
+由引擎自对弈生成：收集每局前若干手中引擎下出的落子及最终胜负，按局面的规范Zobrist哈希
+（8种对称取最小，见 symmetry.py）汇总，写成按 (哈希, 落子) 排序的定长记录文件。
+查询时用 mmap 映射文件并二分查找，不把整个开局库读入内存。
+
+文件格式（小端）：
+    文件头 16字节: 魔数 b"GMKBOOK1"、棋盘大小(u16)、收录手数(u16)、记录数(u32)
+    记录   18字节: 规范哈希(u64)、规范方向下的落子格子编号(u16)、局数(u32)、得分(u32，胜2和1负0)
+"""
+import os
+import mmap
+import random
+import struct
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .constants import (BOARD_SIZE, OPENING_BOOK_PATH, OPENING_BOOK_MAX_PLIES, OPENING_BOOK_MIN_GAMES,
+                        OPENING_BOOK_MIN_SCORE)
+from .position import Position
+from .symmetry import canonical, transform, inverse
+
+MAGIC = b"GMKBOOK1"
+HEADER = struct.Struct("<8sHHI")
+ENTRY = struct.Struct("<QHII")
+_KEY = struct.Struct("<Q")
+
+class OpeningBook:
+    """只读开局库，通过mmap按需读取记录"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # 空文件
+            self._file.close()
+            raise ValueError(f"开局库文件为空: {path}") from None
+        magic, self.board_size, self.max_plies, self.count = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or len(self._data) != HEADER.size + self.count * ENTRY.size:
+            self.close()
+            raise ValueError(f"不是有效的开局库文件: {path}")
+
+    def __len__(self):
+        return self.count
+
+    def _key_at(self, index):
+        return _KEY.unpack_from(self._data, HEADER.size + index * ENTRY.size)[0]
+
+    def _lower_bound(self, key):
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def probe(self, position):
+        """局面在库中的全部落子，返回 [(row, col), 局数, 得分率] 的列表，按得分率和局数从高到低"""
+        if position.size != self.board_size or position.stones >= self.max_plies:
+            return []
+        key, sym = canonical(position)
+        back = inverse(sym)
+        size = self.board_size
+        moves = []
+        index = self._lower_bound(key)
+        while index < self.count:
+            entry_key, cell, games, score = ENTRY.unpack_from(self._data, HEADER.size + index * ENTRY.size)
+            if entry_key != key:
+                break
+            row, col = transform(cell // size, cell % size, size, back)
+            if position.is_empty(row, col):
+                moves.append(((row, col), games, score / (2 * games)))
+            index += 1
+        moves.sort(key=lambda m: (m[2], m[1]), reverse=True)
+        return moves
+
+    def choose(self, position, min_games=OPENING_BOOK_MIN_GAMES, min_score=OPENING_BOOK_MIN_SCORE):
+        """选择得分率最高的落子（只考虑至少出现min_games局且得分率不低于min_score的落子），没有时返回None"""
+        for move, games, score in self.probe(position):
+            if games >= min_games and score >= min_score:
+                return move
+        return None
+
+    def close(self):
+        if not self._data.closed:
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_default_book = None
+_default_loaded = False
+
+def default_book():
+    """默认开局库（OPENING_BOOK_PATH），文件不存在或无效时返回None；每个进程只加载一次"""
+    global _default_book, _default_loaded
+    if not _default_loaded:
+        _default_loaded = True
+        if os.path.exists(OPENING_BOOK_PATH):
+            try:
+                _default_book = OpeningBook(OPENING_BOOK_PATH)
+            except (OSError, ValueError) as e:
+                print(f"开局库加载失败: {e}")
+    return _default_book
+
+def write_book(path, stats, board_size=BOARD_SIZE, max_plies=OPENING_BOOK_MAX_PLIES):
+    """写入开局库，stats 为 {(规范哈希, 格子编号): [局数, 得分]}"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    entries = sorted(stats.items())
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, board_size, max_plies, len(entries)))
+        for (key, cell), (games, score) in entries:
+            f.write(ENTRY.pack(key, cell, games, score))
+    return len(entries)
+
+def collect(records, stats=None, board_size=BOARD_SIZE, max_plies=OPENING_BOOK_MAX_PLIES):
+    """把对局记录（arena.play_game 的返回值）中前max_plies手的引擎落子累加到stats
+
+    随机摆放的开局棋子只用来构成局面，不作为开局库的落子。
+    """
+    if stats is None:
+        stats = defaultdict(lambda: [0, 0])
+    for record in records:
+        position = Position(board_size)
+        for row, col in record["opening"]:
+            position.place(row, col, position.side_to_move)
+        for row, col, side, _ in record["moves"]:
+            if position.stones >= max_plies:
+                break
+            key, sym = canonical(position)
+            r, c = transform(row, col, board_size, sym)
+            entry = stats[(key, r * board_size + c)]
+            entry[0] += 1
+            entry[1] += 1 if record["winner"] == 0 else 2 if record["winner"] == side else 0
+            position.place(row, col, side)
+    return stats
+
+def build_book(engine, games, output=OPENING_BOOK_PATH, max_plies=OPENING_BOOK_MAX_PLIES, opening_moves=2,
+               workers=None, seed=0, max_moves=BOARD_SIZE * BOARD_SIZE, board_size=BOARD_SIZE, verbose=False):
+    """让引擎自对弈games局并生成开局库，返回记录数
+
+    每局先在中心附近随机摆放opening_moves颗棋子以产生不同的局面；自对弈时不查询已有的开局库。
+    """
+    from .arena import parse_engine_spec, random_opening, play_game
+
+    parse_engine_spec(engine)
+    rng = random.Random(seed)
+    tasks = [
+        (index, engine, engine, seed + index, random_opening(rng, opening_moves, board_size),
+         max_moves, board_size, verbose, False)
+        for index in range(games)
+    ]
+    records = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_game, task) for task in tasks]
+        for future in as_completed(futures):
+            records.append(future.result())
+            print(f"[{len(records)}/{games}] 自对弈完成")
+    stats = collect(records, board_size=board_size, max_plies=max_plies)
+    return write_book(output, stats, board_size, max_plies)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="用引擎自对弈生成开局库")
+    parser.add_argument('engine', help="引擎配置，如 minimax:depth=2")
+    parser.add_argument('--games', type=int, default=100, help="自对弈局数")
+    parser.add_argument('--plies', type=int, default=OPENING_BOOK_MAX_PLIES, help="收录的手数")
+    parser.add_argument('--opening-moves', type=int, default=2, help="每局随机摆放的开局棋子数")
+    parser.add_argument('--workers', type=int, default=None, help="并行对局的进程数，默认为CPU核数")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--output', default=OPENING_BOOK_PATH, help="开局库文件")
+    parser.add_argument('--verbose', action='store_true', help="显示引擎自身的输出")
+    args = parser.parse_args(argv)
+    if args.opening_moves >= args.plies:
+        parser.error("随机开局棋子数必须小于收录的手数")
+
+    count = build_book(args.engine, args.games, output=args.output, max_plies=args.plies,
+                       opening_moves=args.opening_moves, workers=args.workers, seed=args.seed,
+                       verbose=args.verbose)
+    print(f"开局库已写入: {args.output}，共 {count} 条记录")
+    return 0
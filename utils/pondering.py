@@ -0,0 +1,111 @@
+"""后台思考（pondering）
+
+AI落子后，在对方思考的同时预测对方最可能的几个应手，在后台线程中依次搜索每个应手之后己方的落子。
+对方真正落子后，search() 先询问后台思考：
+    已搜完该局面    直接返回结果
+    正在搜索该局面  改用实际预算（后台已用的时间和节点都计入）接着搜索，等待其完成
+    都不是          停止后台搜索，丢弃全部结果，照常搜索
+后台搜索调用引擎自己的 _search，因此任何引擎都能使用；接管时后台搜索改为响应实际搜索的停止信号；
+MCTS 不保留搜索树，"在所有可能应手下扩展搜索树"即按预测顺序逐个应手搜索。
+"""
+import threading
+from .constants import PONDER_REPLIES
+from .gomoku_ai import SearchContext
+from .minimax_ai_engine import MinimaxAIEngine
+
+def predict_replies(position, count=PONDER_REPLIES):
+    """预测轮到的一方最可能的count个落子：用Minimax引擎的静态评估给已有棋子周围的空位打分，从高到低"""
+    size = position.size
+    if position.stones == 0:
+        return [(size // 2, size // 2)]
+    engine = MinimaxAIEngine()
+    engine.setBoard(position.rows(0, 1, -1, position.side_to_move))
+    bound = {}
+    for index, cell in enumerate(position.cells):
+        if cell:
+            engine.updateBound(*divmod(index, size), bound)
+    # evaluate 会改写传入的边界，每个空位用一份副本
+    scored = [(engine.evaluate(i, j, 0, 1, dict(bound)), (i, j)) for i, j in bound]
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [move for _, move in scored[:count]]
+
+class Ponder:
+    """一次后台思考
+
+    Args:
+        ai: 引擎（GomokuAI），后台搜索调用它的 _search 和 ponder_limits()
+        position: AI刚落子后的局面（轮到对方），会被复制
+        player_side: AI执子方
+        stop_event: 这次后台思考的停止信号，引擎的 stop() 和 Ponder.stop() 都通过它停止后台搜索
+    """
+
+    def __init__(self, ai, position, player_side, stop_event):
+        self.ai = ai
+        self.player_side = player_side
+        self.results = {}       # 局面键 -> SearchResult
+        self._stop_event = stop_event
+        self._lock = threading.Lock()
+        self._current = None    # 正在搜索的 (局面键, SearchContext)
+        self._attached = False  # 实际搜索已接管正在进行的后台搜索
+        self._thread = threading.Thread(target=self._run, args=(position.copy(),), daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self, position):
+        """后台线程：预测应手，逐个搜索应手后的局面"""
+        ai = self.ai
+        opponent = position.side_to_move
+        for row, col in predict_replies(position):
+            if self._stop_event.is_set():
+                return
+            child = position.copy()
+            child.place(row, col, opponent)
+            # 开局库中的局面 search() 直接查库，不需要后台搜索
+            if ai.book_move(child, self.player_side) is not None:
+                continue
+            key = child.key()
+            ctx = SearchContext(ai.ponder_limits(), self._stop_event)
+            with self._lock:
+                self._current = (key, ctx)
+            try:
+                move, score, pv, depth = ai._search(child, self.player_side, ctx)
+            except Exception as e:
+                print(f"后台思考出错: {e}")
+                return
+            result = ctx.result(move, score, pv, depth)
+            with self._lock:
+                self._current = None
+                # 被停止的后台搜索不完整，丢弃；实际搜索接管后则按实际预算的结果返回
+                if self._attached or not self._stop_event.is_set():
+                    self.results[key] = result
+                if self._attached:
+                    return
+
+    def take(self, position, player_side, limits, stop_event):
+        """取出局面对应的后台搜索结果，没有时返回None；其余的后台搜索都会停止
+
+        Args:
+            position: 实际要搜索的局面
+            player_side: 执子方，与后台思考的执子方不同时不命中
+            limits: 实际搜索的预算，接管正在进行的后台搜索时使用
+            stop_event: 实际搜索的停止信号，接管后由它停止搜索
+        """
+        key = position.key()
+        result = None
+        if player_side == self.player_side:
+            with self._lock:
+                result = self.results.get(key)
+                if result is None and self._current is not None and self._current[0] == key:
+                    self._current[1].retarget(limits, stop_event)
+                    self._attached = True
+        if self._attached:
+            self._thread.join()
+            return self.results.get(key)
+        self.stop()
+        return result
+
+    def stop(self):
+        """停止后台搜索并等待线程结束"""
+        self._stop_event.set()
+        self._thread.join()
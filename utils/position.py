@@ -0,0 +1,169 @@
+"""紧凑局面表示
+
+棋盘保存为 size*size 字节的 bytearray（0空、1黑、2白），Zobrist哈希和轮到哪一方随落子增量更新。
+同时增量维护8个对称方向的哈希（sym_hashes），canonical() 给出对称局面共用的规范哈希。
+各引擎需要的编码由 bytes.translate 一次生成，不再逐格转换。
+"""
+import random
+from functools import lru_cache
+from utils.constants import PIECE_EMPTY, PIECE_BLACK, PIECE_WHITE, PLAYER_BLACK, PLAYER_WHITE
+from utils.symmetry import SYMMETRIES, symmetry_table, toggle, canonical_of
+
+EMPTY = 0
+BLACK = PLAYER_BLACK  # 1
+WHITE = PLAYER_WHITE  # 2
+
+ZOBRIST_SEED = 20240601  # 固定种子，同一局面在不同进程中的哈希相同
+
+_zobrist_tables = {}
+
+def zobrist_table(size):
+    """返回 (每格每色的键, 轮到白方的键)，keys[index * 3 + color]"""
+    table = _zobrist_tables.get(size)
+    if table is None:
+        rng = random.Random(ZOBRIST_SEED + size)
+        keys = [0] * (size * size * 3)
+        for index in range(size * size):
+            keys[index * 3 + BLACK] = rng.getrandbits(64)
+            keys[index * 3 + WHITE] = rng.getrandbits(64)
+        table = (keys, rng.getrandbits(64))
+        _zobrist_tables[size] = table
+    return table
+
+@lru_cache(maxsize=None)
+def _translation(empty, black, white):
+    """构造 bytes.translate 用的映射表，值按字节取（-1写作255，配合cast('b')）"""
+    table = bytearray(range(256))
+    table[EMPTY] = empty & 0xFF
+    table[BLACK] = black & 0xFF
+    table[WHITE] = white & 0xFF
+    return bytes(table)
+
+_PIECE_TABLE = _translation(ord(PIECE_EMPTY), ord(PIECE_BLACK), ord(PIECE_WHITE))
+
+class Position:
+    """紧凑局面：棋盘字节、Zobrist哈希（hash 即 sym_hashes[0]）、轮到哪一方"""
+    
+    __slots__ = ('size', 'cells', 'hash', 'sym_hashes', 'side_to_move', 'stones', '_keys', '_side_key', '_sym_table')
+    
+    def __init__(self, size=15):
+        self.size = size
+        self.cells = bytearray(size * size)
+        self._keys, self._side_key = zobrist_table(size)
+        self._sym_table = symmetry_table(size)
+        self.hash = 0
+        self.sym_hashes = [0] * SYMMETRIES
+        self.side_to_move = BLACK
+        self.stones = 0
+    
+    @classmethod
+    def from_board(cls, board, side_to_move=None):
+        """从 'X'/'O' 二维数组构造，未指定轮到哪一方时按棋子数推断（黑方先行）"""
+        size = len(board)
+        position = cls(size)
+        black = 0
+        for row in range(size):
+            for col in range(size):
+                piece = board[row][col]
+                if piece == PIECE_BLACK:
+                    position._set(row * size + col, BLACK)
+                    black += 1
+                elif piece == PIECE_WHITE:
+                    position._set(row * size + col, WHITE)
+        if side_to_move is None:
+            side_to_move = BLACK if black * 2 <= position.stones else WHITE
+        position.set_side_to_move(side_to_move)
+        return position
+    
+    def copy(self):
+        """复制局面（只复制字节数组，哈希键表共享）"""
+        other = Position.__new__(Position)
+        other.size = self.size
+        other.cells = bytearray(self.cells)
+        other._keys = self._keys
+        other._side_key = self._side_key
+        other._sym_table = self._sym_table
+        other.hash = self.hash
+        other.sym_hashes = list(self.sym_hashes)
+        other.side_to_move = self.side_to_move
+        other.stones = self.stones
+        return other
+    
+    def _set(self, index, color):
+        self.cells[index] = color
+        self.hash ^= self._keys[index * 3 + color]
+        toggle(self.sym_hashes, self._sym_table, self._keys, index, color)
+        self.stones += 1
+    
+    def set_side_to_move(self, player):
+        if player != self.side_to_move:
+            self.hash ^= self._side_key
+            self.sym_hashes = [h ^ self._side_key for h in self.sym_hashes]
+            self.side_to_move = player
+    
+    def get(self, row, col):
+        return self.cells[row * self.size + col]
+    
+    def is_empty(self, row, col):
+        return self.cells[row * self.size + col] == EMPTY
+    
+    def place(self, row, col, player):
+        """落子，之后轮到对方"""
+        self._set(row * self.size + col, player)
+        self.set_side_to_move(WHITE if player == BLACK else BLACK)
+    
+    def remove(self, row, col):
+        """提子（悔棋），之后轮到被提子的一方"""
+        index = row * self.size + col
+        color = self.cells[index]
+        if color == EMPTY:
+            return
+        self.cells[index] = EMPTY
+        self.hash ^= self._keys[index * 3 + color]
+        toggle(self.sym_hashes, self._sym_table, self._keys, index, color)
+        self.stones -= 1
+        self.set_side_to_move(color)
+    
+    def clear(self):
+        self.cells = bytearray(self.size * self.size)
+        self.hash = 0
+        self.sym_hashes = [0] * SYMMETRIES
+        self.side_to_move = BLACK
+        self.stones = 0
+    
+    def canonical(self):
+        """返回 (规范哈希, 变换编号)，变换把当前局面映射到规范方向（见 symmetry.py）"""
+        return canonical_of(self.sym_hashes)
+    
+    def key(self):
+        """局面的紧凑键：棋盘字节加轮到哪一方"""
+        return bytes(self.cells) + bytes((self.side_to_move,))
+    
+    def translated(self, empty, own, opponent, player_side):
+        """按执子方重新编码的一维字节串：空/己方/对方分别映射为给定值"""
+        if player_side == BLACK:
+            table = _translation(empty, own, opponent)
+        else:
+            table = _translation(empty, opponent, own)
+        return self.cells.translate(table)
+    
+    def rows(self, empty, own, opponent, player_side):
+        """按执子方编码的二维列表，供需要可修改棋盘的引擎使用（支持-1）"""
+        data = memoryview(self.translated(empty, own, opponent, player_side))
+        if min(empty, own, opponent) < 0:
+            data = data.cast('b')
+        size = self.size
+        return [data[row * size:(row + 1) * size].tolist() for row in range(size)]
+    
+    def piece_rows(self):
+        """'X'/'O'/' ' 二维列表，与 ChessBoard.board 相同的编码"""
+        text = self.cells.translate(_PIECE_TABLE).decode('ascii')
+        size = self.size
+        return [list(text[row * size:(row + 1) * size]) for row in range(size)]
+    
+    def __eq__(self, other):
+        return (isinstance(other, Position) and self.size == other.size
+                and self.side_to_move == other.side_to_move and self.cells == other.cells)
+    
+    def __hash__(self):
+        return self.hash
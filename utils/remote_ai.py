@@ -0,0 +1,145 @@
+"""引擎服务客户端
+
+RemoteAI 实现 GomokuAI 接口，把搜索请求发给 engine_server 中的常驻引擎，
+前端可以像使用本地引擎一样使用它（search、stop、get_next_chessboard）。
+每个 RemoteAI 对应服务端的一局棋，该局的引擎状态在服务端同一个工作进程中保留。
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+from utils.chessboard import ChessBoard
+from utils.gomoku_ai import GomokuAI
+from utils.constants import ENGINE_SERVER_ADDRESS
+
+_CELL_TEXT = bytes.maketrans(b'\x00\x01\x02', b'012')
+
+BUSY_RETRY_INTERVAL = 0.1  # 服务端排队已满时重试的间隔（秒）
+
+def server_address():
+    """前端使用的引擎服务地址：环境变量 GOMOKU_ENGINE_SERVER 优先，其次为 ENGINE_SERVER_ADDRESS，都没有时为None"""
+    return os.environ.get("GOMOKU_ENGINE_SERVER") or ENGINE_SERVER_ADDRESS
+
+def _connect(address, timeout):
+    """address 为 "host:port" 时连接TCP，否则视为Unix socket路径"""
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return socket.create_connection((host, int(port)), timeout=timeout)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    sock.connect(address)
+    return sock
+
+class RemoteAI(GomokuAI):
+    """通过引擎服务搜索的AI
+
+    Args:
+        address: 服务地址，"host:port" 或Unix socket路径，None时使用 server_address()
+        engine: 服务端引擎配置，如 "minimax:depth=3"
+        game: 对局标识，None时随机生成；同一标识的请求由服务端同一个工作进程处理
+        timeout: 单次请求在预算之外额外等待的秒数，超过时视为连接失败
+    """
+
+    def __init__(self, address=None, engine="classical", game=None, timeout=30.0):
+        super().__init__()
+        self.address = address or server_address()
+        if not self.address:
+            raise ValueError("未指定引擎服务地址")
+        self.engine = engine
+        self.game = game or uuid.uuid4().hex
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _request(self, message, budget=None):
+        """发送一个请求并等待回复；连接断开时重连一次"""
+        with self._lock:
+            self._next_id += 1
+            message = {"id": self._next_id, **message}
+            data = json.dumps(message).encode('utf-8') + b'\n'
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._sock = _connect(self.address, self.timeout)
+                        self._reader = self._sock.makefile('rb')
+                    self._sock.settimeout(self.timeout + (budget or 0))
+                    self._sock.sendall(data)
+                    while True:
+                        line = self._reader.readline()
+                        if not line:
+                            raise ConnectionError("引擎服务关闭了连接")
+                        reply = json.loads(line)
+                        if reply.get("id") == message["id"]:
+                            return reply
+                except OSError:
+                    self._disconnect()
+                    if attempt:
+                        raise
+
+    def _disconnect(self):
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = self._reader = None
+
+    def book_move(self, position, player_side):
+        """开局库由服务端查询（见请求中的 book 字段）"""
+        return None
+
+    def _search(self, position, player_side, ctx):
+        limits = ctx.limits
+        request = {
+            "op": "move",
+            "game": self.game,
+            "engine": self.engine,
+            "board": position.cells.translate(_CELL_TEXT).decode('ascii'),
+            "side": player_side,
+            "time": limits.time,
+            "nodes": limits.nodes,
+            "depth": limits.depth,
+            "book": self.use_book,
+        }
+        while True:
+            reply = self._request(request, limits.time)
+            if reply.get("ok") or reply.get("error") != "busy" or ctx.should_stop():
+                break
+            time.sleep(BUSY_RETRY_INTERVAL)
+        if not reply.get("ok"):
+            raise RuntimeError(f"引擎服务出错: {reply.get('error')}")
+        ctx.tick(reply["nodes"])
+        move = tuple(reply["move"]) if reply["move"] is not None else None
+        return move, reply["score"], [tuple(m) for m in reply["pv"]], reply["depth"]
+
+    def stop(self):
+        """请求服务端停止本局正在进行的搜索（通过单独的连接发送）"""
+        super().stop()
+        try:
+            with _connect(self.address, 2.0) as sock:
+                sock.sendall(json.dumps({"id": 0, "op": "stop", "game": self.game}).encode('utf-8') + b'\n')
+                sock.makefile('rb').readline()
+        except OSError:
+            pass
+
+    def close(self):
+        """通知服务端丢弃本局的引擎状态并断开连接"""
+        try:
+            self._request({"op": "end", "game": self.game})
+        except OSError:
+            pass
+        with self._lock:
+            self._disconnect()
+
+    def get_next_chessboard(self, chessboard: ChessBoard, player_side: int) -> ChessBoard:
+        """获取AI的下一步棋盘状态"""
+        if chessboard.winner != 0:
+            return chessboard
+
+        move = self.search(chessboard, player_side=player_side).move
+        if move is not None:
+            chessboard.place_stone(move[0], move[1], player_side)
+
+        return chessboard
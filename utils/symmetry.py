@@ -0,0 +1,75 @@
+"""棋盘的8种对称变换（正方形的二面体群）
+
+变换编号 0-3 为旋转 0/90/180/270 度，4-7 为先左右翻转再旋转。
+局面同时维护8个方向的Zobrist哈希（落子时对每个方向异或变换后格子的键），
+规范哈希取其中最小的一个，互为对称的局面得到相同的规范哈希；
+缓存按规范方向保存落子，读取时用逆变换映射回当前方向。
+"""
+from utils.constants import PLAYER_WHITE
+
+SYMMETRIES = 8
+
+# 变换的逆：90度与270度互逆，其余变换的逆是自身
+_INVERSE = (0, 3, 2, 1, 4, 5, 6, 7)
+
+_tables = {}
+
+def transform(row, col, size, sym):
+    """把坐标按第sym种变换映射到对称后的棋盘"""
+    last = size - 1
+    if sym >= 4:
+        col = last - col
+        sym -= 4
+    for _ in range(sym):
+        row, col = col, last - row
+    return row, col
+
+def inverse(sym):
+    return _INVERSE[sym]
+
+def symmetry_table(size):
+    """每个格子编号在8种变换下的格子编号：table[index][sym]"""
+    table = _tables.get(size)
+    if table is None:
+        table = []
+        for index in range(size * size):
+            row, col = divmod(index, size)
+            table.append(tuple(r * size + c for r, c in (transform(row, col, size, sym) for sym in range(SYMMETRIES))))
+        _tables[size] = table
+    return table
+
+def toggle(hashes, table, keys, index, color):
+    """在格子index放上或拿走color(1/2)的棋子，更新8个方向的哈希"""
+    for sym, target in enumerate(table[index]):
+        hashes[sym] ^= keys[target * 3 + color]
+
+def board_hashes(board, side_to_move=None):
+    """二维数组（0空，1、2为两种棋子）在8个方向下的哈希，side_to_move为白方(2)时加入轮到白方的键"""
+    from utils.position import zobrist_table
+
+    size = len(board)
+    keys, side_key = zobrist_table(size)
+    table = symmetry_table(size)
+    hashes = [0] * SYMMETRIES
+    for row in range(size):
+        for col in range(size):
+            color = board[row][col]
+            if color:
+                toggle(hashes, table, keys, row * size + col, color)
+    if side_to_move == PLAYER_WHITE:
+        hashes = [h ^ side_key for h in hashes]
+    return hashes
+
+def symmetric_hashes(position):
+    """从头计算局面在8个方向下的哈希（Position.sym_hashes 的增量结果应与之相同）"""
+    size = position.size
+    return board_hashes([position.cells[row * size:(row + 1) * size] for row in range(size)], position.side_to_move)
+
+def canonical_of(hashes):
+    """返回 (规范哈希, 变换编号)，变换把当前局面映射到规范方向"""
+    key = min(hashes)
+    return key, hashes.index(key)
+
+def canonical(position):
+    """局面的 (规范哈希, 变换编号)"""
+    return position.canonical()
@@ -60,5 +60,8 @@ def init_zobrist():
         return [[[random.getrandbits(64) for _ in range(2)] 
                 for j in range(BOARD_SIZE)] for i in range(BOARD_SIZE)]
     
-def update_TTable(table, hash, score, depth):
-    table[hash] = [score, depth]
\ No newline at end of file
+# 置换表条目的值类型：精确值、下界（发生剪枝）、上界（没有落子超过alpha）
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+
+def update_TTable(table, hash, score, depth, flag=TT_EXACT):
+    table[hash] = [score, depth, flag]
\ No newline at end of file